@@ -1,22 +1,46 @@
 import argparse
-from contextlib import contextmanager
+from contextlib import ExitStack, contextmanager
+import itertools
 import logging
-import subprocess
+import math
+import os
 from timeit import default_timer
 import ram_mapper
 from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
 
-def run_ram_mapper(output_dir: Path, arch_str: str) -> float:
+def run_ram_mapper(sweeper: ram_mapper.Sweeper, output_dir: Path, arch_str: str, warm_start: Optional[ram_mapper.mapping_config.AllCircuitConfig] = None) -> Tuple[ram_mapper.SweepResult, float]:
+    '''
+    Return (sweep_result, elapsed)
+    '''
     with elapsed_timer() as elapsed:
-        parser = argparse.ArgumentParser()
-        ram_mapper.init(parser)
         output_path = output_dir.joinpath('mapping.txt')
-        fpga_area_geomean = ram_mapper.main(parser.parse_args(
-            ['--lb=logic_block_count.txt', '--lr=logical_rams.txt', f'--out={output_path}', f'--arch={arch_str}', '--quiet']))
+        sweep_result = sweeper.sweep(
+            arch_strs=[arch_str],
+            out_filenames={arch_str: str(output_path)},
+            warm_starts={arch_str: warm_start} if warm_start is not None else None)[arch_str]
 
     logging.warning(f'    Elapsed {elapsed():.3f} seconds')
-    return fpga_area_geomean
+    return (sweep_result, elapsed())
+
+
+def run_ram_mapper_batch(sweeper: ram_mapper.Sweeper, output_dirs: Dict[str, Path], max_circuits: Optional[int] = None, effort_factor: float = 1.0) -> Tuple[Dict[str, ram_mapper.SweepResult], float]:
+    '''
+    output_dirs - {arch_str: output_dir}
+    Return ({arch_str: sweep_result}, elapsed)
+    '''
+    with elapsed_timer() as elapsed:
+        sweep_results = sweeper.sweep(
+            arch_strs=output_dirs.keys(),
+            out_filenames={arch_str: str(output_dir.joinpath(
+                'mapping.txt')) for arch_str, output_dir in output_dirs.items()},
+            max_circuits=max_circuits,
+            effort_factor=effort_factor)
+
+    logging.warning(
+        f'    Elapsed {elapsed():.3f} seconds for {len(output_dirs)} archs')
+    return (sweep_results, elapsed())
 
 
 def prepare_suite_dir(suite_name: str) -> Path:
@@ -56,6 +80,7 @@ def elapsed_timer():
 def main(args):
     logging.basicConfig(
         format='%(asctime)s.%(msecs)03d %(levelname)-7s [%(filename)s] %(message)s',  datefmt='%m%d:%H:%M:%S', level=logging.INFO)
+    logging.getLogger('ram_mapper').setLevel(logging.ERROR)
     with elapsed_timer() as elapsed:
         run(args)
     logging.warning(f'Total elapsed {elapsed():.3f} seconds')
@@ -65,12 +90,392 @@ def compose_bram_arch_str(bram_size: int, max_width: int, ratio: int) -> str:
     return f'-b {bram_size} {max_width} {ratio} 1'
 
 
+class ArchPoint(NamedTuple):
+    bram_size: int
+    max_width: int
+    ratio: int
+    # Optional second BRAM type
+    bram_size2: Optional[int] = None
+    max_width2: Optional[int] = None
+    ratio2: Optional[int] = None
+
+    def has_bram2(self) -> bool:
+        return self.bram_size2 is not None
+
+    def run_name(self, use_lutram: bool) -> str:
+        run_name = f'B{self.bram_size}_W{self.max_width}_R{self.ratio}'
+        if self.has_bram2():
+            run_name += f'_B{self.bram_size2}_W{self.max_width2}_R{self.ratio2}'
+        if use_lutram:
+            run_name = 'LUTRAM_' + run_name
+        return run_name
+
+    def arch_str(self, use_lutram: bool) -> str:
+        arch_str = compose_bram_arch_str(
+            bram_size=self.bram_size, max_width=self.max_width, ratio=self.ratio)
+        if self.has_bram2():
+            arch_str += ' ' + compose_bram_arch_str(
+                bram_size=self.bram_size2, max_width=self.max_width2, ratio=self.ratio2)
+        if use_lutram:
+            arch_str = '-l 1 1 ' + arch_str
+        return arch_str
+
+    def __str__(self) -> str:
+        return '\t'.join(map(str, self[:6 if self.has_bram2() else 3]))
+
+
+class RunPoint(NamedTuple):
+    run_name: str
+    arch_str: str
+    arch_point: ArchPoint
+
+
+class RunResult(NamedTuple):
+    fpga_area_geomean: float
+    arch_point: ArchPoint
+    mapping_file_path: Path
+
+
+class ExplorationSession:
+    '''
+    Evaluate run points of a suite, served from the sweep result cache when possible.
+    The Sweeper is only started (parsing the inputs and spawning the pool) when anything is not cached.
+    '''
+
+    def __init__(self, args, suite_path: Path, stack: ExitStack):
+        self._args = args
+        self._suite_path = suite_path
+        self._stack = stack
+        self._sweeper = None
+        self._logical_circuits = None
+        self._cache = None
+        if not args.no_cache:
+            self._cache = stack.enter_context(ram_mapper.SweepCache(
+                filename=args.cache, input_filenames=['logic_block_count.txt', 'logical_rams.txt']))
+
+    def sweeper(self) -> ram_mapper.Sweeper:
+        if self._sweeper is None:
+            self._sweeper = self._stack.enter_context(ram_mapper.Sweeper(
+                logic_block_count_filename='logic_block_count.txt', logical_rams_filename='logical_rams.txt', processes=self._args.processes))
+        return self._sweeper
+
+    def logical_circuits(self, max_circuits: Optional[int] = None) -> Dict[int, ram_mapper.logical_circuit.LogicalCircuit]:
+        if self._sweeper is not None:
+            return self._sweeper.select_logical_circuits(max_circuits=max_circuits)
+        if self._logical_circuits is None:
+            self._logical_circuits = ram_mapper.driver.read_logical_circuits(
+                logic_block_count_filename='logic_block_count.txt', logical_rams_filename='logical_rams.txt')
+        return dict(sorted(self._logical_circuits.items())[:max_circuits])
+
+    def check(self, run_point: RunPoint, mapping_file_path: Path, max_circuits: Optional[int] = None) -> ram_mapper.CheckResult:
+        archs = ram_mapper.siv_arch.SIVArch.from_str(
+            raw_checker_str=run_point.arch_str)
+        check_result = ram_mapper.check_mapping_file(
+            archs=archs, logical_circuits=self.logical_circuits(max_circuits=max_circuits), filename=str(mapping_file_path))
+        for violation in check_result.violations:
+            logging.error(f'    [{run_point.run_name}] {violation}')
+        return check_result
+
+    def checked_area(self, run_point: RunPoint, sweep_result: ram_mapper.SweepResult, mapping_file_path: Path, max_circuits: Optional[int] = None) -> float:
+        '''
+        Return the FPGA area geomean of a fresh mapping, inf if it is illegal
+        '''
+        check_result = self.check(
+            run_point=run_point, mapping_file_path=mapping_file_path, max_circuits=max_circuits)
+        if not check_result.is_legal():
+            logging.error(
+                f'    [{run_point.run_name}] Illegal mapping {mapping_file_path}')
+            return math.inf
+        if not math.isclose(check_result.fpga_area_geomean, sweep_result.fpga_area_geomean):
+            logging.error(
+                f'    [{run_point.run_name}] Checked FPGA AREA {check_result.fpga_area_geomean:.6E} does not match {sweep_result.fpga_area_geomean:.6E}')
+        return check_result.fpga_area_geomean
+
+    @staticmethod
+    def effort(max_circuits: Optional[int], effort_factor: float, warm_start_digest: Optional[str] = None) -> Dict[str, object]:
+        '''
+        warm_start_digest - sha256 of the mapping file warm started from, the result depends on it
+        '''
+        effort = {'max_circuits': max_circuits,
+                  'effort_factor': effort_factor, 'warm_start': warm_start_digest is not None}
+        if warm_start_digest is not None:
+            effort['warm_start_mapping'] = warm_start_digest
+        return effort
+
+    def get_cached(self, run_point: RunPoint, effort: Dict[str, object]) -> Optional[RunResult]:
+        if self._cache is None:
+            return None
+        cached_result = self._cache.get(
+            arch_str=run_point.arch_str, effort=effort)
+        if cached_result is None:
+            return None
+        logging.warning(
+            f'    [{run_point.run_name}] Cached: FPGA AREA: {cached_result.fpga_area_geomean:.6E} ({cached_result.mapping_filename})')
+        return RunResult(cached_result.fpga_area_geomean, run_point.arch_point, Path(cached_result.mapping_filename))
+
+    def put_cached(self, sweep_result: ram_mapper.SweepResult, effort: Dict[str, object], mapping_file_path: Path):
+        if self._cache is not None:
+            self._cache.put(arch_str=sweep_result.arch_str, effort=effort, fpga_area_geomean=sweep_result.fpga_area_geomean,
+                            circuit_qors=sweep_result.circuit_qors, mapping_filename=str(mapping_file_path))
+
+    def evaluate(self, run_points: List[RunPoint], max_circuits: Optional[int] = None, effort_factor: float = 1.0) -> Tuple[List[RunResult], float]:
+        '''
+        Evaluate all run points in one sweep
+        Return (results in the order of run_points, elapsed)
+        '''
+        effort = self.effort(max_circuits=max_circuits,
+                             effort_factor=effort_factor)
+        results: Dict[str, RunResult] = dict()
+        run_paths: Dict[str, Path] = dict()
+        for run_point in run_points:
+            if (cached_result := self.get_cached(run_point=run_point, effort=effort)) is not None:
+                results[run_point.arch_str] = cached_result
+            else:
+                run_name = run_point.run_name
+                if max_circuits is not None or effort_factor != 1.0:
+                    run_name += f'_C{max_circuits}_E{effort_factor:g}'
+                run_paths[run_point.arch_str] = prepare_run_dir(
+                    suite_path=self._suite_path, run_name=run_name)
+
+        elapsed = 0.0
+        if len(run_paths) > 0:
+            logging.warning(
+                f'Running {len(run_paths)} candidates in one sweep (circuits={max_circuits} effort={effort_factor:g})')
+            sweep_results, elapsed = run_ram_mapper_batch(
+                sweeper=self.sweeper(), output_dirs=run_paths, max_circuits=max_circuits, effort_factor=effort_factor)
+            for run_point in run_points:
+                if run_point.arch_str not in run_paths:
+                    continue
+                sweep_result = sweep_results[run_point.arch_str]
+                logging.warning(
+                    f'    [{run_point.run_name}] Done: FPGA AREA: {sweep_result.fpga_area_geomean:.6E}')
+                mapping_file_path = run_paths[run_point.arch_str].joinpath(
+                    'mapping.txt')
+                fpga_area_geomean = self.checked_area(
+                    run_point=run_point, sweep_result=sweep_result, mapping_file_path=mapping_file_path, max_circuits=max_circuits)
+                if not math.isinf(fpga_area_geomean):
+                    self.put_cached(sweep_result=sweep_result, effort=effort,
+                                    mapping_file_path=mapping_file_path)
+                results[run_point.arch_str] = RunResult(
+                    fpga_area_geomean, run_point.arch_point, mapping_file_path)
+
+        return ([results[run_point.arch_str] for run_point in run_points], elapsed)
+
+    def evaluate_chained(self, run_points: List[RunPoint]) -> List[RunResult]:
+        '''
+        Evaluate run points one after another, each warm starts from the previous one
+        '''
+        results: List[RunResult] = list()
+        warm_start = None
+        # Mapping of the previous point if it was cached, only loaded when the next point needs it
+        warm_start_path = None
+        for candidate_idx, run_point in enumerate(run_points):
+            logging.warning(
+                f'{candidate_idx}/{len(run_points)} [{run_point.run_name}] Running: {run_point.arch_str}')
+            # Keyed by the mapping warm started from, a point is only comparable with the same predecessor mapping
+            has_warm_start = warm_start_path is not None and warm_start_path.exists()
+            effort = self.effort(max_circuits=None, effort_factor=1.0, warm_start_digest=ram_mapper.utils.file_sha256(
+                str(warm_start_path)) if has_warm_start else None)
+            if (cached_result := self.get_cached(run_point=run_point, effort=effort)) is not None:
+                warm_start = None
+                warm_start_path = cached_result.mapping_file_path
+                results.append(cached_result)
+                continue
+
+            if warm_start is None and has_warm_start:
+                warm_start = ram_mapper.mapping_config.read_AllCircuitConfig_from_file(
+                    filename=str(warm_start_path), logical_circuits=self.sweeper().logical_circuits())
+            run_path = prepare_run_dir(
+                suite_path=self._suite_path, run_name=run_point.run_name)
+            sweep_result, elapsed = run_ram_mapper(
+                sweeper=self.sweeper(), output_dir=run_path, arch_str=run_point.arch_str, warm_start=warm_start)
+            logging.warning(
+                f'    {candidate_idx}/{len(run_points)} [{run_point.run_name}] Done: FPGA AREA: {sweep_result.fpga_area_geomean:.6E}')
+            logging.warning(
+                f'    {"Warm started from previous point" if warm_start is not None else "Cold started"} in {elapsed:.3f} seconds')
+            mapping_file_path = run_path.joinpath('mapping.txt')
+            fpga_area_geomean = self.checked_area(
+                run_point=run_point, sweep_result=sweep_result, mapping_file_path=mapping_file_path)
+            if not math.isinf(fpga_area_geomean):
+                self.put_cached(sweep_result=sweep_result, effort=effort,
+                                mapping_file_path=mapping_file_path)
+            warm_start = sweep_result.acc
+            warm_start_path = mapping_file_path
+            results.append(RunResult(fpga_area_geomean,
+                           run_point.arch_point, mapping_file_path))
+        return results
+
+
+def run_successive_halving(session: ExplorationSession, run_points: List[RunPoint], keep_fraction: float, num_finalists: int, min_circuits: int, min_effort: float) -> List[RunResult]:
+    '''
+    Evaluate all candidates at low fidelity (the first few circuits and reduced annealing effort),
+    keep the top keep_fraction and raise the fidelity, until the finalists get full runs.
+    Return results of the finalists
+    '''
+    assert 0 < keep_fraction < 1
+    num_circuits = len(session.logical_circuits())
+    num_rungs = 1
+    if len(run_points) > num_finalists:
+        num_rungs += math.ceil(math.log(len(run_points) /
+                               num_finalists) / math.log(1 / keep_fraction))
+
+    candidates = run_points
+    total_elapsed = 0.0
+    full_fidelity_elapsed_per_candidate = None
+    for rung in range(num_rungs):
+        is_final_rung = rung == num_rungs - 1
+        fidelity = keep_fraction ** (num_rungs - 1 - rung)
+        max_circuits = None
+        effort_factor = 1.0
+        if not is_final_rung:
+            max_circuits = max(min_circuits, math.ceil(num_circuits * fidelity))
+            max_circuits = max_circuits if max_circuits < num_circuits else None
+            effort_factor = round(max(min_effort, fidelity), 4)
+        logging.warning(
+            f'----Rung {rung}/{num_rungs}: {len(candidates)} candidates, circuits={max_circuits or num_circuits} effort={effort_factor:g}----')
+
+        results, elapsed = session.evaluate(
+            run_points=candidates, max_circuits=max_circuits, effort_factor=effort_factor)
+        total_elapsed += elapsed
+        ranked = sorted(zip(results, candidates), key=lambda rc: rc[0])
+        for idx, (result, candidate) in enumerate(ranked):
+            logging.warning(
+                f'    [{idx}]\t{result.fpga_area_geomean:6E}\t{candidate.run_name}')
+
+        if is_final_rung:
+            if elapsed > 0:
+                full_fidelity_elapsed_per_candidate = elapsed / len(candidates)
+            break
+        num_kept = max(num_finalists, math.ceil(
+            len(candidates) * keep_fraction))
+        candidates = [candidate for _, candidate in ranked[:num_kept]]
+
+    logging.warning(
+        f'Successive halving elapsed {total_elapsed:.3f} seconds over {num_rungs} rungs')
+    if full_fidelity_elapsed_per_candidate is not None and total_elapsed > 0:
+        exhaustive_elapsed = full_fidelity_elapsed_per_candidate * \
+            len(run_points)
+        logging.warning(
+            f'    Estimated exhaustive full-fidelity sweep: {exhaustive_elapsed:.3f} seconds ({exhaustive_elapsed / total_elapsed:.2f}x)')
+    return results
+
+
+class InverseDistanceSurrogate:
+    '''
+    Predict log(area) of an unevaluated grid point as the inverse distance weighted mean of the evaluated points.
+    Grid points are tuples of candidate indices, each dimension is normalized to [0, 1].
+    '''
+
+    def __init__(self, dim_sizes: List[int]):
+        self._scales = [1 / (dim_size - 1) if dim_size > 1 else 0
+                        for dim_size in dim_sizes]
+        self._observations: Dict[Tuple[int, ...], float] = dict()
+
+    def add(self, grid_point: Tuple[int, ...], fpga_area_geomean: float):
+        self._observations[grid_point] = math.log(fpga_area_geomean)
+
+    def predict(self, grid_point: Tuple[int, ...]) -> Optional[float]:
+        if len(self._observations) == 0:
+            return None
+        weighted_sum = 0.0
+        weight_sum = 0.0
+        for observed_point, log_area in self._observations.items():
+            distance_sq = sum(((a - b) * scale) ** 2 for a, b,
+                              scale in zip(grid_point, observed_point, self._scales))
+            if distance_sq == 0:
+                return math.exp(log_area)
+            weighted_sum += log_area / distance_sq
+            weight_sum += 1 / distance_sq
+        return math.exp(weighted_sum / weight_sum)
+
+
+def run_model_guided_search(session: ExplorationSession, dims: List[list], to_run_point: Callable[[tuple], RunPoint], batch_size: int, min_improvement: float, max_evaluations: int) -> List[RunResult]:
+    '''
+    Coordinate descent over the grid spanned by dims, starting from the center.
+    Each round evaluates, in one sweep, the unevaluated neighbours of the incumbent ranked by the surrogate,
+    topped up with the surrogate's best unevaluated points elsewhere in the grid.
+    Stop when a round improves the incumbent by less than min_improvement (relative), or the budget runs out.
+    Return results of all evaluated points
+    '''
+    dim_sizes = [len(dim) for dim in dims]
+    surrogate = InverseDistanceSurrogate(dim_sizes=dim_sizes)
+    grid_size = math.prod(dim_sizes)
+    results: Dict[Tuple[int, ...], RunResult] = dict()
+
+    def grid_run_point(grid_point: Tuple[int, ...]) -> RunPoint:
+        return to_run_point(tuple(dim[idx] for dim, idx in zip(dims, grid_point)))
+
+    def neighbours(grid_point: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        neighbour_points = list()
+        for dim_idx, dim_size in enumerate(dim_sizes):
+            for step in (-1, 1):
+                idx = grid_point[dim_idx] + step
+                if 0 <= idx < dim_size:
+                    neighbour_points.append(
+                        grid_point[:dim_idx] + (idx,) + grid_point[dim_idx + 1:])
+        return neighbour_points
+
+    def predicted_area(grid_point: Tuple[int, ...]) -> float:
+        prediction = surrogate.predict(grid_point)
+        return prediction if prediction is not None else math.inf
+
+    incumbent = tuple(dim_size // 2 for dim_size in dim_sizes)
+    proposals = [incumbent]
+    total_elapsed = 0.0
+    for search_round in itertools.count():
+        proposals = proposals[:max_evaluations - len(results)]
+        if len(proposals) == 0:
+            break
+        logging.warning(
+            f'----Round {search_round}: {len(proposals)} proposals, {len(results)}/{grid_size} evaluated----')
+        run_points = [grid_run_point(grid_point) for grid_point in proposals]
+        predictions = [surrogate.predict(grid_point)
+                       for grid_point in proposals]
+        round_results, elapsed = session.evaluate(run_points=run_points)
+        total_elapsed += elapsed
+
+        previous_best = results[incumbent].fpga_area_geomean if incumbent in results else None
+        for grid_point, run_point, prediction, result in zip(proposals, run_points, predictions, round_results):
+            prediction_str = f'{prediction:.6E}' if prediction is not None else 'n/a'
+            logging.warning(
+                f'    [{run_point.run_name}] predicted: {prediction_str} actual: {result.fpga_area_geomean:.6E}')
+            surrogate.add(grid_point=grid_point,
+                          fpga_area_geomean=result.fpga_area_geomean)
+            results[grid_point] = result
+        incumbent = min(
+            results, key=lambda grid_point: results[grid_point].fpga_area_geomean)
+        best = results[incumbent].fpga_area_geomean
+        logging.warning(
+            f'    Incumbent [{grid_run_point(incumbent).run_name}] FPGA AREA: {best:.6E}')
+
+        if previous_best is not None and (previous_best - best) / previous_best < min_improvement:
+            logging.warning(
+                f'Improvement {(previous_best - best) / previous_best * 100:.3f}% is below {min_improvement * 100:.3f}%, stop')
+            break
+
+        candidates = [grid_point for grid_point in neighbours(
+            incumbent) if grid_point not in results]
+        candidates.sort(key=predicted_area)
+        proposals = candidates[:batch_size]
+        if len(proposals) < batch_size:
+            # Explore where the surrogate is most optimistic
+            others = [grid_point for grid_point in itertools.product(
+                *map(range, dim_sizes)) if grid_point not in results and grid_point not in proposals]
+            others.sort(key=predicted_area)
+            proposals += others[:batch_size - len(proposals)]
+
+    logging.warning(
+        f'Model-guided search elapsed {total_elapsed:.3f} seconds, evaluated {len(results)}/{grid_size} grid points')
+    return list(results.values())
+
+
 def init(parser):
     parser.add_argument(
         '--multiplier',
         type=int,
         required=True,
-        help='BRAM size multiplier')
+        nargs='+',
+        help='List of BRAM size multiplier candidates')
     parser.add_argument(
         '--width',
         type=int,
@@ -83,14 +488,113 @@ def init(parser):
         required=True,
         nargs='+',
         help='List of ratio candidates')
+    parser.add_argument(
+        '--multiplier2',
+        type=int,
+        nargs='+',
+        help='List of BRAM size multiplier candidates of an optional second BRAM type')
+    parser.add_argument(
+        '--width2',
+        type=int,
+        nargs='+',
+        help='List of max width candidates of an optional second BRAM type')
+    parser.add_argument(
+        '--ratio2',
+        type=int,
+        nargs='+',
+        help='List of ratio candidates of an optional second BRAM type')
+    parser.add_argument(
+        '--warm_start',
+        action='store_true',
+        help='Chain neighbouring grid points, each run warm starts from the previous mapping')
+    parser.add_argument(
+        '--processes', '-j',
+        type=int,
+        default=os.cpu_count(),
+        help=f'The number of processes for parallelism, default is {os.cpu_count()}')
+    parser.add_argument(
+        '--cache',
+        type=str,
+        default='exploration_results/sweep_cache.sqlite3',
+        help='Persistent sweep result cache, default is exploration_results/sweep_cache.sqlite3')
+    parser.add_argument(
+        '--no_cache',
+        action='store_true',
+        help='Neither serve nor store results from the sweep result cache')
+    parser.add_argument(
+        '--halving',
+        action='store_true',
+        help='Successive halving instead of evaluating the full grid at full fidelity')
+    parser.add_argument(
+        '--keep_fraction',
+        type=float,
+        default=0.5,
+        help='Successive halving: fraction of candidates kept after each rung, default is 0.5')
+    parser.add_argument(
+        '--finalists',
+        type=int,
+        default=2,
+        help='Successive halving: number of candidates evaluated at full fidelity, default is 2')
+    parser.add_argument(
+        '--min_circuits',
+        type=int,
+        default=8,
+        help='Successive halving: the least number of circuits of the lowest fidelity, default is 8')
+    parser.add_argument(
+        '--min_effort',
+        type=float,
+        default=0.1,
+        help='Successive halving: the least annealing effort of the lowest fidelity, default is 0.1')
+    parser.add_argument(
+        '--search',
+        action='store_true',
+        help='Model-guided coordinate descent instead of evaluating the full grid')
+    parser.add_argument(
+        '--batch',
+        type=int,
+        default=4,
+        help='Model-guided search: number of points evaluated per round in one sweep, default is 4')
+    parser.add_argument(
+        '--min_improvement',
+        type=float,
+        default=0.001,
+        help='Model-guided search: stop when a round improves the best area by less than this fraction, default is 0.001')
+    parser.add_argument(
+        '--max_evaluations',
+        type=int,
+        default=64,
+        help='Model-guided search: the most number of points evaluated, default is 64')
+
+
+def serpentine_product(dims: List[list]):
+    '''
+    Like itertools.product, but reverses the inner order on every other step of an outer dimension,
+    so that consecutive points only differ in one dimension by one step
+    '''
+    if len(dims) == 0:
+        yield ()
+        return
+    inner = list(serpentine_product(dims[1:]))
+    for idx, value in enumerate(dims[0]):
+        for rest in (inner if idx % 2 == 0 else reversed(inner)):
+            yield (value,) + rest
 
 
 def run(args):
     use_lutram = True
     bram_size_base = 1024
-    bram_size = bram_size_base * args.multiplier
+    bram_sizes = [bram_size_base * multiplier for multiplier in args.multiplier]
+
+    bram2_args = (args.multiplier2, args.width2, args.ratio2)
+    if any(arg is not None for arg in bram2_args) and not all(arg is not None for arg in bram2_args):
+        raise ValueError(
+            '--multiplier2, --width2 and --ratio2 must be given together')
+    dims = [bram_sizes, args.width, args.ratio]
+    if args.multiplier2 is not None:
+        dims += [[bram_size_base * multiplier for multiplier in args.multiplier2],
+                 args.width2, args.ratio2]
 
-    suite_name = str(bram_size)
+    suite_name = '_'.join(map(str, bram_sizes))
     if use_lutram:
         suite_name = 'LUTRAM_' + suite_name
     logging.warning(f'{suite_name}')
@@ -99,56 +603,61 @@ def run(args):
     # run_name = 'default_arch'
     # arch_str = '-l 1 1 -b 8192 32 10 1 -b 131072 128 300 1'
 
-    max_width_candidates = args.width
-    ratio_candidates = args.ratio
-
-    candidate_idx = 0
-    num_candidates = len(max_width_candidates) * len(ratio_candidates)
-
-    results = list()
-    for max_width in max_width_candidates:
-        for ratio in ratio_candidates:
-            run_name = f'B{bram_size}_W{max_width}_R{ratio}'
-            if use_lutram:
-                run_name = 'LUTRAM_' + run_name
-            arch_str = compose_bram_arch_str(
-                bram_size=bram_size, max_width=max_width, ratio=ratio)
-            if use_lutram:
-                arch_str = '-l 1 1 ' + arch_str
-            logging.warning(
-                f'{candidate_idx}/{num_candidates} [{run_name}] Running: {arch_str}')
-            run_path = prepare_run_dir(
-                suite_path=suite_path, run_name=run_name)
-            fpga_area_geomean = run_ram_mapper(
-                output_dir=run_path, arch_str=arch_str)
-            logging.warning(
-                f'    {candidate_idx}/{num_candidates} [{run_name}] Done: FPGA AREA: {fpga_area_geomean:.6E}')
-            results.append((fpga_area_geomean, max_width, ratio, run_path))
-            candidate_idx += 1
+    if (args.halving or args.search) and args.warm_start:
+        logging.warning('--warm_start is ignored by --halving and --search')
+    if args.halving and args.search:
+        raise ValueError('--halving and --search are exclusive')
+    use_warm_start = args.warm_start and not args.halving and not args.search
+
+    def to_run_point(values: tuple) -> RunPoint:
+        arch_point = ArchPoint(*values)
+        return RunPoint(run_name=arch_point.run_name(use_lutram=use_lutram),
+                        arch_str=arch_point.arch_str(use_lutram=use_lutram), arch_point=arch_point)
+
+    # When warm starting, walk the grid in serpentine order so that consecutive points are neighbours
+    grid_points = serpentine_product(
+        dims) if use_warm_start else itertools.product(*dims)
+    run_points = [to_run_point(values) for values in grid_points]
+
+    with ExitStack() as stack:
+        session = ExplorationSession(
+            args=args, suite_path=suite_path, stack=stack)
+        if args.search:
+            results = run_model_guided_search(session=session, dims=dims, to_run_point=to_run_point, batch_size=args.batch,
+                                              min_improvement=args.min_improvement, max_evaluations=args.max_evaluations)
+        elif args.halving:
+            results = run_successive_halving(session=session, run_points=run_points, keep_fraction=args.keep_fraction,
+                                             num_finalists=args.finalists, min_circuits=args.min_circuits, min_effort=args.min_effort)
+        elif use_warm_start:
+            results = session.evaluate_chained(run_points=run_points)
+        else:
+            results, _ = session.evaluate(run_points=run_points)
 
     logging.warning('------------------------')
-    logging.warning(f'All done, results for bram_size {bram_size}')
-    logging.warning('[idx]\tarea\tmax_width\tratio')
+    logging.warning(f'All done, results for bram_size {suite_name}')
+    header = '[idx]\tarea\tbram_size\tmax_width\tratio'
+    if args.multiplier2 is not None:
+        header += '\tbram_size2\tmax_width2\tratio2'
+    logging.warning(header)
     sorted_results = sorted(results)
     for idx, result in enumerate(sorted_results):
-        area, max_width, ratio, _ = result
-        logging.warning(f'[{idx}]\t{area:6E}\t{max_width}\t{ratio}')
+        area, arch_point, _ = result
+        logging.warning(f'[{idx}]\t{area:6E}\t{arch_point}')
 
-    # Run checker and print area
+    # Check and print area of the best
     logging.warning('==========BEST==========')
-    area, max_width, ratio, run_path = sorted_results[0]
-    arch_str = compose_bram_arch_str(
-        bram_size=bram_size, max_width=max_width, ratio=ratio)
-    if use_lutram:
-        arch_str = '-l 1 1 ' + arch_str
-    mapping_file_path = run_path.joinpath('mapping.txt')
-    checker_command = ['./checker', arch_str, '-t',
-                       'logical_rams.txt', 'logic_block_count.txt', f'{mapping_file_path}']
-    checker_command_str = ' '.join(checker_command)
-    logging.warning(f'{checker_command_str}')
-    out_str = subprocess.check_output(checker_command_str, shell=True)
-    for line in out_str.splitlines():
-        logging.warning(line.decode("utf-8"))
+    area, arch_point, mapping_file_path = sorted_results[0]
+    run_point = to_run_point(arch_point)
+    logging.warning(f'{run_point.arch_str} {mapping_file_path}')
+    if not mapping_file_path.exists():
+        logging.error(f'Missing {mapping_file_path}, cannot check')
+    elif (check_result := session.check(run_point=run_point, mapping_file_path=mapping_file_path)).is_legal():
+        logging.warning(ram_mapper.siv_heuristics.CircuitQor.banner(
+            len(ram_mapper.siv_arch.SIVArch.from_str(run_point.arch_str).ram_archs)))
+        for qor in check_result.circuit_qors:
+            logging.warning(qor.serialize())
+        logging.warning(
+            f'Geometric Average Area for {len(check_result.circuit_qors)} circuits: {check_result.fpga_area_geomean:.6E}')
     logging.warning('========================')
 
 
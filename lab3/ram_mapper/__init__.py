@@ -1,2 +1,7 @@
 from ram_mapper.driver import init
 from ram_mapper.driver import main
+from ram_mapper.sweep import Sweeper
+from ram_mapper.sweep import SweepResult
+from ram_mapper.sweep_cache import SweepCache
+from ram_mapper.checker import CheckResult
+from ram_mapper.checker import check_mapping_file
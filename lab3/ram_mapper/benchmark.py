@@ -0,0 +1,303 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, NamedTuple, Optional
+
+from . import driver
+from . import logger as logger_module
+from . import siv_arch
+from .logger import logger
+from .logical_circuit import LogicalCircuit
+from .logical_ram import LogicalRam
+from .mapping_config import AllCircuitConfig
+from .siv_arch import SIVArch
+from .siv_heuristics import calculate_fpga_qor_for_circuit
+from .transform import MAPPER_VERSION, solve_single_circuit_with_metrics
+from .utils import elapsed_timer, file_sha256, sorted_dict_items
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+# Order of the stages in reports
+STAGES = ['PARSE', 'CANDIDATES', 'INITIAL', 'L1',
+          'CLIFF SPLIT', 'L2', 'SHARING', 'SERIALIZE']
+
+
+def scale_logical_circuits(logical_circuits: Dict[int, LogicalCircuit], scale: int) -> Dict[int, LogicalCircuit]:
+    '''
+    Replicate the RAMs and logic blocks of each circuit scale times
+    '''
+    if scale == 1:
+        return logical_circuits
+    scaled_lcs = dict()
+    for circuit_id, lc in logical_circuits.items():
+        num_rams = len(lc.rams)
+        rams = dict()
+        for copy_idx in range(scale):
+            for ram_id, ram in lc.rams.items():
+                scaled_ram_id = copy_idx * num_rams + ram_id
+                rams[scaled_ram_id] = LogicalRam(
+                    circuit_id=circuit_id, ram_id=scaled_ram_id, mode=ram.mode, shape=ram.shape)
+        scaled_lcs[circuit_id] = LogicalCircuit(
+            circuit_id=circuit_id, rams=rams, num_logic_blocks=lc.num_logic_blocks * scale)
+    return scaled_lcs
+
+
+def get_peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KB on Linux
+    return peak_rss // 1024 if sys.platform == 'darwin' else peak_rss
+
+
+class BenchmarkRecord(NamedTuple):
+    timestamp: float
+    mapper_version: str
+    inputs_hash: str
+    arch_str: str
+    num_circuits: int
+    scale: int
+    effort_factor: float
+    stage_elapsed: Dict[str, float]
+    total_elapsed: float
+    peak_rss_kb: Optional[int]
+    peak_traced_kb: Optional[int]
+    fpga_area_geomean: float
+
+    def serialize(self) -> str:
+        return json.dumps(self._asdict(), sort_keys=True)
+
+    @classmethod
+    def deserialize(cls, record_str: str) -> BenchmarkRecord:
+        return cls(**json.loads(record_str))
+
+    def is_comparable(self, other: BenchmarkRecord) -> bool:
+        return (self.inputs_hash, siv_arch.normalize_arch_str(self.arch_str), self.num_circuits, self.scale, self.effort_factor) == \
+            (other.inputs_hash, siv_arch.normalize_arch_str(other.arch_str),
+             other.num_circuits, other.scale, other.effort_factor)
+
+
+def run_benchmark(logic_block_count_filename: str, logical_rams_filename: str, arch_str: str, max_circuits: Optional[int] = None, scale: int = 1, effort_factor: float = 1.0, trace_memory: bool = False) -> BenchmarkRecord:
+    '''
+    Run the full pipeline serially in-process, timing each stage of solve_single_circuit summed over all circuits from the solver metrics.
+    trace_memory - also record the peak of Python allocations, this slows the run down noticeably
+    '''
+    if trace_memory:
+        tracemalloc.start()
+    stage_elapsed = {stage: 0.0 for stage in STAGES}
+    with elapsed_timer() as total_elapsed:
+        with elapsed_timer() as parse_elapsed:
+            lcs = driver.read_logical_circuits(logic_block_count_filename=logic_block_count_filename,
+                                               logical_rams_filename=logical_rams_filename, max_circuits=max_circuits)
+            archs = SIVArch.from_str(raw_checker_str=arch_str)
+        stage_elapsed['PARSE'] = parse_elapsed()
+        lcs = scale_logical_circuits(logical_circuits=lcs, scale=scale)
+
+        acc = AllCircuitConfig()
+        for _, lc in sorted_dict_items(lcs):
+            cc, metrics = solve_single_circuit_with_metrics(
+                archs=archs, logical_circuit=lc, num_circuits=len(lcs), effort_factor=effort_factor)
+            acc.insert_circuit_config(cc)
+            for m in metrics:
+                stage_elapsed[m.stage] = stage_elapsed.get(
+                    m.stage, 0.0) + m.elapsed
+
+        with elapsed_timer() as serialize_elapsed:
+            with open(os.devnull, 'w') as f:
+                f.writelines(acc.serialize_gen(0))
+        stage_elapsed['SERIALIZE'] = serialize_elapsed()
+
+    peak_traced_kb = None
+    if trace_memory:
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_traced_kb = peak_traced // 1024
+
+    fpga_area_geomean = driver.geomean_fpga_area(calculate_fpga_qor_for_circuit(
+        archs=archs, logical_circuit=lcs[circuit_id], circuit_config=cc, allow_sharing=True).fpga_area for circuit_id, cc in sorted_dict_items(acc.circuits))
+
+    return BenchmarkRecord(
+        timestamp=time.time(),
+        mapper_version=MAPPER_VERSION,
+        inputs_hash=' '.join(
+            map(file_sha256, [logic_block_count_filename, logical_rams_filename])),
+        arch_str=arch_str,
+        num_circuits=len(lcs),
+        scale=scale,
+        effort_factor=effort_factor,
+        stage_elapsed=stage_elapsed,
+        total_elapsed=total_elapsed(),
+        peak_rss_kb=get_peak_rss_kb(),
+        peak_traced_kb=peak_traced_kb,
+        fpga_area_geomean=fpga_area_geomean)
+
+
+class RegressionThresholds(NamedTuple):
+    # Relative increase allowed
+    time: float = 0.10
+    memory: float = 0.10
+    area: float = 0.001
+    # Stages faster than this in the baseline are too noisy to compare
+    min_stage_elapsed: float = 0.05
+
+
+DEFAULT_REGRESSION_THRESHOLDS = RegressionThresholds()
+
+
+def compare_to_baseline(record: BenchmarkRecord, baseline: BenchmarkRecord, thresholds: RegressionThresholds = DEFAULT_REGRESSION_THRESHOLDS) -> List[str]:
+    '''
+    Return regressions, empty if none
+    '''
+    regressions = list()
+
+    def compare(name: str, value: Optional[float], baseline_value: Optional[float], threshold: float):
+        if value is None or baseline_value is None or baseline_value <= 0:
+            return
+        change = value / baseline_value - 1
+        logger.warning(
+            f'  {name:<12} {baseline_value:>12.3f} -> {value:>12.3f} ({change*100:+.2f}%)')
+        if change > threshold:
+            regressions.append(
+                f'{name} regressed by {change*100:.2f}% (threshold {threshold*100:.2f}%)')
+
+    for stage in STAGES:
+        baseline_elapsed = baseline.stage_elapsed.get(stage)
+        if baseline_elapsed is not None and baseline_elapsed < thresholds.min_stage_elapsed:
+            continue
+        compare(stage, record.stage_elapsed.get(stage),
+                baseline_elapsed, thresholds.time)
+    compare('TOTAL', record.total_elapsed,
+            baseline.total_elapsed, thresholds.time)
+    compare('PEAK RSS KB', record.peak_rss_kb,
+            baseline.peak_rss_kb, thresholds.memory)
+    compare('PEAK PY KB', record.peak_traced_kb,
+            baseline.peak_traced_kb, thresholds.memory)
+    compare('AREA', record.fpga_area_geomean,
+            baseline.fpga_area_geomean, thresholds.area)
+    return regressions
+
+
+def init(parser):
+    parser.add_argument(
+        '--lb', type=str,
+        default='logic_block_count.txt',
+        help='Input logic_block_count.txt file')
+    parser.add_argument(
+        '--lr', type=str,
+        default='logical_rams.txt',
+        help='Input logical_rams.txt')
+    parser.add_argument(
+        '--arch',
+        type=str,
+        default=siv_arch.DEFAULT_RAM_ARCH_STR,
+        help='Architecture descrption string')
+    parser.add_argument(
+        '--circuits', '-c',
+        type=int,
+        default=None,
+        help='The max number of circuits to process, default is all')
+    parser.add_argument(
+        '--scale',
+        type=int,
+        default=1,
+        help='Replicate the RAMs and logic blocks of each circuit this many times, default is 1')
+    parser.add_argument(
+        '--effort',
+        type=float,
+        default=1.0,
+        help='Scale of the annealing effort, default is 1.0')
+    parser.add_argument(
+        '--trace_memory',
+        action='store_true',
+        help='Also record the peak of Python allocations (slower)')
+    parser.add_argument(
+        '--history',
+        type=str,
+        default='benchmark_history.jsonl',
+        help='Append the record to this JSON lines file, default is benchmark_history.jsonl')
+    parser.add_argument(
+        '--baseline',
+        type=str,
+        default='benchmark_baseline.json',
+        help='Compare against the record in this file, default is benchmark_baseline.json')
+    parser.add_argument(
+        '--save_baseline',
+        action='store_true',
+        help='Store the record as the new baseline')
+    parser.add_argument(
+        '--time_threshold',
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLDS.time,
+        help=f'Allowed relative increase of elapsed time, default is {DEFAULT_REGRESSION_THRESHOLDS.time}')
+    parser.add_argument(
+        '--memory_threshold',
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLDS.memory,
+        help=f'Allowed relative increase of peak memory, default is {DEFAULT_REGRESSION_THRESHOLDS.memory}')
+    parser.add_argument(
+        '--area_threshold',
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLDS.area,
+        help=f'Allowed relative increase of FPGA area geomean, default is {DEFAULT_REGRESSION_THRESHOLDS.area}')
+
+
+def main(args) -> int:
+    '''
+    Return exit code, 1 if regressed against the baseline
+    '''
+    logger_module.init_logger()
+    # Keep the solver quiet, only the benchmark reports
+    logger.setLevel('ERROR')
+    record = run_benchmark(logic_block_count_filename=args.lb, logical_rams_filename=args.lr, arch_str=args.arch,
+                           max_circuits=args.circuits, scale=args.scale, effort_factor=args.effort, trace_memory=args.trace_memory)
+    logger.setLevel('WARNING')
+
+    logger.warning(
+        f'Benchmark of {record.num_circuits} circuits (scale={record.scale}, effort={record.effort_factor:g}):')
+    for stage in STAGES:
+        logger.warning(f'  {stage:<12} {record.stage_elapsed[stage]:.3f}s')
+    logger.warning(f'  {"TOTAL":<12} {record.total_elapsed:.3f}s')
+    logger.warning(
+        f'  Peak RSS {record.peak_rss_kb} KB, peak Python allocations {record.peak_traced_kb} KB')
+    logger.warning(
+        f'  Geometric Average Area: {record.fpga_area_geomean:.6E}')
+
+    with open(args.history, 'a') as f:
+        f.write(record.serialize() + '\n')
+    logger.warning(f'Appended to {args.history}')
+
+    exit_code = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = BenchmarkRecord.deserialize(f.read())
+        if not record.is_comparable(baseline):
+            logger.warning(
+                f'Baseline {args.baseline} was recorded on different inputs, arch, scale or effort, not compared')
+        else:
+            logger.warning(f'Compared to baseline {args.baseline}:')
+            regressions = compare_to_baseline(record=record, baseline=baseline, thresholds=RegressionThresholds(
+                time=args.time_threshold, memory=args.memory_threshold, area=args.area_threshold))
+            for regression in regressions:
+                logger.error(regression)
+            exit_code = 1 if len(regressions) > 0 else 0
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            f.write(record.serialize())
+        logger.warning(f'Saved baseline to {args.baseline}')
+    return exit_code
+
+
+# python3 -m ram_mapper.benchmark --circuits=10 --scale=2
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    init(parser)
+    sys.exit(main(parser.parse_args()))
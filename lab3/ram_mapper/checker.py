@@ -0,0 +1,256 @@
+from __future__ import annotations
+import argparse
+import sys
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import driver
+from . import logger as logger_module
+from . import siv_arch
+from .logger import logger
+from .logical_circuit import LogicalCircuit
+from .logical_ram import RamMode
+from .mapping_config import AllCircuitConfig, CircuitConfig, LogicalRamConfig, RamSplitDimension, parse_grouped_CircuitConfig_with_extra_lut_counts
+from .siv_arch import SIVArch
+from .siv_heuristics import CircuitQor, calculate_fpga_qor_for_circuit
+from .utils import elapsed_timer, sorted_dict_items
+
+MAX_NUM_SERIES = 16
+
+
+class CheckResult(NamedTuple):
+    violations: List[str]
+    circuit_qors: List[CircuitQor]
+    fpga_area_geomean: Optional[float]
+
+    def is_legal(self) -> bool:
+        return len(self.violations) == 0
+
+
+def check_LogicalRamConfig(archs: SIVArch, lrc: LogicalRamConfig, ram_mode: RamMode, msg_header: str) -> List[str]:
+    '''
+    Check the subtree of lrc, except for the sharing rules of the PhysicalRamConfig
+    '''
+    violations = list()
+    if lrc.prc is not None:
+        prc = lrc.prc
+        if prc.ram_arch_id not in archs.ram_archs:
+            return [f'{msg_header}: Unknown RAM Type {prc.ram_arch_id}']
+        ram_arch = archs.ram_archs[prc.ram_arch_id]
+        if prc.ram_mode not in ram_arch.get_supported_mode():
+            violations.append(
+                f'{msg_header}: Type {prc.ram_arch_id} does not support {prc.ram_mode.name}')
+        elif prc.physical_shape not in ram_arch.get_shapes_for_mode(prc.ram_mode):
+            violations.append(
+                f'{msg_header}: Type {prc.ram_arch_id} has no {prc.physical_shape} shape in {prc.ram_mode.name}')
+        num_series = prc.physical_shape_fit.num_series
+        num_parallel = prc.physical_shape_fit.num_parallel
+        if not 1 <= num_series <= MAX_NUM_SERIES or num_parallel < 1:
+            violations.append(
+                f'{msg_header}: S {num_series} P {num_parallel} is out of range [1, {MAX_NUM_SERIES}], [1, inf)')
+        prc_shape = prc.get_shape()
+        if prc_shape.width < lrc.logical_shape.width or prc_shape.depth < lrc.logical_shape.depth:
+            violations.append(
+                f'{msg_header}: Physical {prc_shape} does not cover logical {lrc.logical_shape}')
+    else:
+        clrc = lrc.clrc
+        shape = lrc.logical_shape
+        shape_l = clrc.lrc_l.logical_shape
+        shape_r = clrc.lrc_r.logical_shape
+        if clrc.split == RamSplitDimension.series:
+            is_exact_split = shape_l.width == shape.width and shape_r.width == shape.width and shape_l.depth + \
+                shape_r.depth == shape.depth
+        else:
+            is_exact_split = shape_l.depth == shape.depth and shape_r.depth == shape.depth and shape_l.width + \
+                shape_r.width == shape.width
+        if not is_exact_split:
+            violations.append(
+                f'{msg_header}: {clrc.split.name} split of {shape} into {shape_l} and {shape_r}')
+        violations += check_LogicalRamConfig(archs=archs,
+                                             lrc=clrc.lrc_l, ram_mode=ram_mode, msg_header=msg_header)
+        violations += check_LogicalRamConfig(archs=archs,
+                                             lrc=clrc.lrc_r, ram_mode=ram_mode, msg_header=msg_header)
+    return violations
+
+
+def check_CircuitConfig(archs: SIVArch, logical_circuit: LogicalCircuit, circuit_config: CircuitConfig, extra_lut_counts: Optional[Dict[int, int]] = None) -> List[str]:
+    '''
+    extra_lut_counts - {ram_id: extra_lut_count} as written in the mapping file, checked against the recomputed ones if given
+    Return violations, empty if legal
+    '''
+    circuit_id = circuit_config.circuit_id
+    violations = list()
+    missing_ram_ids = logical_circuit.rams.keys() - circuit_config.rams.keys()
+    if len(missing_ram_ids) > 0:
+        violations.append(
+            f'Circuit={circuit_id}: Unmapped RAMs {sorted(missing_ram_ids)}')
+    unknown_ram_ids = circuit_config.rams.keys() - logical_circuit.rams.keys()
+    if len(unknown_ram_ids) > 0:
+        violations.append(
+            f'Circuit={circuit_id}: Unknown RAMs {sorted(unknown_ram_ids)}')
+
+    # {prc_id: [(ram_id, lrc)]}
+    prc_users: DefaultDict[int, List[Tuple[int, LogicalRamConfig]]] = defaultdict(list)
+    for ram_id, rc in sorted_dict_items(circuit_config.rams):
+        if ram_id not in logical_circuit.rams:
+            continue
+        msg_header = f'Circuit={circuit_id} Ram={ram_id}'
+        logical_ram = logical_circuit.rams[ram_id]
+        if rc.get_shape() != logical_ram.shape:
+            violations.append(
+                f'{msg_header}: Logical {rc.get_shape()} does not match {logical_ram.shape}')
+        ram_violations = check_LogicalRamConfig(
+            archs=archs, lrc=rc.lrc, ram_mode=logical_ram.mode, msg_header=msg_header)
+        violations += ram_violations
+        rc.execute_on_leaf(
+            lambda lrc: prc_users[lrc.prc.id].append((ram_id, lrc)))
+        if extra_lut_counts is not None and len(ram_violations) == 0:
+            extra_lut_count = rc.get_extra_lut_count()
+            if extra_lut_counts[ram_id] != extra_lut_count:
+                violations.append(
+                    f'{msg_header}: Extra LUTs {extra_lut_counts[ram_id]} does not match {extra_lut_count}')
+
+    for prc_id, users in sorted_dict_items(prc_users):
+        prc = users[0][1].prc
+        ram_ids = [ram_id for ram_id, _ in users]
+        msg_header = f'Circuit={circuit_id} ID={prc_id}'
+        if len(users) == 1:
+            ram_mode = logical_circuit.rams[ram_ids[0]].mode
+            if prc.ram_mode != ram_mode:
+                violations.append(
+                    f'{msg_header}: {prc.ram_mode.name} does not match {ram_mode.name} of Ram={ram_ids[0]}')
+            continue
+        # Sharing: two single-port RAMs in one true dual port physical RAM
+        if len(users) > 2 or ram_ids[0] == ram_ids[1]:
+            violations.append(
+                f'{msg_header}: Shared by {len(users)} leaves of RAMs {ram_ids}, only 2 RAMs can share')
+            continue
+        if users[1][1].prc != prc:
+            violations.append(
+                f'{msg_header}: Leaves of RAMs {ram_ids} do not agree on the physical RAM')
+            continue
+        for ram_id in ram_ids:
+            if logical_circuit.rams[ram_id].mode.num_ports() != 1:
+                violations.append(
+                    f'{msg_header}: Shared Ram={ram_id} is {logical_circuit.rams[ram_id].mode.name}, not single-port')
+        if prc.ram_mode != RamMode.TrueDualPort:
+            violations.append(
+                f'{msg_header}: Shared physical RAM is {prc.ram_mode.name}, not TrueDualPort')
+        prc_shape = prc.get_shape()
+        if sum(lrc.logical_shape.depth for _, lrc in users) > prc_shape.depth:
+            violations.append(
+                f'{msg_header}: Aggregate depth of RAMs {ram_ids} exceeds physical {prc_shape}')
+    return violations
+
+
+def check_circuits(archs: SIVArch, logical_circuits: Dict[int, LogicalCircuit], circuit_configs: Iterable[Tuple[CircuitConfig, Optional[Dict[int, int]]]]) -> CheckResult:
+    '''
+    circuit_configs - [(CircuitConfig, {ram_id: extra_lut_count} or None)], consumed one circuit at a time
+    '''
+    violations: List[str] = list()
+    circuit_qors: List[CircuitQor] = list()
+    seen_circuit_ids = set()
+    for cc, extra_lut_counts in circuit_configs:
+        if cc.circuit_id in seen_circuit_ids:
+            violations.append(
+                f'Circuit={cc.circuit_id}: Mapped more than once')
+            continue
+        seen_circuit_ids.add(cc.circuit_id)
+        if cc.circuit_id not in logical_circuits:
+            violations.append(f'Circuit={cc.circuit_id}: Unknown circuit')
+            continue
+        circuit_violations = check_CircuitConfig(
+            archs=archs, logical_circuit=logical_circuits[cc.circuit_id], circuit_config=cc, extra_lut_counts=extra_lut_counts)
+        violations += circuit_violations
+        if len(circuit_violations) == 0:
+            circuit_qors.append(calculate_fpga_qor_for_circuit(
+                archs=archs, logical_circuit=logical_circuits[cc.circuit_id], circuit_config=cc, allow_sharing=True))
+
+    missing_circuit_ids = logical_circuits.keys() - seen_circuit_ids
+    if len(missing_circuit_ids) > 0:
+        violations.append(f'Unmapped circuits {sorted(missing_circuit_ids)}')
+
+    fpga_area_geomean = None
+    if len(violations) == 0 and len(circuit_qors) > 0:
+        circuit_qors.sort(key=lambda qor: qor.circuit_id)
+        fpga_area_geomean = driver.geomean_fpga_area(
+            map(lambda qor: qor.fpga_area, circuit_qors))
+    return CheckResult(violations=violations, circuit_qors=circuit_qors, fpga_area_geomean=fpga_area_geomean)
+
+
+def check_AllCircuitConfig(archs: SIVArch, logical_circuits: Dict[int, LogicalCircuit], acc: AllCircuitConfig) -> CheckResult:
+    return check_circuits(archs=archs, logical_circuits=logical_circuits,
+                          circuit_configs=((cc, None) for _, cc in sorted_dict_items(acc.circuits)))
+
+
+def check_mapping_file(archs: SIVArch, logical_circuits: Dict[int, LogicalCircuit], filename: str) -> CheckResult:
+    '''
+    Stream over the mapping file, only one circuit is held in memory at a time
+    '''
+    logger.info(f'Checking {filename}')
+    unknown_circuit_ids: List[int] = list()
+    with open(filename, 'r') as f:
+        try:
+            check_result = check_circuits(archs=archs, logical_circuits=logical_circuits,
+                                          circuit_configs=parse_grouped_CircuitConfig_with_extra_lut_counts(
+                                              iter(f.readline, ''), logical_circuits, skip_unknown_circuits=True, on_unknown_circuit=unknown_circuit_ids.append))
+        except (ValueError, IndexError, KeyError, StopIteration) as e:
+            return CheckResult(violations=[f'Malformed {filename}: {e!r}'], circuit_qors=[], fpga_area_geomean=None)
+    if len(unknown_circuit_ids) > 0:
+        check_result = check_result._replace(violations=check_result.violations + [
+            f'Circuit={circuit_id}: Unknown circuit' for circuit_id in unknown_circuit_ids], fpga_area_geomean=None)
+    return check_result
+
+
+def init(parser):
+    parser.add_argument(
+        'mapping', type=str,
+        help='Input mapping.txt to check')
+    parser.add_argument(
+        '--lb', type=str,
+        default='logic_block_count.txt',
+        help='Input logic_block_count.txt file')
+    parser.add_argument(
+        '--lr', type=str,
+        default='logical_rams.txt',
+        help='Input logical_rams.txt')
+    parser.add_argument(
+        '--arch',
+        type=str,
+        default=siv_arch.DEFAULT_RAM_ARCH_STR,
+        help='Architecture descrption string')
+
+
+def main(args) -> int:
+    '''
+    Return exit code, 0 if the mapping is legal
+    '''
+    logger_module.init_logger()
+    with elapsed_timer() as elapsed:
+        lcs = driver.read_logical_circuits(
+            logic_block_count_filename=args.lb, logical_rams_filename=args.lr)
+        archs = SIVArch.from_str(raw_checker_str=args.arch)
+        result = check_mapping_file(
+            archs=archs, logical_circuits=lcs, filename=args.mapping)
+
+    for violation in result.violations:
+        logger.error(violation)
+    if not result.is_legal():
+        logger.error(
+            f'{len(result.violations)} violations in {args.mapping}')
+        return 1
+
+    logger.info(f'{CircuitQor.banner(len(archs.ram_archs))}')
+    for qor in result.circuit_qors:
+        logger.info(f'{qor.serialize()}')
+    logger.info(
+        f'Geometric Average Area for {len(result.circuit_qors)} circuits: {result.fpga_area_geomean:.6E}')
+    logger.info(f'Checked in {elapsed():.3f} seconds')
+    return 0
+
+
+# python3 -m ram_mapper.checker --arch="-l 1 1 -b 8192 32 10 1 -b 131072 128 300 1" mapping.txt
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    init(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import glob
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .logger import logger
+from .logical_circuit import LogicalCircuit
+from .mapping_config import CircuitConfig, parse_grouped_CircuitConfig
+from .siv_arch import normalize_arch_str
+from .solver_metrics import SolverMetrics, read_SolverMetrics_from_file, serialize_SolverMetrics_to_file
+from .transform import MAPPER_VERSION
+from .utils import file_sha256
+
+
+class RunManifest(NamedTuple):
+    '''
+    Everything the solved circuits of a run depend on, the solver seeds are derived from num_circuits
+    '''
+    mapper_version: str
+    inputs_hash: str
+    arch_str: str
+    effort_factor: float
+    num_circuits: int
+    warm_start_hash: Optional[str]
+
+    @classmethod
+    def create(cls, logic_block_count_filename: str, logical_rams_filename: str, arch_str: str, effort_factor: float, num_circuits: int, warm_start_filename: Optional[str]) -> RunManifest:
+        return cls(mapper_version=MAPPER_VERSION,
+                   inputs_hash=' '.join(
+                       map(file_sha256, [logic_block_count_filename, logical_rams_filename])),
+                   arch_str=normalize_arch_str(arch_str),
+                   effort_factor=effort_factor,
+                   num_circuits=num_circuits,
+                   warm_start_hash=file_sha256(warm_start_filename) if warm_start_filename is not None else None)
+
+    def serialize(self) -> str:
+        return json.dumps(self._asdict(), sort_keys=True, indent=4)
+
+    @classmethod
+    def deserialize(cls, manifest_str: str) -> RunManifest:
+        return cls(**json.loads(manifest_str))
+
+
+def write_atomically(filename: str, content: str):
+    '''
+    Readers see either the previous or the complete new file, even if the process is killed
+    '''
+    tmp_filename = f'{filename}.tmp{os.getpid()}'
+    with open(tmp_filename, 'w') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+
+
+class RunCheckpoint:
+    '''
+    Run directory of the per-circuit results, persisted as they complete:
+
+    run_dir/manifest.json
+    run_dir/circuits/<circuit_id>.txt            mapping of the circuit, its presence marks the circuit as solved
+    run_dir/circuits/<circuit_id>_metrics.jsonl  solver metrics of the circuit
+    '''
+
+    def __init__(self, run_dir: str, manifest: RunManifest, resume: bool):
+        '''
+        resume - keep the circuits solved by a previous run with the same manifest, otherwise start over
+        '''
+        self._run_dir = run_dir
+        self._circuits_dir = os.path.join(run_dir, 'circuits')
+        manifest_filename = os.path.join(run_dir, 'manifest.json')
+        os.makedirs(self._circuits_dir, exist_ok=True)
+
+        if resume and os.path.exists(manifest_filename):
+            with open(manifest_filename, 'r') as f:
+                prior_manifest = RunManifest.deserialize(f.read())
+            mismatches = [field for field in RunManifest._fields if getattr(
+                prior_manifest, field) != getattr(manifest, field)]
+            if len(mismatches) > 0:
+                raise ValueError(
+                    f'Cannot resume {run_dir}, it was run with different {", ".join(mismatches)}')
+            logger.warning(f'Resuming {run_dir}')
+        else:
+            # Start over, stale results must not be mixed in
+            for filename in glob.glob(os.path.join(self._circuits_dir, '*')):
+                os.remove(filename)
+            write_atomically(manifest_filename, manifest.serialize())
+
+    def circuit_filename(self, circuit_id: int) -> str:
+        return os.path.join(self._circuits_dir, f'{circuit_id}.txt')
+
+    def metrics_filename(self, circuit_id: int) -> str:
+        return os.path.join(self._circuits_dir, f'{circuit_id}_metrics.jsonl')
+
+    def load_solved(self, logical_circuits: Dict[int, LogicalCircuit]) -> Dict[int, Tuple[CircuitConfig, List[SolverMetrics]]]:
+        '''
+        Return {circuit_id: (circuit_config, metrics)} of the circuits in logical_circuits solved by previous runs
+        '''
+        solved = dict()
+        for circuit_id in logical_circuits.keys():
+            circuit_filename = self.circuit_filename(circuit_id)
+            if not os.path.exists(circuit_filename):
+                continue
+            with open(circuit_filename, 'r') as f:
+                circuit_configs = list(parse_grouped_CircuitConfig(
+                    iter(f.readline, ''), logical_circuits))
+            metrics = read_SolverMetrics_from_file(self.metrics_filename(
+                circuit_id)) if os.path.exists(self.metrics_filename(circuit_id)) else []
+            solved[circuit_id] = (circuit_configs[0], metrics)
+        logger.warning(
+            f'Loaded {len(solved)} solved circuits from {self._run_dir}')
+        return solved
+
+    def save(self, circuit_config: CircuitConfig, metrics: List[SolverMetrics]):
+        circuit_id = circuit_config.circuit_id
+        serialize_SolverMetrics_to_file(
+            self.metrics_filename(circuit_id), metrics)
+        # Last, as it marks the circuit as solved
+        write_atomically(self.circuit_filename(circuit_id),
+                         circuit_config.serialize(0))
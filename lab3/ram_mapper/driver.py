@@ -1,13 +1,20 @@
+import argparse
+import contextlib
+import heapq
 import itertools
 import os
 import statistics
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from . import utils
 from . import siv_heuristics
 from . import transform
 from . import logical_circuit
 from . import siv_arch
+from . import mapping_config
+from . import solver_metrics
+from . import profiler
+from .checkpoint import RunCheckpoint, RunManifest
 from .logger import logger
 
 
@@ -52,12 +59,63 @@ def init(parser):
         default=None,
         help='The max number of circuits to process, default is all'
     )
+    parser.add_argument(
+        '--shard',
+        type=parse_shard,
+        default=None,
+        help='i/N, only solve the i-th (0-based) of N shards balanced by estimated cost, and also output the per-circuit QoR as <out>_qor.txt for python3 -m ram_mapper.merge'
+    )
     parser.add_argument(
         '--arch',
         type=str,
         default=siv_arch.DEFAULT_RAM_ARCH_STR,
         help='Architecture descrption string'
     )
+    parser.add_argument(
+        '--warm_start',
+        type=str,
+        default=None,
+        help='Prior mapping.txt (possibly from a different arch) to repair and re-anneal from, default is cold start'
+    )
+    parser.add_argument(
+        '--effort',
+        type=float,
+        default=1.0,
+        help='Scale of the annealing effort, default is 1.0'
+    )
+    parser.add_argument(
+        '--metrics',
+        type=str,
+        default=None,
+        help='Output solver metrics as JSON lines, default is <out>_metrics.jsonl next to the mapping output'
+    )
+    parser.add_argument(
+        '--no_metrics',
+        action='store_true',
+        help='Do not output solver metrics'
+    )
+    parser.add_argument(
+        '--run_dir',
+        type=str,
+        default=None,
+        help='Persist each solved circuit to this directory as soon as it completes, see --resume'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Skip the circuits already solved in --run_dir by a run with the same inputs, arch, effort and warm start'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Read, solve and write the circuits one at a time in the input order, memory is bounded by the circuits in flight instead of the input size, also outputs <out>_qor.txt'
+    )
+    parser.add_argument(
+        '--profile',
+        type=str,
+        default=None,
+        help='Profile the main and every worker process per solver stage, dumps and the merged report.txt are written to this directory'
+    )
 
 
 def main(args) -> float:
@@ -80,24 +138,113 @@ def geomean_fpga_area(fpga_area_list: Iterable[int]) -> float:
     return geomean
 
 
+def read_logical_circuits(logic_block_count_filename: str, logical_rams_filename: str, max_circuits: Optional[int] = None) -> Dict[int, logical_circuit.LogicalCircuit]:
+    '''
+    Only keep the first max_circuits circuits if specified
+    '''
+    lcs = logical_circuit.read_LogicalCircuit_from_file(
+        logicblock_filename=logic_block_count_filename, loigicalram_filename=logical_rams_filename)
+
+    if max_circuits is not None and max_circuits < len(lcs):
+        assert max_circuits > 0
+        lcs = dict(itertools.islice(
+            utils.sorted_dict_items(lcs), max_circuits))
+    return lcs
+
+
+def parse_shard(shard_str: str) -> Tuple[int, int]:
+    '''
+    "i/N" -> (i, N)
+    '''
+    try:
+        shard_index, num_shards = map(int, shard_str.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f'Invalid shard {shard_str}, expected i/N')
+    if not 0 <= shard_index < num_shards:
+        raise argparse.ArgumentTypeError(
+            f'Invalid shard {shard_str}, expected 0 <= i < N')
+    return (shard_index, num_shards)
+
+
+def estimate_circuit_cost(lc: logical_circuit.LogicalCircuit) -> int:
+    '''
+    The solver time grows with the number of RAMs
+    '''
+    return len(lc.rams)
+
+
+def select_shard(logical_circuits: Dict[int, logical_circuit.LogicalCircuit], shard_index: int, num_shards: int) -> Dict[int, logical_circuit.LogicalCircuit]:
+    '''
+    Longest-processing-time-first assignment of the circuits to num_shards shards, deterministic for the same input.
+    Return the circuits of shard shard_index in circuit order
+    '''
+    # (estimated cost, shard index), so ties go to the lowest shard
+    shard_costs = [(0, idx) for idx in range(num_shards)]
+    selected_circuit_ids = list()
+    for lc in sorted(logical_circuits.values(), key=lambda lc: (-estimate_circuit_cost(lc), lc.circuit_id)):
+        cost, idx = heapq.heappop(shard_costs)
+        if idx == shard_index:
+            selected_circuit_ids.append(lc.circuit_id)
+        heapq.heappush(shard_costs, (cost + estimate_circuit_cost(lc), idx))
+    return {circuit_id: logical_circuits[circuit_id] for circuit_id in sorted(selected_circuit_ids)}
+
+
+def default_qor_filename(mapping_filename: str) -> str:
+    '''
+    mapping.txt -> mapping_qor.txt, in the same directory
+    '''
+    return os.path.splitext(mapping_filename)[0] + '_qor.txt'
+
+
+def calculate_fpga_qor_for_all_circuits(archs: siv_arch.SIVArch, logical_circuits: Dict[int, logical_circuit.LogicalCircuit], acc: mapping_config.AllCircuitConfig, report_circuit: Sequence[int] = ()) -> List[siv_heuristics.CircuitQor]:
+    '''
+    report_circuit - Report QoR for circuit(s), -1 to print all
+    '''
+    if len(report_circuit) > 0:
+        logger.warning('=================')
+        logger.warning('Final Area Report')
+    print_report_circuit_for_all = -1 in report_circuit
+    circuit_fpga_qor_list: List[siv_heuristics.CircuitQor] = list()
+    for circuit_id, cc in utils.sorted_dict_items(acc.circuits):
+        circuit_fpga_qor = siv_heuristics.calculate_fpga_qor_for_circuit(
+            archs=archs,
+            logical_circuit=logical_circuits[circuit_id],
+            circuit_config=cc,
+            allow_sharing=True,
+            skip_area=False,
+            verbose=print_report_circuit_for_all or (circuit_id in report_circuit))
+        circuit_fpga_qor_list.append(circuit_fpga_qor)
+    if len(report_circuit) > 0:
+        logger.warning('=================')
+    return circuit_fpga_qor_list
+
+
 # python3 -m ram_mapper --lb=test0/logic_block_count.txt --lr=test0/logical_rams.txt --out=test0/mapping.txt
 
 def run(args) -> float:
     '''
     Return fpga_area_geomean
     '''
+    if args.stream:
+        return run_streaming(args)
+
     logic_block_count_filename = args.lb
     logical_rams_filename = args.lr
     mapping_filename = args.out
 
     # Logical input
-    lcs = logical_circuit.read_LogicalCircuit_from_file(
-        logicblock_filename=logic_block_count_filename, loigicalram_filename=logical_rams_filename)
-
-    if args.circuits is not None and args.circuits < len(lcs):
-        assert args.circuits > 0
-        lcs = dict(itertools.islice(
-            utils.sorted_dict_items(lcs), args.circuits))
+    lcs = read_logical_circuits(logic_block_count_filename=logic_block_count_filename,
+                                logical_rams_filename=logical_rams_filename, max_circuits=args.circuits)
+    # Before sharding, the solver seeds depend on it
+    num_circuits = len(lcs)
+    if args.shard is not None:
+        shard_index, num_shards = args.shard
+        lcs = select_shard(logical_circuits=lcs,
+                           shard_index=shard_index, num_shards=num_shards)
+        logger.warning(
+            f'Shard {shard_index}/{num_shards}: {len(lcs)} of {num_circuits} circuits')
+        assert len(lcs) > 0, 'More shards than circuits'
 
     # Arch input
     archs = siv_arch.SIVArch.from_str(raw_checker_str=args.arch)
@@ -106,30 +253,54 @@ def run(args) -> float:
         logger.warning(ram_arch)
     logger.warning(archs.lb_arch)
 
+    # Warm start input
+    warm_start = None
+    if args.warm_start is not None:
+        warm_start = mapping_config.read_AllCircuitConfig_from_file(
+            filename=args.warm_start, logical_circuits=lcs, skip_unknown_circuits=True)
+
+    # Checkpoint
+    checkpoint = None
+    solved = dict()
+    if args.run_dir is not None:
+        checkpoint = RunCheckpoint(run_dir=args.run_dir, manifest=RunManifest.create(
+            logic_block_count_filename=logic_block_count_filename, logical_rams_filename=logical_rams_filename,
+            arch_str=args.arch, effort_factor=args.effort, num_circuits=num_circuits, warm_start_filename=args.warm_start), resume=args.resume)
+        if args.resume:
+            solved = checkpoint.load_solved(logical_circuits=lcs)
+    else:
+        assert not args.resume, '--resume requires --run_dir'
+
     # Mapping output
+    metrics: List[solver_metrics.SolverMetrics] = list()
+    if args.profile is not None:
+        profiler.prepare_profile_dir(args.profile)
+        profiler.start(args.profile)
     acc = transform.solve_all_circuits(
-        archs=archs, logical_circuits=lcs, args=args)
+        archs=archs, logical_circuits={circuit_id: lc for circuit_id, lc in lcs.items() if circuit_id not in solved}, args=args, warm_start=warm_start, effort_factor=args.effort,
+        metrics=metrics, profile_dir=args.profile, num_circuits=num_circuits, on_solved=checkpoint.save if checkpoint is not None else None)
+    for circuit_config, circuit_metrics in solved.values():
+        acc.insert_circuit_config(cc=circuit_config)
+        metrics += circuit_metrics
+    # Stable, the steps of a circuit stay in order
+    metrics.sort(key=lambda m: m.circuit_id)
+    if args.profile is not None:
+        profiler.stop_and_dump()
+        profiler.write_report(args.profile)
     assert len(acc.circuits) == len(
         lcs), 'Final mapping result must contain same number of circuits as logical_ram input'
     acc.serialize_to_file(mapping_filename)
+    if not args.no_metrics:
+        solver_metrics.serialize_SolverMetrics_to_file(
+            args.metrics if args.metrics is not None else solver_metrics.default_metrics_filename(mapping_filename), metrics)
 
     # Calculate FPGA QoR
-    if len(args.report_circuit) > 0:
-        logger.warning('=================')
-        logger.warning('Final Area Report')
-    print_report_circuit_for_all = -1 in args.report_circuit
-    circuit_fpga_qor_list: List[siv_heuristics.CircuitQor] = list()
-    for circuit_id, cc in utils.sorted_dict_items(acc.circuits):
-        circuit_fpga_qor = siv_heuristics.calculate_fpga_qor_for_circuit(
-            archs=archs,
-            logical_circuit=lcs[circuit_id],
-            circuit_config=cc,
-            allow_sharing=True,
-            skip_area=False,
-            verbose=print_report_circuit_for_all or (circuit_id in args.report_circuit))
-        circuit_fpga_qor_list.append(circuit_fpga_qor)
-    if len(args.report_circuit) > 0:
-        logger.warning('=================')
+    circuit_fpga_qor_list = calculate_fpga_qor_for_all_circuits(
+        archs=archs, logical_circuits=lcs, acc=acc, report_circuit=args.report_circuit)
+
+    if args.shard is not None:
+        siv_heuristics.serialize_CircuitQor_to_file(filename=default_qor_filename(
+            mapping_filename), circuit_qors=circuit_fpga_qor_list, num_types=len(archs.ram_archs))
 
     qor_banner = siv_heuristics.CircuitQor.banner(len(archs.ram_archs))
     logger.warning(f'{qor_banner}')
@@ -142,3 +313,71 @@ def run(args) -> float:
     logger.warning(
         f'Geometric Average Area for {len(circuit_fpga_qor_list)} circuits: {fpga_area_geomean:.6E}')
     return fpga_area_geomean
+
+
+def run_streaming(args) -> float:
+    '''
+    Return fpga_area_geomean
+    The RAMs of each circuit must be contiguous in the logical RAM input, the outputs are in the input order
+    '''
+    assert args.shard is None and args.warm_start is None and args.run_dir is None, \
+        '--stream does not support --shard, --warm_start or --run_dir'
+    mapping_filename = args.out
+
+    # Small, one count per circuit
+    logic_blocks = logical_circuit.read_LogicBlock_from_file(args.lb)
+    lcs = logical_circuit.iter_LogicalCircuit_from_file(
+        logic_blocks=logic_blocks, loigicalram_filename=args.lr)
+    num_circuits = len(logic_blocks)
+    if args.circuits is not None and args.circuits < num_circuits:
+        assert args.circuits > 0
+        num_circuits = args.circuits
+        lcs = itertools.islice(lcs, num_circuits)
+
+    archs = siv_arch.SIVArch.from_str(raw_checker_str=args.arch)
+    logger.warning('SIV Archs:')
+    for _, ram_arch in utils.sorted_dict_items(archs.ram_archs):
+        logger.warning(ram_arch)
+    logger.warning(archs.lb_arch)
+
+    if args.profile is not None:
+        profiler.prepare_profile_dir(args.profile)
+        profiler.start(args.profile)
+    print_report_circuit_for_all = -1 in args.report_circuit
+    qor_banner = siv_heuristics.CircuitQor.banner(len(archs.ram_archs))
+    logger.warning(f'{qor_banner}')
+    metrics_filename = args.metrics if args.metrics is not None else solver_metrics.default_metrics_filename(
+        mapping_filename)
+    fpga_area_list: List[int] = list()
+    logger.info(f'Writing to {mapping_filename}')
+    with contextlib.ExitStack() as stack:
+        mapping_file = stack.enter_context(open(mapping_filename, 'w'))
+        qor_file = stack.enter_context(
+            open(default_qor_filename(mapping_filename), 'w'))
+        metrics_file = stack.enter_context(
+            open(metrics_filename, 'w')) if not args.no_metrics else None
+
+        mapping_file.write(f'// Num_Circuits {num_circuits}\n')
+        qor_file.write(qor_banner + '\n')
+        for lc, cc, circuit_metrics in transform.solve_circuit_stream(
+                archs=archs, logical_circuits=lcs, num_circuits=num_circuits, args=args, effort_factor=args.effort, profile_dir=args.profile):
+            mapping_file.writelines(cc.serialize_gen(0))
+            if metrics_file is not None:
+                metrics_file.writelines(
+                    m.serialize() + '\n' for m in circuit_metrics)
+            qor = siv_heuristics.calculate_fpga_qor_for_circuit(
+                archs=archs, logical_circuit=lc, circuit_config=cc, allow_sharing=True, skip_area=False,
+                verbose=print_report_circuit_for_all or (lc.circuit_id in args.report_circuit))
+            qor_file.write(qor.serialize() + '\n')
+            logger.warning(f'{qor.serialize()}')
+            fpga_area_list.append(qor.fpga_area)
+    if args.profile is not None:
+        profiler.stop_and_dump()
+        profiler.write_report(args.profile)
+    assert len(fpga_area_list) == num_circuits, \
+        'Final mapping result must contain same number of circuits as logical_ram input'
+
+    fpga_area_geomean = geomean_fpga_area(fpga_area_list)
+    logger.warning(
+        f'Geometric Average Area for {len(fpga_area_list)} circuits: {fpga_area_geomean:.6E}')
+    return fpga_area_geomean
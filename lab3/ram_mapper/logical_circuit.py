@@ -5,7 +5,7 @@ from typing import Dict, Iterator, NamedTuple, Tuple
 from .utils import make_sorted_1d_dict
 from .logger import logger
 
-from .logical_ram import LogicalRam, read_grouped_LogicalRam_from_file
+from .logical_ram import LogicalRam, iter_grouped_LogicalRam, read_grouped_LogicalRam_from_file, serialize_grouped_LogicalRam_to_file
 
 
 class LogicalCircuit(NamedTuple):
@@ -54,6 +54,14 @@ def read_LogicBlock_from_file(filename: str) -> OrderedDict[int, int]:
         return parse_LogicBlock(iter(f.readline, ''))
 
 
+def serialize_LogicBlock_to_file(filename: str, logic_blocks: OrderedDict[int, int]):
+    logger.info(f'Writing to {filename}')
+    with open(filename, 'w') as f:
+        f.write('Circuit\t"# Logic blocks (N=10, k=6, fracturable)"\n')
+        f.writelines(f'{circuit_id}\t{num_logic_blocks}\n' for circuit_id,
+                     num_logic_blocks in logic_blocks.items())
+
+
 def merge_grouped_LogicalCircuit(logic_blocks: OrderedDict[int, int], logical_rams: OrderedDict[int, OrderedDict[int, LogicalRam]]) -> Dict[int, LogicalCircuit]:
     assert logic_blocks.keys() == logical_rams.keys()
     result = {circuit_id: LogicalCircuit(
@@ -64,3 +72,25 @@ def merge_grouped_LogicalCircuit(logic_blocks: OrderedDict[int, int], logical_ra
 def read_LogicalCircuit_from_file(logicblock_filename: str, loigicalram_filename: str) -> Dict[int, LogicalCircuit]:
     return merge_grouped_LogicalCircuit(logic_blocks=read_LogicBlock_from_file(logicblock_filename),
                                         logical_rams=read_grouped_LogicalRam_from_file(loigicalram_filename))
+
+
+def iter_LogicalCircuit_from_file(logic_blocks: Dict[int, int], loigicalram_filename: str) -> Iterator[LogicalCircuit]:
+    '''
+    Lazily yield one LogicalCircuit at a time in the order of the logical RAM file, only one circuit is held in memory.
+    logic_blocks - {circuit_id: num_logic_blocks} as read by read_LogicBlock_from_file
+    '''
+    logger.info(f'Streaming from {loigicalram_filename}')
+    with open(loigicalram_filename, 'r') as f:
+        for circuit_id, rams in iter_grouped_LogicalRam(iter(f.readline, '')):
+            yield LogicalCircuit(circuit_id=circuit_id, rams=rams, num_logic_blocks=logic_blocks[circuit_id])
+
+
+def serialize_LogicalCircuit_to_file(logicblock_filename: str, loigicalram_filename: str, logical_circuits: Dict[int, LogicalCircuit]):
+    '''
+    Inverse of read_LogicalCircuit_from_file
+    '''
+    sorted_lcs = make_sorted_1d_dict(logical_circuits)
+    serialize_LogicBlock_to_file(filename=logicblock_filename, logic_blocks=OrderedDict(
+        (circuit_id, lc.num_logic_blocks) for circuit_id, lc in sorted_lcs.items()))
+    serialize_grouped_LogicalRam_to_file(filename=loigicalram_filename, logical_rams=OrderedDict(
+        (circuit_id, make_sorted_1d_dict(lc.rams)) for circuit_id, lc in sorted_lcs.items()))
@@ -1,10 +1,11 @@
+import functools
 import math
-from typing import Iterator, NamedTuple, OrderedDict, TypeVar, Type
+from typing import Dict, Iterator, NamedTuple, OrderedDict, Tuple, TypeVar, Type
 from collections import OrderedDict, defaultdict
 from enum import Flag, auto
 
 from .logger import logger
-from .utils import make_sorted_2d_dict
+from .utils import make_sorted_1d_dict, make_sorted_2d_dict
 
 
 class RamMode(Flag):
@@ -47,6 +48,8 @@ class RamShape(NamedTuple):
     def __str__(self):
         return f'W{self.width}xD{self.depth}={self.get_size()}'
 
+    # Memoized, so candidates of RAMs with the same shape share the RamShapeFit objects
+    @functools.lru_cache(maxsize=1 << 16)
     def get_fit(self, smaller_shape: RamShapeT) -> RamShapeFit:
         return RamShapeFit(num_series=math.ceil(self.depth / smaller_shape.depth),
                            num_parallel=math.ceil(self.width / smaller_shape.width))
@@ -81,8 +84,17 @@ class LogicalRam(NamedTuple):
                 f'Invalid str to parse for LogicalRam: {logical_ram_as_str}')
             raise
 
+    def serialize(self) -> str:
+        '''
+        Inverse of from_str
+        '''
+        return f'{self.circuit_id}\t{self.ram_id}\t{self.mode.name}\t{self.shape.depth}\t{self.shape.width}'
 
-def parse_grouped_LogicalRam(lines_iter: Iterator[str]) -> OrderedDict[int, OrderedDict[int, LogicalRam]]:
+
+def parse_LogicalRam_header(lines_iter: Iterator[str]) -> int:
+    '''
+    Consume the header lines, return the number of circuits
+    '''
     # line 0: Num_Circuits 69
     first_line = None
     while True:
@@ -94,10 +106,15 @@ def parse_grouped_LogicalRam(lines_iter: Iterator[str]) -> OrderedDict[int, Orde
     num_circuits = int(num_circuits_str)
     # line 1: Circuit	RamID	Mode		Depth	Width
     second_line = next(lines_iter).strip()
-    logger.debug('parse_grouped_LogicalRam')
+    logger.debug('parse_LogicalRam_header')
     logger.debug(f'  first_line={first_line}')
     logger.debug(f'  num_circuits={num_circuits}')
     logger.debug(f'  second_line={second_line}')
+    return num_circuits
+
+
+def parse_grouped_LogicalRam(lines_iter: Iterator[str]) -> OrderedDict[int, OrderedDict[int, LogicalRam]]:
+    num_circuits = parse_LogicalRam_header(lines_iter)
     # Rest of lines
     logical_rams = [LogicalRam.from_str(line.strip())
                     for line in lines_iter if line.strip() != '']
@@ -118,7 +135,41 @@ def parse_grouped_LogicalRam(lines_iter: Iterator[str]) -> OrderedDict[int, Orde
     return lr_by_circuitid_by_ramid
 
 
+def iter_grouped_LogicalRam(lines_iter: Iterator[str]) -> Iterator[Tuple[int, OrderedDict[int, LogicalRam]]]:
+    '''
+    Lazily yield (circuit_id, {ram_id: LogicalRam}) one circuit at a time in the order of the input,
+    the RAMs of a circuit must be contiguous
+    '''
+    parse_LogicalRam_header(lines_iter)
+    seen_circuit_ids = set()
+    circuit_id = None
+    rams: Dict[int, LogicalRam] = dict()
+    for line in lines_iter:
+        if line.strip() == '':
+            continue
+        lr = LogicalRam.from_str(line.strip())
+        if lr.circuit_id != circuit_id:
+            if circuit_id is not None:
+                yield (circuit_id, make_sorted_1d_dict(rams))
+            assert lr.circuit_id not in seen_circuit_ids, f'The RAMs of circuit {lr.circuit_id} are not contiguous'
+            seen_circuit_ids.add(lr.circuit_id)
+            circuit_id = lr.circuit_id
+            rams = dict()
+        rams[lr.ram_id] = lr
+    if circuit_id is not None:
+        yield (circuit_id, make_sorted_1d_dict(rams))
+
+
 def read_grouped_LogicalRam_from_file(filename: str) -> OrderedDict[int, OrderedDict[int, LogicalRam]]:
     logger.info(f'Reading from {filename}')
     with open(filename, 'r') as f:
         return parse_grouped_LogicalRam(iter(f.readline, ''))
+
+
+def serialize_grouped_LogicalRam_to_file(filename: str, logical_rams: OrderedDict[int, OrderedDict[int, LogicalRam]]):
+    logger.info(f'Writing to {filename}')
+    with open(filename, 'w') as f:
+        f.write(f'Num_Circuits {len(logical_rams)}\n')
+        f.write('Circuit\tRamID\tMode\t\tDepth\tWidth\n')
+        for rams in logical_rams.values():
+            f.writelines(lr.serialize() + '\n' for lr in rams.values())
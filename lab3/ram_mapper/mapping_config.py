@@ -1,17 +1,22 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from array import array
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from itertools import chain
-from typing import Callable, Dict, Iterator, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from .physical_arch import RamShape
 from .logger import logger
 from .utils import list_add, list_set, sorted_dict_items
 from .logical_ram import RamMode, RamShapeFit
+from .logical_circuit import LogicalCircuit
 from .siv_arch import accumulate_extra_luts, determine_extra_luts, determine_write_decoder_luts
 
 
 class ConfigSerializer(ABC):
+    # Keep the config tree free of per-instance __dict__
+    __slots__ = ()
+
     @staticmethod
     def indent_str(level: int) -> str:
         '''
@@ -39,18 +44,24 @@ class ConfigLeafExecutor(ABC):
     '''
     Find the LogicalRamConfig that has PhysicalRamConfig and call the callback function
     '''
+    __slots__ = ()
+
     @abstractmethod
     def execute_on_leaf(self, callback: Callable[[LogicalRamConfig]]):
         pass
 
 
 class ConfigShape(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def get_shape(self) -> RamShape:
         pass
 
 
 class ConfigPhysicalRamCount(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def get_physical_ram_count(self) -> List[int]:
         '''
@@ -60,12 +71,14 @@ class ConfigPhysicalRamCount(ABC):
 
 
 class ConfigExtraLutCount(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def get_extra_lut_count(self) -> int:
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class RamConfig(ConfigSerializer, ConfigShape, ConfigPhysicalRamCount, ConfigExtraLutCount, ConfigLeafExecutor):
     circuit_id: int
     ram_id: int
@@ -88,7 +101,7 @@ class RamConfig(ConfigSerializer, ConfigShape, ConfigPhysicalRamCount, ConfigExt
         self.lrc.execute_on_leaf(callback)
 
 
-@dataclass
+@dataclass(slots=True)
 class LogicalRamConfig(ConfigSerializer, ConfigShape, ConfigPhysicalRamCount, ConfigLeafExecutor):
     logical_shape: RamShape
     clrc: Optional[CombinedLogicalRamConfig] = None
@@ -152,7 +165,7 @@ class RamSplitDimension(Enum):
     parallel = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class CombinedLogicalRamConfig(ConfigSerializer, ConfigShape, ConfigPhysicalRamCount, ConfigLeafExecutor):
     split: RamSplitDimension
     lrc_l: LogicalRamConfig
@@ -183,7 +196,7 @@ class CombinedLogicalRamConfig(ConfigSerializer, ConfigShape, ConfigPhysicalRamC
         self.lrc_r.execute_on_leaf(callback)
 
 
-@dataclass
+@dataclass(slots=True)
 class PhysicalRamConfig(ConfigSerializer, ConfigShape, ConfigPhysicalRamCount):
     id: int
     physical_shape_fit: RamShapeFit
@@ -203,7 +216,7 @@ class PhysicalRamConfig(ConfigSerializer, ConfigShape, ConfigPhysicalRamCount):
         return l
 
 
-@dataclass
+@dataclass(slots=True)
 class CircuitConfig(ConfigSerializer, ConfigPhysicalRamCount, ConfigExtraLutCount, ConfigLeafExecutor):
     circuit_id: int
     rams: Dict[int, RamConfig] = field(default_factory=dict)
@@ -247,7 +260,7 @@ class CircuitConfig(ConfigSerializer, ConfigPhysicalRamCount, ConfigExtraLutCoun
             ram.execute_on_leaf(callback)
 
 
-@dataclass
+@dataclass(slots=True)
 class AllCircuitConfig(ConfigSerializer):
     circuits: Dict[int, CircuitConfig] = field(default_factory=dict)
 
@@ -267,3 +280,170 @@ class AllCircuitConfig(ConfigSerializer):
 
     def insert_circuit_config(self, cc: CircuitConfig):
         self.circuits[cc.circuit_id] = cc
+
+
+def parse_LogicalRamConfig(tokens: List[str], lines_iter: Iterator[str], prcs: Dict[int, PhysicalRamConfig]) -> LogicalRamConfig:
+    '''
+    tokens: "LW 12 LD 45 ID 0 S 1 P 1 Type 2 Mode SimpleDualPort W 32 D 256" or "LW 12 LD 45 parallel" splitted,
+    the children of a CombinedLogicalRamConfig are consumed from lines_iter.
+    prcs: {prc_id: prc}, leaves with the same ID share the same PhysicalRamConfig,
+    a leaf that disagrees with the first one of its ID keeps its own (for the checker to report)
+    '''
+    try:
+        logical_shape = RamShape(width=int(tokens[1]), depth=int(tokens[3]))
+        if tokens[4] == 'ID':
+            prc_id = int(tokens[5])
+            prc = PhysicalRamConfig(
+                id=prc_id,
+                physical_shape_fit=RamShapeFit(
+                    num_series=int(tokens[7]), num_parallel=int(tokens[9])),
+                ram_arch_id=int(tokens[11]),
+                ram_mode=RamMode[tokens[13]],
+                physical_shape=RamShape(width=int(tokens[15]), depth=int(tokens[17])))
+            if prc_id not in prcs:
+                prcs[prc_id] = prc
+            elif prcs[prc_id] == prc:
+                prc = prcs[prc_id]
+            return LogicalRamConfig(logical_shape=logical_shape, prc=prc)
+        split = RamSplitDimension[tokens[4]]
+    except (ValueError, IndexError, KeyError):
+        logger.error(
+            f'Invalid str to parse for LogicalRamConfig: {" ".join(tokens)}')
+        raise
+    lrc_l = parse_LogicalRamConfig(
+        next(lines_iter).split(), lines_iter, prcs)
+    lrc_r = parse_LogicalRamConfig(
+        next(lines_iter).split(), lines_iter, prcs)
+    return LogicalRamConfig(logical_shape=logical_shape, clrc=CombinedLogicalRamConfig(split=split, lrc_l=lrc_l, lrc_r=lrc_r))
+
+
+def parse_grouped_CircuitConfig_with_extra_lut_counts(lines_iter: Iterator[str], logical_circuits: Dict[int, LogicalCircuit], skip_unknown_circuits: bool = False, on_unknown_circuit: Optional[Callable[[int], None]] = None) -> Iterator[Tuple[CircuitConfig, Dict[int, int]]]:
+    '''
+    Lazily yield (CircuitConfig, {ram_id: extra_lut_count as written in the file}) one circuit at a time from the lines of a mapping file,
+    the RAMs of a circuit must be contiguous (as written by AllCircuitConfig.serialize_gen).
+    RamConfig.ram_mode is taken from the matching LogicalRam in logical_circuits.
+    If skip_unknown_circuits, circuits not in logical_circuits are parsed and dropped instead of raising KeyError,
+    on_unknown_circuit is called once with the id of each dropped circuit.
+    '''
+    cc: Optional[CircuitConfig] = None
+    unknown_circuit_id: Optional[int] = None
+    extra_lut_counts: Dict[int, int] = dict()
+    prcs: Dict[int, PhysicalRamConfig] = dict()
+    for line in lines_iter:
+        tokens = line.split()
+        if len(tokens) == 0 or tokens[0].startswith('//'):
+            continue
+        try:
+            circuit_id, ram_id, extra_lut_count = int(
+                tokens[0]), int(tokens[1]), int(tokens[2])
+        except (ValueError, IndexError):
+            logger.error(f'Invalid str to parse for RamConfig: {line}')
+            raise
+        if skip_unknown_circuits and circuit_id not in logical_circuits:
+            # Still consume the lines of the (possibly multi-line) config tree
+            parse_LogicalRamConfig(tokens[3:], lines_iter, dict())
+            if on_unknown_circuit is not None and circuit_id != unknown_circuit_id:
+                on_unknown_circuit(circuit_id)
+            unknown_circuit_id = circuit_id
+            continue
+        if cc is None or cc.circuit_id != circuit_id:
+            if cc is not None:
+                yield (cc, extra_lut_counts)
+            cc = CircuitConfig(circuit_id=circuit_id)
+            extra_lut_counts = dict()
+            prcs = dict()
+        lrc = parse_LogicalRamConfig(tokens[3:], lines_iter, prcs)
+        cc.insert_ram_config(RamConfig(
+            circuit_id=circuit_id,
+            ram_id=ram_id,
+            lrc=lrc,
+            ram_mode=logical_circuits[circuit_id].rams[ram_id].mode))
+        extra_lut_counts[ram_id] = extra_lut_count
+    if cc is not None:
+        yield (cc, extra_lut_counts)
+
+
+def parse_grouped_CircuitConfig(lines_iter: Iterator[str], logical_circuits: Dict[int, LogicalCircuit], skip_unknown_circuits: bool = False) -> Iterator[CircuitConfig]:
+    '''
+    Lazily yield one CircuitConfig at a time from the lines of a mapping file,
+    see parse_grouped_CircuitConfig_with_extra_lut_counts
+    '''
+    return (cc for cc, _ in parse_grouped_CircuitConfig_with_extra_lut_counts(lines_iter, logical_circuits, skip_unknown_circuits))
+
+
+def read_AllCircuitConfig_from_file(filename: str, logical_circuits: Dict[int, LogicalCircuit], skip_unknown_circuits: bool = False) -> AllCircuitConfig:
+    logger.info(f'Reading from {filename}')
+    acc = AllCircuitConfig()
+    with open(filename, 'r') as f:
+        for cc in parse_grouped_CircuitConfig(iter(f.readline, ''), logical_circuits, skip_unknown_circuits):
+            acc.insert_circuit_config(cc)
+    return acc
+
+
+# Node tag of a leaf in the flat CircuitConfig encoding, splits use RamSplitDimension values
+ENCODED_LEAF = 0
+
+
+def encode_CircuitConfig(cc: CircuitConfig) -> array:
+    '''
+    Flat int encoding of cc, much cheaper to pickle than the config tree:
+    [circuit_id, num_rams, (ram_id, ram_mode, lrc)...] where each lrc is in pre-order,
+    [LW, LD, ENCODED_LEAF, ID, S, P, Type, Mode, W, D] for a leaf or [LW, LD, split, lrc_l, lrc_r]
+    '''
+    encoded = array('i', [cc.circuit_id, len(cc.rams)])
+
+    def encode_lrc(lrc: LogicalRamConfig):
+        encoded.extend((lrc.logical_shape.width, lrc.logical_shape.depth))
+        if lrc.prc is not None:
+            prc = lrc.prc
+            encoded.extend((ENCODED_LEAF, prc.id, prc.physical_shape_fit.num_series, prc.physical_shape_fit.num_parallel,
+                           prc.ram_arch_id, prc.ram_mode.value, prc.physical_shape.width, prc.physical_shape.depth))
+        else:
+            encoded.append(lrc.clrc.split.value)
+            encode_lrc(lrc.clrc.lrc_l)
+            encode_lrc(lrc.clrc.lrc_r)
+
+    for ram_id, rc in sorted_dict_items(cc.rams):
+        encoded.extend((ram_id, rc.ram_mode.value))
+        encode_lrc(rc.lrc)
+    return encoded
+
+
+def decode_CircuitConfig(encoded: array) -> CircuitConfig:
+    '''
+    Inverse of encode_CircuitConfig, leaves with the same ID share the same PhysicalRamConfig.
+    This runs serially in the parent for every circuit, hence the positional arguments and index arithmetic.
+    '''
+    values = encoded.tolist()
+    ram_modes = {ram_mode.value: ram_mode for ram_mode in RamMode}
+    prcs: Dict[int, PhysicalRamConfig] = dict()
+
+    def decode_lrc(idx: int) -> Tuple[LogicalRamConfig, int]:
+        '''
+        Return (lrc, index after the subtree)
+        '''
+        logical_shape = RamShape(values[idx], values[idx + 1])
+        tag = values[idx + 2]
+        if tag == ENCODED_LEAF:
+            prc_id = values[idx + 3]
+            prc = prcs.get(prc_id)
+            if prc is None:
+                # id, physical_shape_fit, ram_arch_id, ram_mode, physical_shape
+                prc = PhysicalRamConfig(prc_id, RamShapeFit(values[idx + 4], values[idx + 5]), values[idx + 6],
+                                        ram_modes[values[idx + 7]], RamShape(values[idx + 8], values[idx + 9]))
+                prcs[prc_id] = prc
+            return LogicalRamConfig(logical_shape, None, prc), idx + 10
+        lrc_l, idx = decode_lrc(idx + 3)
+        lrc_r, idx = decode_lrc(idx)
+        return LogicalRamConfig(logical_shape, CombinedLogicalRamConfig(RamSplitDimension(tag), lrc_l, lrc_r)), idx
+
+    cc = CircuitConfig(circuit_id=values[0])
+    idx = 2
+    for _ in range(values[1]):
+        ram_id = values[idx]
+        ram_mode = ram_modes[values[idx + 1]]
+        lrc, idx = decode_lrc(idx + 2)
+        cc.insert_ram_config(RamConfig(circuit_id=cc.circuit_id,
+                             ram_id=ram_id, lrc=lrc, ram_mode=ram_mode))
+    assert idx == len(values), 'Trailing values in the encoded CircuitConfig'
+    return cc
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import argparse
+import heapq
+import sys
+from typing import Iterator, List, Tuple
+
+from . import driver
+from . import logger as logger_module
+from .logger import logger
+from .siv_heuristics import CircuitQor, read_CircuitQor_from_file, serialize_CircuitQor_to_file
+
+
+def read_circuit_chunks(filename: str) -> Iterator[Tuple[int, str]]:
+    '''
+    Lazily yield (circuit_id, mapping lines of the circuit) from a mapping file written by ram_mapper,
+    in the order of the file, which is circuit order
+    '''
+    circuit_id = None
+    lines: List[str] = list()
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.startswith('// Num_Circuits') or line.strip() == '':
+                continue
+            if line.startswith('// Circuit='):
+                # // Circuit=0 Ram=0
+                line_circuit_id = int(line.split()[1].split('=')[1])
+                if line_circuit_id != circuit_id:
+                    if circuit_id is not None:
+                        yield (circuit_id, ''.join(lines))
+                    circuit_id = line_circuit_id
+                    lines = list()
+            lines.append(line)
+    if circuit_id is not None:
+        yield (circuit_id, ''.join(lines))
+
+
+def merge_shards(mapping_filenames: List[str], out_filename: str) -> List[CircuitQor]:
+    '''
+    Merge the shard outputs of ram_mapper --shard into one mapping file in circuit order,
+    the mapping files are streamed, only one circuit per shard is held in memory.
+    Return the CircuitQors of all circuits in circuit order
+    '''
+    circuit_qors: List[CircuitQor] = list()
+    for mapping_filename in mapping_filenames:
+        circuit_qors += read_CircuitQor_from_file(
+            driver.default_qor_filename(mapping_filename))
+    if len(circuit_qors) == 0:
+        raise ValueError(
+            f'No circuits in the QoR files of {", ".join(mapping_filenames)}')
+    circuit_qors.sort(key=lambda qor: qor.circuit_id)
+    for qor, next_qor in zip(circuit_qors, circuit_qors[1:]):
+        if qor.circuit_id == next_qor.circuit_id:
+            raise ValueError(
+                f'Circuit={qor.circuit_id} is in more than one shard')
+
+    logger.info(f'Writing to {out_filename}')
+    num_written = 0
+    with open(out_filename, 'w') as f:
+        f.write(f'// Num_Circuits {len(circuit_qors)}\n')
+        for circuit_id, chunk in heapq.merge(*map(read_circuit_chunks, mapping_filenames), key=lambda p: p[0]):
+            if num_written >= len(circuit_qors) or circuit_qors[num_written].circuit_id != circuit_id:
+                raise ValueError(
+                    f'Circuit={circuit_id} of the mapping files does not match the QoR files')
+            f.write(chunk)
+            num_written += 1
+    if num_written != len(circuit_qors):
+        raise ValueError(
+            f'{len(circuit_qors) - num_written} circuits of the QoR files are missing from the mapping files')
+    return circuit_qors
+
+
+def init(parser):
+    parser.add_argument(
+        'mappings', type=str, nargs='+',
+        help='Mapping outputs of ram_mapper --shard, each with its <mapping>_qor.txt next to it')
+    parser.add_argument(
+        '--out', type=str,
+        default='mapping.txt',
+        help='Output merged mapping.txt, its merged QoR is written to <out>_qor.txt')
+
+
+def main(args) -> float:
+    '''
+    Return fpga_area_geomean
+    '''
+    logger_module.init_logger()
+    circuit_qors = merge_shards(
+        mapping_filenames=args.mappings, out_filename=args.out)
+    num_types = len(circuit_qors[0].ram_type_count_list)
+    serialize_CircuitQor_to_file(filename=driver.default_qor_filename(
+        args.out), circuit_qors=circuit_qors, num_types=num_types)
+
+    logger.info(f'{CircuitQor.banner(num_types)}')
+    for qor in circuit_qors:
+        logger.info(f'{qor.serialize()}')
+    fpga_area_geomean = driver.geomean_fpga_area(
+        map(lambda qor: qor.fpga_area, circuit_qors))
+    logger.info(
+        f'Geometric Average Area for {len(circuit_qors)} circuits: {fpga_area_geomean:.6E}')
+    return fpga_area_geomean
+
+
+# python3 -m ram_mapper.merge --out=mapping.txt shard0/mapping.txt shard1/mapping.txt
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    init(parser)
+    main(parser.parse_args())
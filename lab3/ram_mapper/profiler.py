@@ -0,0 +1,197 @@
+from __future__ import annotations
+import argparse
+import cProfile
+import glob
+import io
+import os
+import pstats
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from multiprocessing import util
+from typing import DefaultDict, Dict, Iterator, List, Optional
+
+from . import logger as logger_module
+from .logger import logger
+from .utils import proccess_initializer
+
+# Profile of the process outside any solver stage, e.g. pickling and IPC of the pool
+MAIN_STAGE = 'MAIN'
+WORKER_STAGE = 'WORKER'
+ALL_STAGES = 'ALL'
+
+# Functions compared across the solver stages in the report
+HOT_PATHS = ['evaluate_apply_move', 'calculate_fpga_qor',
+             'calculate_fpga_qor_for_ram_config', 'get_extra_lut_count']
+
+# Per process state, at most one cProfile.Profile can be enabled at a time
+_profile_dir: Optional[str] = None
+_stage_profiles: Dict[str, cProfile.Profile] = dict()
+_current_profile: Optional[cProfile.Profile] = None
+
+
+def is_profiling() -> bool:
+    return _current_profile is not None
+
+
+def prepare_profile_dir(profile_dir: str):
+    '''
+    Create profile_dir and remove the per-process dumps of previous runs
+    '''
+    os.makedirs(profile_dir, exist_ok=True)
+    for filename in glob.glob(os.path.join(profile_dir, '*.prof')):
+        os.remove(filename)
+
+
+def start(profile_dir: str, base_stage: str = MAIN_STAGE):
+    global _profile_dir, _current_profile
+    assert not is_profiling(), 'Already profiling in this process'
+    _profile_dir = profile_dir
+    _stage_profiles.clear()
+    _current_profile = _stage_profiles.setdefault(
+        base_stage, cProfile.Profile())
+    _current_profile.enable()
+
+
+def stop_and_dump() -> List[str]:
+    '''
+    Dump one file per stage as <stage>.<pid>.prof, return the filenames
+    '''
+    global _profile_dir, _current_profile
+    if not is_profiling():
+        return []
+    _current_profile.disable()
+    filenames = list()
+    for stage, profile in _stage_profiles.items():
+        filename = os.path.join(
+            _profile_dir, f'{stage.replace(" ", "_")}.{os.getpid()}.prof')
+        profile.dump_stats(filename)
+        filenames.append(filename)
+    _profile_dir = None
+    _current_profile = None
+    _stage_profiles.clear()
+    return filenames
+
+
+@contextmanager
+def profile_stage(stage: str) -> Iterator[None]:
+    '''
+    Attribute the profile of the block to stage, no-op if the process is not profiling
+    '''
+    global _current_profile
+    if not is_profiling():
+        yield
+        return
+    outer_profile = _current_profile
+    outer_profile.disable()
+    _current_profile = _stage_profiles.setdefault(stage, cProfile.Profile())
+    _current_profile.enable()
+    try:
+        yield
+    finally:
+        _current_profile.disable()
+        _current_profile = outer_profile
+        _current_profile.enable()
+
+
+def profile_process_initializer(args, profile_dir: str):
+    '''
+    Pool initializer, the worker dumps its profile when it exits normally, i.e. the pool must be closed and joined rather than terminated
+    '''
+    global _current_profile
+    proccess_initializer(args)
+    # A forked worker inherits the enabled profile of the main process, discard it
+    if is_profiling():
+        _current_profile.disable()
+        _current_profile = None
+    start(profile_dir=profile_dir, base_stage=WORKER_STAGE)
+    util.Finalize(None, stop_and_dump, exitpriority=16)
+
+
+def merge_profiles(profile_dir: str) -> Dict[str, pstats.Stats]:
+    '''
+    Return {stage: stats merged over all processes}, including ALL_STAGES
+    '''
+    # {stage: [filename]}
+    stage_filenames: DefaultDict[str, List[str]] = defaultdict(list)
+    for filename in sorted(glob.glob(os.path.join(profile_dir, '*.prof'))):
+        basename = os.path.basename(filename)
+        if basename.count('.') != 2:
+            # Merged outputs
+            continue
+        stage = basename.split('.')[0].replace('_', ' ')
+        stage_filenames[stage].append(filename)
+
+    merged = dict()
+    for stage, filenames in stage_filenames.items():
+        merged[stage] = pstats.Stats(*filenames, stream=io.StringIO())
+    if len(stage_filenames) > 0:
+        merged[ALL_STAGES] = pstats.Stats(
+            *[f for filenames in stage_filenames.values() for f in filenames], stream=io.StringIO())
+    return merged
+
+
+def get_hot_path_tottime(stats: pstats.Stats, func_name: str) -> float:
+    '''
+    Sum of the own time of all functions named func_name
+    '''
+    return sum(stat[2] for (_, _, name), stat in stats.stats.items() if name == func_name)
+
+
+def write_report(profile_dir: str, top: int = 30) -> Optional[str]:
+    '''
+    Merge the per-process dumps into all.prof and report.txt in profile_dir, return the report filename
+    '''
+    merged = merge_profiles(profile_dir)
+    if len(merged) == 0:
+        logger.error(f'No profile found in {profile_dir}')
+        return None
+    merged[ALL_STAGES].dump_stats(os.path.join(profile_dir, 'all.prof'))
+
+    stages = sorted(stage for stage in merged if stage != ALL_STAGES)
+    num_processes = len(glob.glob(os.path.join(
+        profile_dir, f'{MAIN_STAGE}.*.prof'))) + len(glob.glob(os.path.join(profile_dir, f'{WORKER_STAGE}.*.prof')))
+    stream = io.StringIO()
+    stream.write(f'Profile of {num_processes} processes\n\n')
+    stream.write(f'{"STAGE":<16}{"SECONDS":>10}' +
+                 ''.join(f'{func_name:>36}' for func_name in HOT_PATHS) + '\n')
+    for stage in stages + [ALL_STAGES]:
+        stats = merged[stage]
+        stream.write(f'{stage:<16}{stats.total_tt:>10.3f}' +
+                     ''.join(f'{get_hot_path_tottime(stats, func_name):>36.3f}' for func_name in HOT_PATHS) + '\n')
+
+    for stage in [ALL_STAGES] + stages:
+        stats = merged[stage]
+        stream.write(f'\n===== {stage} =====\n')
+        stats.stream = stream
+        stats.sort_stats(pstats.SortKey.CUMULATIVE if stage ==
+                         ALL_STAGES else pstats.SortKey.TIME).print_stats(top)
+
+    report_filename = os.path.join(profile_dir, 'report.txt')
+    with open(report_filename, 'w') as f:
+        f.write(stream.getvalue())
+    logger.warning(f'Profile report written to {report_filename}')
+    return report_filename
+
+
+def init(parser):
+    parser.add_argument(
+        'profile_dir', type=str,
+        help='Directory of the per-process dumps written by ram_mapper --profile')
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=30,
+        help='The number of functions listed per stage, default is 30')
+
+
+def main(args) -> int:
+    logger_module.init_logger()
+    return 0 if write_report(profile_dir=args.profile_dir, top=args.top) is not None else 1
+
+
+# python3 -m ram_mapper.profiler profile
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    init(parser)
+    sys.exit(main(parser.parse_args()))
@@ -161,6 +161,13 @@ def generate_default_128k_bram() -> BlockRamArch:
 DEFAULT_RAM_ARCH_STR = '-l 1 1 -b 8192 32 10 1 -b 131072 128 300 1'
 
 
+def normalize_arch_str(raw_checker_str: str) -> str:
+    '''
+    '-l 1  1 -B 8192 32 10 1' -> '-l 1 1 -b 8192 32 10 1', the order of RAM types is kept as it defines their ids
+    '''
+    return ' '.join('-' + ' '.join(checker_str.lower().split()) for checker_str in filter(lambda s: len(s.strip()), raw_checker_str.split('-')))
+
+
 class SIVArch(NamedTuple):
     ram_archs: Dict[int, SIVRamArch]
     lb_arch: RegularLogicBlockArch
@@ -1,5 +1,6 @@
+from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Iterable, List, Optional
 import math
 
 from .logical_ram import RamMode
@@ -25,6 +26,19 @@ class CircuitQor:
                self.regular_logic_block_count, self.required_logic_block_count, self.fpga_area)
         return '\t\t'.join(map(lambda x: str(x), seq))
 
+    @classmethod
+    def deserialize(cls, qor_str: str) -> CircuitQor:
+        '''
+        Inverse of serialize
+        '''
+        try:
+            values = list(map(int, qor_str.split()))
+            return cls(ram_type_count_list=values[1:-3], regular_logic_block_count=values[-3],
+                       required_logic_block_count=values[-2], fpga_area=values[-1], circuit_id=values[0])
+        except (ValueError, IndexError):
+            logger.error(f'Invalid str to parse for CircuitQor: {qor_str}')
+            raise
+
     @staticmethod
     def banner(num_types: int = 3) -> str:
         type_list = [('Type ' + str(idx+1)) for idx in range(num_types)]
@@ -32,6 +46,21 @@ class CircuitQor:
         return '\t\t'.join(seq)
 
 
+def serialize_CircuitQor_to_file(filename: str, circuit_qors: Iterable[CircuitQor], num_types: int):
+    logger.info(f'Writing to {filename}')
+    with open(filename, 'w') as f:
+        f.write(CircuitQor.banner(num_types) + '\n')
+        f.writelines(qor.serialize() + '\n' for qor in circuit_qors)
+
+
+def read_CircuitQor_from_file(filename: str) -> List[CircuitQor]:
+    logger.info(f'Reading from {filename}')
+    with open(filename, 'r') as f:
+        # Skip the banner
+        next(f, None)
+        return [CircuitQor.deserialize(line) for line in f if line.strip() != '']
+
+
 def calculate_fpga_qor(archs: SIVArch, logic_block_count: int, extra_lut_count: int, physical_ram_count: List[int], skip_area: bool = False, verbose: bool = False) -> CircuitQor:
     # Convert extra_lut_count + logic_block_count into regular_lb_used
     lb_for_extra_lut = archs.lb_arch.get_block_count_from_luts(extra_lut_count)
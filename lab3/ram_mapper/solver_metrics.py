@@ -0,0 +1,53 @@
+from __future__ import annotations
+from dataclasses import asdict, dataclass, field
+import json
+import os
+from typing import Dict, Iterable, Optional
+
+from .logger import logger
+
+
+@dataclass
+class SolverMetrics:
+    '''
+    Structured stats of one step of a solver stage on one circuit.
+    Areas are in the unit the solver optimizes for (required logic blocks for anneal and greedy).
+    '''
+    circuit_id: int
+    stage: str
+    step: str
+    elapsed: float = 0.0
+    steps: int = 0
+    accepted: int = 0
+    zero_delta: int = 0
+    early_exited: bool = False
+    initial_area: Optional[int] = None
+    final_area: Optional[int] = None
+    best_area: Optional[int] = None
+    # Stage specific counters
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    def serialize(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def deserialize(cls, metrics_str: str) -> SolverMetrics:
+        return cls(**json.loads(metrics_str))
+
+
+def default_metrics_filename(mapping_filename: str) -> str:
+    '''
+    mapping.txt -> mapping_metrics.jsonl, in the same directory
+    '''
+    return os.path.splitext(mapping_filename)[0] + '_metrics.jsonl'
+
+
+def serialize_SolverMetrics_to_file(filename: str, metrics: Iterable[SolverMetrics]):
+    logger.info(f'Writing to {filename}')
+    with open(filename, 'w') as f:
+        f.writelines(m.serialize() + '\n' for m in metrics)
+
+
+def read_SolverMetrics_from_file(filename: str) -> Iterable[SolverMetrics]:
+    with open(filename, 'r') as f:
+        return [SolverMetrics.deserialize(line) for line in f if line.strip() != '']
@@ -0,0 +1,187 @@
+from __future__ import annotations
+import logging
+from array import array
+import os
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import driver
+from . import logger as logger_module
+from .logger import logger
+from .logical_circuit import LogicalCircuit
+from .mapping_config import AllCircuitConfig, CircuitConfig, decode_CircuitConfig, encode_CircuitConfig
+from .siv_arch import SIVArch
+from .siv_heuristics import CircuitQor
+from .solver_metrics import SolverMetrics, default_metrics_filename, serialize_SolverMetrics_to_file
+from .transform import solve_single_circuit_with_metrics
+from .utils import elapsed_timer
+
+
+class SweepResult(NamedTuple):
+    arch_str: str
+    fpga_area_geomean: float
+    circuit_qors: List[CircuitQor]
+    acc: AllCircuitConfig
+    # In circuit order
+    metrics: List[SolverMetrics]
+
+
+# Installed once per process by sweep_process_initializer
+_worker_logical_circuits: Dict[int, LogicalCircuit] = dict()
+_worker_archs: Dict[str, SIVArch] = dict()
+
+
+def install_logical_circuits(logical_circuits: Dict[int, LogicalCircuit]):
+    global _worker_logical_circuits
+    _worker_logical_circuits = logical_circuits
+    _worker_archs.clear()
+
+
+def sweep_process_initializer(logging_level: int, logical_circuits: Dict[int, LogicalCircuit]):
+    logger_module.init_logger(logging_level)
+    install_logical_circuits(logical_circuits=logical_circuits)
+
+
+def get_worker_archs(arch_str: str) -> SIVArch:
+    '''
+    Archs are parsed from the string at most once per process
+    '''
+    if arch_str not in _worker_archs:
+        _worker_archs[arch_str] = SIVArch.from_str(raw_checker_str=arch_str)
+    return _worker_archs[arch_str]
+
+
+class SweepTask(NamedTuple):
+    arch_str: str
+    circuit_id: int
+    num_circuits: int
+    effort_factor: float
+    warm_start_config: Optional[CircuitConfig]
+
+
+def solve_sweep_task(arch_str: str, circuit_id: int, num_circuits: int, effort_factor: float, warm_start_config: Optional[CircuitConfig]) -> Tuple[str, CircuitConfig, List[SolverMetrics]]:
+    circuit_config, metrics = solve_single_circuit_with_metrics(
+        archs=get_worker_archs(arch_str),
+        logical_circuit=_worker_logical_circuits[circuit_id],
+        num_circuits=num_circuits,
+        warm_start_config=warm_start_config,
+        effort_factor=effort_factor)
+    return (arch_str, circuit_config, metrics)
+
+
+def unpack_solve_sweep_task(task: SweepTask) -> Tuple[str, array, List[SolverMetrics]]:
+    '''
+    Worker task, the result is returned in the compact encoding
+    '''
+    arch_str, circuit_config, metrics = solve_sweep_task(*task)
+    return (arch_str, encode_CircuitConfig(circuit_config), metrics)
+
+
+class Sweeper:
+    '''
+    In-process batch API to map the same logical circuits onto many archs.
+    The inputs are parsed once and a single process pool is kept for the lifetime of the Sweeper,
+    all (arch, circuit) pairs of a sweep are scheduled over it, largest circuits first.
+
+    with Sweeper(logic_block_count_filename='logic_block_count.txt', logical_rams_filename='logical_rams.txt') as sweeper:
+        results = sweeper.sweep(['-l 1 1 -b 8192 32 10 1', '-l 1 1 -b 8192 64 10 1'])
+    '''
+
+    def __init__(self, logic_block_count_filename: str, logical_rams_filename: str, processes: int = os.cpu_count(), max_circuits: Optional[int] = None, logging_level: int = logging.ERROR):
+        self._logical_circuits = driver.read_logical_circuits(
+            logic_block_count_filename=logic_block_count_filename,
+            logical_rams_filename=logical_rams_filename,
+            max_circuits=max_circuits)
+        self._processes = processes
+        self._logging_level = logging_level
+        self._pool = None
+        if self._processes != 1:
+            self._pool = Pool(processes=self._processes, initializer=sweep_process_initializer,
+                              initargs=(self._logging_level, self._logical_circuits))
+
+    def __enter__(self) -> Sweeper:
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def logical_circuits(self) -> Dict[int, LogicalCircuit]:
+        return self._logical_circuits
+
+    def imap_tasks(self, tasks: List[SweepTask]) -> Iterator[Tuple[str, CircuitConfig, List[SolverMetrics]]]:
+        if self._pool is None:
+            install_logical_circuits(logical_circuits=self._logical_circuits)
+            return (solve_sweep_task(*task) for task in tasks)
+        return ((arch_str, decode_CircuitConfig(encoded), metrics) for arch_str, encoded, metrics in self._pool.imap_unordered(unpack_solve_sweep_task, tasks))
+
+    def select_logical_circuits(self, max_circuits: Optional[int] = None) -> Dict[int, LogicalCircuit]:
+        '''
+        The first max_circuits circuits, same as --circuits of ram_mapper
+        '''
+        if max_circuits is None or max_circuits >= len(self._logical_circuits):
+            return self._logical_circuits
+        assert max_circuits > 0
+        return dict(sorted(self._logical_circuits.items())[:max_circuits])
+
+    def sweep(self, arch_strs: Iterable[str], out_filenames: Optional[Dict[str, str]] = None, warm_starts: Optional[Dict[str, AllCircuitConfig]] = None, max_circuits: Optional[int] = None, effort_factor: float = 1.0) -> Dict[str, SweepResult]:
+        '''
+        out_filenames - {arch_str: mapping filename}, mapping files (and solver metrics next to them) are only written for the listed archs
+        warm_starts - {arch_str: prior solution to repair and re-anneal from}
+        max_circuits - only map the first max_circuits circuits, default is all
+        effort_factor - scale of the annealing effort, 1.0 is full effort
+        Return {arch_str: SweepResult}
+        '''
+        arch_strs = list(dict.fromkeys(arch_strs))
+        out_filenames = out_filenames if out_filenames is not None else dict()
+        warm_starts = warm_starts if warm_starts is not None else dict()
+        logical_circuits = self.select_logical_circuits(
+            max_circuits=max_circuits)
+
+        tasks: List[SweepTask] = list()
+        for lc in sorted(logical_circuits.values(), key=lambda lc: len(lc.rams), reverse=True):
+            for arch_str in arch_strs:
+                warm_start = warm_starts.get(arch_str)
+                tasks.append(SweepTask(
+                    arch_str=arch_str,
+                    circuit_id=lc.circuit_id,
+                    num_circuits=len(logical_circuits),
+                    effort_factor=effort_factor,
+                    warm_start_config=warm_start.circuits.get(lc.circuit_id) if warm_start is not None else None))
+        logger.warning(
+            f'Sweeping {len(arch_strs)} archs x {len(logical_circuits)} circuits at effort {effort_factor} using {self._processes} processes')
+
+        accs = {arch_str: AllCircuitConfig() for arch_str in arch_strs}
+        # {arch_str: {circuit_id: metrics}}
+        metrics: Dict[str, Dict[int, List[SolverMetrics]]] = {
+            arch_str: dict() for arch_str in arch_strs}
+        with elapsed_timer() as elapsed:
+            for arch_str, circuit_config, circuit_metrics in self.imap_tasks(tasks):
+                accs[arch_str].insert_circuit_config(cc=circuit_config)
+                metrics[arch_str][circuit_config.circuit_id] = circuit_metrics
+        logger.warning(f'Sweep elapsed {elapsed():.3f} seconds')
+
+        results: Dict[str, SweepResult] = dict()
+        for arch_str in arch_strs:
+            acc = accs[arch_str]
+            assert len(acc.circuits) == len(logical_circuits)
+            arch_metrics = [m for _, circuit_metrics in sorted(
+                metrics[arch_str].items()) for m in circuit_metrics]
+            if arch_str in out_filenames:
+                acc.serialize_to_file(out_filenames[arch_str])
+                serialize_SolverMetrics_to_file(default_metrics_filename(
+                    out_filenames[arch_str]), arch_metrics)
+            circuit_qors = driver.calculate_fpga_qor_for_all_circuits(
+                archs=SIVArch.from_str(raw_checker_str=arch_str), logical_circuits=logical_circuits, acc=acc)
+            fpga_area_geomean = driver.geomean_fpga_area(
+                map(lambda qor: qor.fpga_area, circuit_qors))
+            logger.warning(
+                f'[{arch_str}] Geometric Average Area for {len(circuit_qors)} circuits: {fpga_area_geomean:.6E}')
+            results[arch_str] = SweepResult(
+                arch_str=arch_str, fpga_area_geomean=fpga_area_geomean, circuit_qors=circuit_qors, acc=acc, metrics=arch_metrics)
+        return results
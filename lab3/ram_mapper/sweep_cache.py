@@ -0,0 +1,77 @@
+from __future__ import annotations
+from dataclasses import asdict
+import json
+import sqlite3
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .logger import logger
+from .siv_arch import normalize_arch_str
+from .siv_heuristics import CircuitQor
+from .transform import MAPPER_VERSION
+from .utils import file_sha256
+
+
+class CachedSweepResult(NamedTuple):
+    arch_str: str
+    fpga_area_geomean: float
+    circuit_qors: List[CircuitQor]
+    mapping_filename: Optional[str]
+
+
+class SweepCache:
+    '''
+    Persistent sweep results in a local SQLite file,
+    keyed by (normalized arch string, input file hashes, mapper version, effort settings).
+
+    The input file hashes and mapper version are fixed for the lifetime of a SweepCache,
+    the arch string and effort settings vary between lookups.
+    '''
+
+    def __init__(self, filename: str, input_filenames: Iterable[str]):
+        self._inputs_hash = ' '.join(map(file_sha256, input_filenames))
+        self._mapper_version = MAPPER_VERSION
+        self._connection = sqlite3.connect(filename)
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS sweep_results (
+                arch_str TEXT NOT NULL,
+                inputs_hash TEXT NOT NULL,
+                mapper_version TEXT NOT NULL,
+                effort TEXT NOT NULL,
+                fpga_area_geomean REAL NOT NULL,
+                circuit_qors TEXT NOT NULL,
+                mapping_filename TEXT,
+                PRIMARY KEY (arch_str, inputs_hash, mapper_version, effort))''')
+        self._connection.commit()
+        logger.info(
+            f'Opened sweep cache {filename} (mapper_version={self._mapper_version})')
+
+    def __enter__(self) -> SweepCache:
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def key(self, arch_str: str, effort: Dict[str, object]) -> tuple:
+        return (normalize_arch_str(arch_str), self._inputs_hash, self._mapper_version, json.dumps(effort, sort_keys=True))
+
+    def get(self, arch_str: str, effort: Dict[str, object]) -> Optional[CachedSweepResult]:
+        row = self._connection.execute('''
+            SELECT fpga_area_geomean, circuit_qors, mapping_filename FROM sweep_results
+            WHERE arch_str=? AND inputs_hash=? AND mapper_version=? AND effort=?''', self.key(arch_str, effort)).fetchone()
+        if row is None:
+            return None
+        fpga_area_geomean, circuit_qors_str, mapping_filename = row
+        circuit_qors = [CircuitQor(**qor)
+                        for qor in json.loads(circuit_qors_str)]
+        return CachedSweepResult(arch_str=arch_str, fpga_area_geomean=fpga_area_geomean, circuit_qors=circuit_qors, mapping_filename=mapping_filename)
+
+    def put(self, arch_str: str, effort: Dict[str, object], fpga_area_geomean: float, circuit_qors: List[CircuitQor], mapping_filename: Optional[str] = None):
+        circuit_qors_str = json.dumps([asdict(qor) for qor in circuit_qors])
+        self._connection.execute('''
+            INSERT OR REPLACE INTO sweep_results
+            (arch_str, inputs_hash, mapper_version, effort, fpga_area_geomean, circuit_qors, mapping_filename)
+            VALUES (?, ?, ?, ?, ?, ?, ?)''', (*self.key(arch_str, effort), fpga_area_geomean, circuit_qors_str, mapping_filename))
+        self._connection.commit()
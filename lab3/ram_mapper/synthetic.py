@@ -0,0 +1,115 @@
+from __future__ import annotations
+import argparse
+import os
+import random
+import sys
+from collections import Counter
+from typing import Dict, List, NamedTuple, Tuple
+
+from . import driver
+from . import logger as logger_module
+from .logger import logger
+from .logical_circuit import LogicalCircuit, serialize_LogicalCircuit_to_file
+from .logical_ram import LogicalRam, RamMode, RamShape
+from .utils import sorted_dict_items
+
+
+class WorkloadProfile(NamedTuple):
+    '''
+    Empirical statistics of a reference benchmark, sampled by generate_logical_circuits
+    '''
+    # [(num_rams, num_logic_blocks)] of each circuit, sampled jointly to keep the RAM density of a circuit
+    circuit_sizes: List[Tuple[int, int]]
+    # {mode: number of RAMs}
+    mode_counts: Dict[RamMode, int]
+    # {mode: [shape of every RAM]}, width and depth are sampled jointly per mode
+    mode_shapes: Dict[RamMode, List[RamShape]]
+
+    @classmethod
+    def from_logical_circuits(cls, logical_circuits: Dict[int, LogicalCircuit]) -> WorkloadProfile:
+        mode_counts: Counter[RamMode] = Counter()
+        mode_shapes: Dict[RamMode, List[RamShape]] = dict()
+        circuit_sizes = list()
+        for _, lc in sorted_dict_items(logical_circuits):
+            circuit_sizes.append((len(lc.rams), lc.num_logic_blocks))
+            for _, ram in sorted_dict_items(lc.rams):
+                mode_counts[ram.mode] += 1
+                mode_shapes.setdefault(ram.mode, list()).append(ram.shape)
+        return cls(circuit_sizes=circuit_sizes, mode_counts=dict(mode_counts), mode_shapes=mode_shapes)
+
+
+def generate_logical_circuits(profile: WorkloadProfile, num_circuits: int, ram_scale: float = 1.0, seed: int = 0) -> Dict[int, LogicalCircuit]:
+    '''
+    Deterministic for the same profile and arguments
+    ram_scale - multiply the number of RAMs and logic blocks of each sampled circuit
+    '''
+    assert num_circuits > 0 and ram_scale > 0
+    rng = random.Random(seed)
+    modes = sorted(profile.mode_counts.keys(), key=lambda mode: mode.value)
+    mode_weights = [profile.mode_counts[mode] for mode in modes]
+    lcs = dict()
+    for circuit_id in range(num_circuits):
+        num_rams, num_logic_blocks = rng.choice(profile.circuit_sizes)
+        num_rams = max(1, round(num_rams * ram_scale))
+        num_logic_blocks = max(1, round(num_logic_blocks * ram_scale))
+        rams = dict()
+        for ram_id, mode in enumerate(rng.choices(modes, weights=mode_weights, k=num_rams)):
+            rams[ram_id] = LogicalRam(circuit_id=circuit_id, ram_id=ram_id,
+                                      mode=mode, shape=rng.choice(profile.mode_shapes[mode]))
+        lcs[circuit_id] = LogicalCircuit(
+            circuit_id=circuit_id, rams=rams, num_logic_blocks=num_logic_blocks)
+    return lcs
+
+
+def init(parser):
+    parser.add_argument(
+        '--lb', type=str,
+        default='logic_block_count.txt',
+        help='Reference logic_block_count.txt file to sample from')
+    parser.add_argument(
+        '--lr', type=str,
+        default='logical_rams.txt',
+        help='Reference logical_rams.txt to sample from')
+    parser.add_argument(
+        '--out_dir', type=str,
+        required=True,
+        help='Output directory of the generated logic_block_count.txt and logical_rams.txt')
+    parser.add_argument(
+        '--circuits', '-c',
+        type=int,
+        default=None,
+        help='The number of circuits to generate, default is the same as the reference')
+    parser.add_argument(
+        '--ram_scale',
+        type=float,
+        default=1.0,
+        help='Scale of the number of RAMs (and logic blocks) per circuit, default is 1.0')
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Random seed, default is 0')
+
+
+def main(args):
+    logger_module.init_logger()
+    reference_lcs = driver.read_logical_circuits(
+        logic_block_count_filename=args.lb, logical_rams_filename=args.lr)
+    profile = WorkloadProfile.from_logical_circuits(reference_lcs)
+    num_circuits = args.circuits if args.circuits is not None else len(
+        reference_lcs)
+    lcs = generate_logical_circuits(
+        profile=profile, num_circuits=num_circuits, ram_scale=args.ram_scale, seed=args.seed)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    serialize_LogicalCircuit_to_file(logicblock_filename=os.path.join(args.out_dir, 'logic_block_count.txt'),
+                                     loigicalram_filename=os.path.join(args.out_dir, 'logical_rams.txt'), logical_circuits=lcs)
+    logger.info(
+        f'Generated {len(lcs)} circuits with {sum(len(lc.rams) for lc in lcs.values())} RAMs in {args.out_dir}')
+
+
+# python3 -m ram_mapper.synthetic --out_dir=synthetic_10x --ram_scale=10
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    init(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,49 @@
+import logging
+import unittest
+
+from .benchmark import STAGES, BenchmarkRecord, RegressionThresholds, compare_to_baseline, run_benchmark, scale_logical_circuits
+from .testing import InputFilesTestMixin
+
+
+class BenchmarkTestCase(InputFilesTestMixin, unittest.TestCase):
+    logging_level = logging.CRITICAL
+
+    def test_scale_logical_circuits(self):
+        lcs = self.read_logical_circuits()
+        scaled_lcs = scale_logical_circuits(logical_circuits=lcs, scale=3)
+        self.assertEqual(len(scaled_lcs[0].rams), 9)
+        self.assertEqual(scaled_lcs[0].num_logic_blocks, 15)
+        self.assertEqual(scaled_lcs[0].rams[4].ram_id, 4)
+        self.assertEqual(scaled_lcs[0].rams[4].shape, lcs[0].rams[1].shape)
+        self.assertEqual(len(scaled_lcs[1].rams), 6)
+
+    def test_run_benchmark(self):
+        record = run_benchmark(logic_block_count_filename=self._lb, logical_rams_filename=self._lr,
+                               arch_str='-l 1 1 -b 8192 32 10 1', effort_factor=0.1, trace_memory=True)
+        self.assertListEqual(sorted(record.stage_elapsed.keys()), sorted(STAGES))
+        self.assertEqual(record.num_circuits, 2)
+        self.assertGreater(record.fpga_area_geomean, 0)
+        self.assertGreater(record.peak_traced_kb, 0)
+        self.assertEqual(BenchmarkRecord.deserialize(
+            record.serialize()), record)
+
+    def test_compare_to_baseline(self):
+        baseline = BenchmarkRecord(timestamp=0, mapper_version='1', inputs_hash='', arch_str='', num_circuits=1, scale=1, effort_factor=1.0,
+                                   stage_elapsed={'L1': 1.0, 'L2': 2.0, 'SHARING': 0.01}, total_elapsed=3.01, peak_rss_kb=1000, peak_traced_kb=None, fpga_area_geomean=100.0)
+        thresholds = RegressionThresholds(time=0.1, memory=0.1, area=0.001)
+        self.assertListEqual(compare_to_baseline(
+            record=baseline, baseline=baseline, thresholds=thresholds), [])
+
+        # Noisy tiny stage is ignored
+        record = baseline._replace(
+            stage_elapsed={'L1': 1.05, 'L2': 2.0, 'SHARING': 0.02})
+        self.assertListEqual(compare_to_baseline(
+            record=record, baseline=baseline, thresholds=thresholds), [])
+
+        record = baseline._replace(stage_elapsed={
+                                   'L1': 1.5, 'L2': 2.0, 'SHARING': 0.01}, fpga_area_geomean=101.0)
+        regressions = compare_to_baseline(
+            record=record, baseline=baseline, thresholds=thresholds)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('L1'))
+        self.assertTrue(regressions[1].startswith('AREA'))
@@ -0,0 +1,108 @@
+import os
+import unittest
+
+from .checker import check_mapping_file
+from .siv_arch import SIVArch
+from .testing import InputFilesTestMixin
+
+
+class CheckerTestCase(InputFilesTestMixin, unittest.TestCase):
+    logical_rams_str = '''Num_Circuits 1
+Circuit	RamID	Mode		Depth	Width
+0	0	SimpleDualPort	45	12
+0	1	ROM	100	8
+0	2	SinglePort	50	8
+'''
+    logic_blocks_str = '''Circuit	"# Logic blocks (N=10, k=6, fracturable)"
+0	100
+'''
+    mapping_str = '''// Num_Circuits 1
+// Circuit=0 Ram=0
+0 0 0 LW 12 LD 45 ID 0 S 1 P 1 Type 2 Mode SimpleDualPort W 32 D 256
+// Circuit=0 Ram=1
+0 1 0 LW 8 LD 100 ID 1 S 1 P 1 Type 2 Mode TrueDualPort W 16 D 512
+// Circuit=0 Ram=2
+0 2 0 LW 8 LD 50 ID 1 S 1 P 1 Type 2 Mode TrueDualPort W 16 D 512
+'''
+
+    def setUp(self):
+        super().setUp()
+        self._lcs = self.read_logical_circuits()
+        self._archs = SIVArch.from_str(
+            '-l 1 1 -b 8192 32 10 1 -b 131072 128 300 1')
+
+    def check(self, mapping_str: str):
+        filename = os.path.join(self._tmp_dir.name, 'mapping.txt')
+        with open(filename, 'w') as f:
+            f.write(mapping_str)
+        return check_mapping_file(archs=self._archs, logical_circuits=self._lcs, filename=filename)
+
+    def test_check_mapping_file_legal(self):
+        result = self.check(self.mapping_str)
+        self.assertListEqual(result.violations, [])
+        self.assertTrue(result.is_legal())
+        self.assertEqual(len(result.circuit_qors), 1)
+        self.assertListEqual(
+            result.circuit_qors[0].ram_type_count_list, [0, 2, 0])
+        self.assertAlmostEqual(result.fpga_area_geomean,
+                               result.circuit_qors[0].fpga_area)
+
+    def test_check_mapping_file_extra_lut_count(self):
+        result = self.check(self.mapping_str.replace(
+            '0 0 0 LW 12', '0 0 3 LW 12'))
+        self.assertFalse(result.is_legal())
+        self.assertIn('Extra LUTs', result.violations[0])
+        self.assertIsNone(result.fpga_area_geomean)
+
+    def test_check_mapping_file_not_covered(self):
+        result = self.check(self.mapping_str.replace(
+            'W 32 D 256', 'W 8 D 1024'))
+        self.assertFalse(result.is_legal())
+        self.assertIn('does not cover', result.violations[0])
+
+    def test_check_mapping_file_invalid_shape(self):
+        result = self.check(self.mapping_str.replace(
+            'W 32 D 256', 'W 64 D 128'))
+        self.assertFalse(result.is_legal())
+        self.assertIn('has no', result.violations[0])
+
+    def test_check_mapping_file_unmapped(self):
+        result = self.check(self.mapping_str.replace(
+            '0 2 0 LW 8 LD 50 ID 1 S 1 P 1 Type 2 Mode TrueDualPort W 16 D 512\n', ''))
+        self.assertFalse(result.is_legal())
+        self.assertIn('Unmapped RAMs [2]', result.violations[0])
+
+    def test_check_mapping_file_sharing_dual_port(self):
+        result = self.check(self.mapping_str.replace(
+            '0 1 0 LW 8 LD 100 ID 1', '0 1 0 LW 8 LD 100 ID 0').replace(
+            '0 2 0 LW 8 LD 50 ID 1', '0 2 0 LW 8 LD 50 ID 0'))
+        self.assertFalse(result.is_legal())
+        self.assertIn('only 2 RAMs can share', result.violations[0])
+
+    def test_check_mapping_file_sharing_disagree(self):
+        result = self.check(self.mapping_str.replace(
+            '0 2 0 LW 8 LD 50 ID 1 S 1 P 1 Type 2 Mode TrueDualPort W 16 D 512', '0 2 0 LW 8 LD 50 ID 1 S 1 P 1 Type 2 Mode TrueDualPort W 8 D 1024'))
+        self.assertFalse(result.is_legal())
+        self.assertListEqual(result.violations, [
+                             'Circuit=0 ID=1: Leaves of RAMs [1, 2] do not agree on the physical RAM'])
+
+    def test_check_mapping_file_unknown_circuit(self):
+        result = self.check(self.mapping_str + '''// Circuit=3 Ram=0
+3 0 0 LW 36 LD 2048 parallel
+    LW 32 LD 2048 ID 0 S 1 P 1 Type 3 Mode TrueDualPort W 32 D 4096
+    LW 4 LD 2048 ID 1 S 1 P 1 Type 2 Mode TrueDualPort W 4 D 2048
+''')
+        self.assertFalse(result.is_legal())
+        self.assertListEqual(result.violations, ['Circuit=3: Unknown circuit'])
+        self.assertIsNone(result.fpga_area_geomean)
+
+    def test_check_mapping_file_unshared_mode(self):
+        result = self.check(self.mapping_str.replace(
+            '0 2 0 LW 8 LD 50 ID 1', '0 2 0 LW 8 LD 50 ID 2'))
+        self.assertFalse(result.is_legal())
+        self.assertEqual(len(result.violations), 2)
+
+    def test_check_mapping_file_malformed(self):
+        result = self.check(self.mapping_str.replace('LD 45', 'LD x'))
+        self.assertFalse(result.is_legal())
+        self.assertIn('Malformed', result.violations[0])
@@ -0,0 +1,60 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from .checkpoint import RunCheckpoint, RunManifest
+from .logger import logger
+from .logical_circuit import LogicalCircuit
+from .logical_ram import LogicalRam, RamMode, RamShape, RamShapeFit
+from .mapping_config import CircuitConfig, LogicalRamConfig, PhysicalRamConfig, RamConfig
+from .solver_metrics import SolverMetrics
+
+
+class CheckpointTestCase(unittest.TestCase):
+    manifest = RunManifest(mapper_version='1', inputs_hash='abc', arch_str='-l 1 1',
+                           effort_factor=1.0, num_circuits=2, warm_start_hash=None)
+
+    def setUp(self):
+        self._logging_level = logger.level
+        logger.setLevel(logging.ERROR)
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._run_dir = os.path.join(self._tmp_dir.name, 'run')
+        self._lcs = {circuit_id: LogicalCircuit(circuit_id=circuit_id, num_logic_blocks=1, rams={
+            0: LogicalRam(circuit_id=circuit_id, ram_id=0, mode=RamMode.ROM, shape=RamShape(width=8, depth=100))}) for circuit_id in range(2)}
+
+    def tearDown(self):
+        logger.setLevel(self._logging_level)
+        self._tmp_dir.cleanup()
+
+    @staticmethod
+    def generate_CircuitConfig(circuit_id: int) -> CircuitConfig:
+        prc = PhysicalRamConfig(id=0, physical_shape_fit=RamShapeFit(num_series=1, num_parallel=1), ram_arch_id=2,
+                                ram_mode=RamMode.ROM, physical_shape=RamShape(width=8, depth=1024))
+        cc = CircuitConfig(circuit_id=circuit_id)
+        cc.insert_ram_config(RamConfig(circuit_id=circuit_id, ram_id=0, lrc=LogicalRamConfig(
+            logical_shape=RamShape(width=8, depth=100), prc=prc), ram_mode=RamMode.ROM))
+        return cc
+
+    def test_save_and_resume(self):
+        checkpoint = RunCheckpoint(
+            run_dir=self._run_dir, manifest=self.manifest, resume=False)
+        metrics = [SolverMetrics(circuit_id=1, stage='L1', step='ANNEAL')]
+        checkpoint.save(self.generate_CircuitConfig(1), metrics)
+
+        solved = RunCheckpoint(run_dir=self._run_dir, manifest=self.manifest,
+                               resume=True).load_solved(self._lcs)
+        self.assertListEqual(list(solved.keys()), [1])
+        self.assertEqual(solved[1][0], self.generate_CircuitConfig(1))
+        self.assertListEqual(solved[1][1], metrics)
+
+        # Start over
+        self.assertEqual(len(RunCheckpoint(run_dir=self._run_dir, manifest=self.manifest,
+                         resume=False).load_solved(self._lcs)), 0)
+
+    def test_resume_mismatch(self):
+        RunCheckpoint(run_dir=self._run_dir,
+                      manifest=self.manifest, resume=False)
+        with self.assertRaises(ValueError):
+            RunCheckpoint(run_dir=self._run_dir, manifest=self.manifest._replace(
+                arch_str='-l 1 2'), resume=True)
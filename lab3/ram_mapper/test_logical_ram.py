@@ -1,5 +1,5 @@
 import unittest
-from .logical_ram import LogicalRam, RamMode, RamShape, parse_grouped_LogicalRam
+from .logical_ram import LogicalRam, RamMode, RamShape, iter_grouped_LogicalRam, parse_grouped_LogicalRam
 
 
 class LogicalRamTestCase(unittest.TestCase):
@@ -47,3 +47,29 @@ class LogicalRamTestCase(unittest.TestCase):
         for lr_subgroup in lr_group.values():
             self.assertEqual(list(lr_subgroup.keys()),
                              sorted(lr_subgroup.keys()))
+
+    def test_iter_grouped_LogicalRam(self):
+        input_str = '''
+        Num_Circuits 3
+        Circuit	RamID	Mode		Depth	Width
+        6	1	SimpleDualPort	45	12
+        6	0	ROM           	256	8
+        2	30	TrueDualPort  	512	39
+
+        5	20	SinglePort    	2048	32
+        '''
+        lr_group = list(iter_grouped_LogicalRam(iter(input_str.splitlines())))
+        self.assertListEqual([circuit_id for circuit_id, _ in lr_group], [6, 2, 5])
+        self.assertListEqual(list(lr_group[0][1].keys()), [0, 1])
+        self.assertEqual(lr_group[2][1][20], LogicalRam(
+            circuit_id=5, ram_id=20, mode=RamMode.SinglePort, shape=RamShape(depth=2048, width=32)))
+
+        not_grouped_str = '''
+        Num_Circuits 2
+        Circuit	RamID	Mode		Depth	Width
+        6	0	SimpleDualPort	45	12
+        2	30	TrueDualPort  	512	39
+        6	1	ROM           	256	8
+        '''
+        with self.assertRaises(AssertionError):
+            list(iter_grouped_LogicalRam(iter(not_grouped_str.splitlines())))
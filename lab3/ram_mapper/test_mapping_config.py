@@ -1,7 +1,10 @@
+import copy
+import pickle
 import unittest
 
-from .logical_ram import RamShape, RamShapeFit
-from .mapping_config import CircuitConfig, RamConfig, LogicalRamConfig, PhysicalRamConfig, RamMode, CombinedLogicalRamConfig, RamSplitDimension
+from .logical_ram import LogicalRam, RamShape, RamShapeFit
+from .logical_circuit import LogicalCircuit
+from .mapping_config import CircuitConfig, RamConfig, LogicalRamConfig, PhysicalRamConfig, RamMode, CombinedLogicalRamConfig, RamSplitDimension, decode_CircuitConfig, encode_CircuitConfig, parse_grouped_CircuitConfig
 
 
 class MappingConfigTestCase(unittest.TestCase):
@@ -198,3 +201,92 @@ class MappingConfigTestCase(unittest.TestCase):
     def test_CircuitConfig_2_3_level_get_extra_lut_count(self):
         cc = self.generate_2_3_level_CircuitConfig()
         self.assertEqual(cc.get_extra_lut_count(), 62)
+
+    def test_parse_grouped_CircuitConfig(self):
+        expected_cc = CircuitConfig(circuit_id=3)
+        expected_cc.insert_ram_config(self.generate_3level_RamConfig())
+        lc = LogicalCircuit(circuit_id=3, num_logic_blocks=0, rams={
+            8: LogicalRam(circuit_id=3, ram_id=8, mode=RamMode.SinglePort, shape=RamShape(width=30, depth=8200))})
+        ccs = list(parse_grouped_CircuitConfig(
+            iter(expected_cc.serialize(0).splitlines()), {3: lc}))
+        self.assertEqual(len(ccs), 1)
+        self.assertEqual(ccs[0].serialize(0), expected_cc.serialize(0))
+        self.assertEqual(ccs[0], expected_cc)
+
+    def test_parse_grouped_CircuitConfig_sharing(self):
+        input_str = '''
+        // Num_Circuits 2
+        // Circuit=0 Ram=0
+        0 0 0 LW 8 LD 100 ID 0 S 1 P 1 Type 2 Mode TrueDualPort W 16 D 512
+        // Circuit=0 Ram=1
+        0 1 0 LW 16 LD 200 ID 0 S 1 P 1 Type 2 Mode TrueDualPort W 16 D 512
+        // Circuit=1 Ram=0
+        1 0 0 LW 16 LD 200 ID 0 S 1 P 1 Type 2 Mode ROM W 16 D 512
+        '''
+        lcs = {
+            0: LogicalCircuit(circuit_id=0, num_logic_blocks=0, rams={
+                0: LogicalRam(circuit_id=0, ram_id=0, mode=RamMode.SinglePort, shape=RamShape(width=8, depth=100)),
+                1: LogicalRam(circuit_id=0, ram_id=1, mode=RamMode.ROM, shape=RamShape(width=16, depth=200))}),
+            1: LogicalCircuit(circuit_id=1, num_logic_blocks=0, rams={
+                0: LogicalRam(circuit_id=1, ram_id=0, mode=RamMode.ROM, shape=RamShape(width=16, depth=200))})}
+        cc0, cc1 = parse_grouped_CircuitConfig(
+            iter(input_str.splitlines()), lcs)
+        self.assertIs(cc0.rams[0].lrc.prc, cc0.rams[1].lrc.prc)
+        self.assertEqual(cc0.rams[1].ram_mode, RamMode.ROM)
+        self.assertListEqual(cc0.get_unique_physical_ram_count(), [0, 0, 1])
+        self.assertIsNot(cc1.rams[0].lrc.prc, cc0.rams[0].lrc.prc)
+        self.assertEqual(cc1.rams[0].lrc.prc.ram_mode, RamMode.ROM)
+
+    def test_parse_grouped_CircuitConfig_skip_unknown_circuits(self):
+        # Warm start of a --circuits/--shard subset from a full prior mapping
+        input_str = '''
+        // Num_Circuits 3
+        // Circuit=0 Ram=0
+        0 0 0 LW 8 LD 100 ID 0 S 1 P 1 Type 2 Mode ROM W 16 D 512
+        // Circuit=2 Ram=0
+        2 0 0 LW 36 LD 2048 parallel
+            LW 32 LD 2048 ID 0 S 1 P 1 Type 3 Mode TrueDualPort W 32 D 4096
+            LW 4 LD 2048 ID 1 S 1 P 1 Type 2 Mode TrueDualPort W 4 D 2048
+        // Circuit=3 Ram=0
+        3 0 0 LW 16 LD 200 ID 0 S 1 P 1 Type 2 Mode ROM W 16 D 512
+        '''
+        lcs = {circuit_id: LogicalCircuit(circuit_id=circuit_id, num_logic_blocks=0, rams={
+            0: LogicalRam(circuit_id=circuit_id, ram_id=0, mode=RamMode.ROM, shape=RamShape(width=16, depth=200))}) for circuit_id in [0, 3]}
+        with self.assertRaises(KeyError):
+            list(parse_grouped_CircuitConfig(
+                iter(input_str.splitlines()), lcs))
+        ccs = list(parse_grouped_CircuitConfig(
+            iter(input_str.splitlines()), lcs, skip_unknown_circuits=True))
+        self.assertListEqual([cc.circuit_id for cc in ccs], [0, 3])
+        self.assertEqual(ccs[1].rams[0].lrc.logical_shape,
+                         RamShape(width=16, depth=200))
+
+    def test_RamConfig_3level_slots(self):
+        rc = self.generate_3level_RamConfig()
+        rc.execute_on_leaf(
+            lambda lrc: self.assertFalse(hasattr(lrc.prc, '__dict__')))
+        self.assertFalse(hasattr(rc.lrc, '__dict__'))
+        self.assertFalse(hasattr(rc.lrc.clrc, '__dict__'))
+        for rc_copy in [copy.deepcopy(rc), pickle.loads(pickle.dumps(rc))]:
+            self.assertEqual(rc_copy, rc)
+            self.assertEqual(rc_copy.serialize(0), rc.serialize(0))
+
+    def test_encode_CircuitConfig(self):
+        cc = CircuitConfig(circuit_id=3)
+        cc.insert_ram_config(self.generate_3level_RamConfig())
+        rc = self.generate_1level_RamConfig()
+        rc.lrc.prc.id = 9
+        cc.insert_ram_config(RamConfig(circuit_id=3, ram_id=0,
+                             lrc=rc.lrc, ram_mode=rc.ram_mode))
+        # Shared with the leaf of RAM 0
+        rc = self.generate_1level_RamConfig()
+        cc.insert_ram_config(RamConfig(circuit_id=3, ram_id=1, lrc=LogicalRamConfig(
+            logical_shape=rc.lrc.logical_shape, prc=cc.rams[0].lrc.prc), ram_mode=RamMode.SinglePort))
+
+        decoded_cc = decode_CircuitConfig(encode_CircuitConfig(cc))
+        self.assertEqual(decoded_cc, cc)
+        self.assertEqual(decoded_cc.serialize(0), cc.serialize(0))
+        self.assertIs(decoded_cc.rams[0].lrc.prc, decoded_cc.rams[1].lrc.prc)
+        self.assertEqual(decoded_cc.rams[1].ram_mode, RamMode.SinglePort)
+        self.assertEqual(decode_CircuitConfig(
+            encode_CircuitConfig(CircuitConfig(circuit_id=1))), CircuitConfig(circuit_id=1))
@@ -0,0 +1,85 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from .driver import default_qor_filename, select_shard
+from .logger import logger
+from .logical_circuit import LogicalCircuit
+from .logical_ram import LogicalRam, RamMode, RamShape
+from .merge import merge_shards
+from .siv_heuristics import CircuitQor, serialize_CircuitQor_to_file
+
+
+class MergeTestCase(unittest.TestCase):
+    mapping_strs = ['''// Num_Circuits 2
+// Circuit=0 Ram=0
+0 0 0 LW 12 LD 45 ID 0 S 1 P 1 Type 2 Mode SimpleDualPort W 32 D 256
+// Circuit=2 Ram=0
+2 0 0 LW 36 LD 2048 parallel
+    LW 32 LD 2048 ID 0 S 1 P 1 Type 3 Mode TrueDualPort W 32 D 4096
+    LW 4 LD 2048 ID 1 S 1 P 1 Type 2 Mode TrueDualPort W 4 D 2048
+// Circuit=2 Ram=1
+2 1 0 LW 8 LD 100 ID 2 S 1 P 1 Type 2 Mode ROM W 8 D 1024
+''', '''// Num_Circuits 1
+// Circuit=1 Ram=0
+1 0 0 LW 8 LD 100 ID 0 S 1 P 1 Type 2 Mode ROM W 8 D 1024
+''']
+
+    def setUp(self):
+        self._logging_level = logger.level
+        logger.setLevel(logging.ERROR)
+        self._tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        logger.setLevel(self._logging_level)
+        self._tmp_dir.cleanup()
+
+    def write_shard(self, shard_index: int, circuit_ids):
+        filename = os.path.join(
+            self._tmp_dir.name, f'mapping_{shard_index}.txt')
+        with open(filename, 'w') as f:
+            f.write(self.mapping_strs[shard_index])
+        serialize_CircuitQor_to_file(filename=default_qor_filename(filename), circuit_qors=[CircuitQor(
+            ram_type_count_list=[0, 1, 0], regular_logic_block_count=10, required_logic_block_count=10, fpga_area=100 * (circuit_id + 1), circuit_id=circuit_id) for circuit_id in circuit_ids], num_types=3)
+        return filename
+
+    def test_select_shard(self):
+        lcs = {circuit_id: LogicalCircuit(circuit_id=circuit_id, num_logic_blocks=1, rams={
+            ram_id: LogicalRam(circuit_id=circuit_id, ram_id=ram_id, mode=RamMode.ROM, shape=RamShape(width=1, depth=1)) for ram_id in range(num_rams)})
+            for circuit_id, num_rams in enumerate([10, 1, 9, 2, 8, 3, 5])}
+        shards = [select_shard(logical_circuits=lcs, shard_index=idx,
+                               num_shards=3) for idx in range(3)]
+        self.assertListEqual(sorted(circuit_id for shard in shards for circuit_id in shard), sorted(lcs.keys()))
+        self.assertListEqual([sum(len(lc.rams) for lc in shard.values())
+                             for shard in shards], [13, 12, 13])
+        for shard in shards:
+            self.assertListEqual(list(shard.keys()), sorted(shard.keys()))
+
+    def test_merge_shards(self):
+        filenames = [self.write_shard(1, [1]), self.write_shard(0, [0, 2])]
+        out = os.path.join(self._tmp_dir.name, 'mapping.txt')
+        circuit_qors = merge_shards(mapping_filenames=filenames, out_filename=out)
+        self.assertListEqual(
+            [qor.circuit_id for qor in circuit_qors], [0, 1, 2])
+        with open(out) as f:
+            merged_lines = f.read().splitlines()
+        self.assertEqual(merged_lines[0], '// Num_Circuits 3')
+        self.assertEqual(merged_lines[3], '// Circuit=1 Ram=0')
+        self.assertEqual(len(merged_lines), 1 + 2 + 2 + 4 + 2)
+
+    def test_merge_shards_duplicated(self):
+        filenames = [self.write_shard(0, [0, 2]), self.write_shard(0, [0, 2])]
+        with self.assertRaises(ValueError):
+            merge_shards(mapping_filenames=filenames, out_filename=os.path.join(
+                self._tmp_dir.name, 'mapping.txt'))
+
+    def test_merge_shards_empty(self):
+        filename = os.path.join(self._tmp_dir.name, 'mapping_0.txt')
+        with open(filename, 'w') as f:
+            f.write('// Num_Circuits 0\n')
+        serialize_CircuitQor_to_file(filename=default_qor_filename(
+            filename), circuit_qors=[], num_types=3)
+        with self.assertRaises(ValueError):
+            merge_shards(mapping_filenames=[filename], out_filename=os.path.join(
+                self._tmp_dir.name, 'mapping.txt'))
@@ -0,0 +1,52 @@
+import argparse
+import os
+import unittest
+
+from . import profiler
+from .siv_arch import SIVArch
+from .testing import InputFilesTestMixin
+from .transform import solve_all_circuits
+
+
+def busy_loop(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+class ProfilerTestCase(InputFilesTestMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self._profile_dir = os.path.join(self._tmp_dir.name, 'profile')
+        profiler.prepare_profile_dir(self._profile_dir)
+
+    def tearDown(self):
+        profiler.stop_and_dump()
+        super().tearDown()
+
+    def test_profile_stage(self):
+        profiler.start(self._profile_dir)
+        with profiler.profile_stage('L1'):
+            busy_loop(1000)
+            with profiler.profile_stage('SHARING'):
+                busy_loop(10)
+        self.assertEqual(len(profiler.stop_and_dump()), 3)
+        self.assertFalse(profiler.is_profiling())
+
+        merged = profiler.merge_profiles(self._profile_dir)
+        self.assertListEqual(sorted(merged.keys()), [
+                             'ALL', 'L1', 'MAIN', 'SHARING'])
+        self.assertGreater(profiler.get_hot_path_tottime(
+            merged['L1'], 'busy_loop'), 0)
+        self.assertEqual(profiler.get_hot_path_tottime(
+            merged['MAIN'], 'busy_loop'), 0)
+        self.assertIsNotNone(profiler.write_report(self._profile_dir))
+
+    def test_profile_workers(self):
+        lcs = self.read_logical_circuits()
+        solve_all_circuits(archs=SIVArch.from_str('-l 1 1 -b 8192 32 10 1'), logical_circuits=lcs,
+                           args=argparse.Namespace(processes=2, verbose=0, quiet=True), effort_factor=0.1, profile_dir=self._profile_dir)
+
+        merged = profiler.merge_profiles(self._profile_dir)
+        for stage in ['WORKER', 'L1', 'L2', 'SHARING']:
+            self.assertIn(stage, merged)
+        self.assertGreater(profiler.get_hot_path_tottime(
+            merged['L1'], 'evaluate_apply_move'), 0)
@@ -1,7 +1,7 @@
 import unittest
 
 from .siv_arch import DEFAULT_RAM_ARCH_STR, SIVArch
-from .siv_heuristics import calculate_fpga_qor
+from .siv_heuristics import CircuitQor, calculate_fpga_qor
 
 
 class SIVHeuristicsTestCase(unittest.TestCase):
@@ -10,3 +10,10 @@ class SIVHeuristicsTestCase(unittest.TestCase):
         fpga_qor = calculate_fpga_qor(archs=archs, logic_block_count=20,
                                       extra_lut_count=33, physical_ram_count=[0, 8, 2], verbose=False)
         self.assertEqual(fpga_qor.fpga_area, 1489518)
+
+    def test_CircuitQor_deserialize(self):
+        archs = SIVArch.from_str(DEFAULT_RAM_ARCH_STR)
+        fpga_qor = calculate_fpga_qor(archs=archs, logic_block_count=20,
+                                      extra_lut_count=33, physical_ram_count=[0, 8, 2], verbose=False)
+        fpga_qor.circuit_id = 7
+        self.assertEqual(CircuitQor.deserialize(fpga_qor.serialize()), fpga_qor)
@@ -0,0 +1,55 @@
+import logging
+import os
+import unittest
+
+from .siv_arch import SIVArch
+from .solver_metrics import SolverMetrics, default_metrics_filename, read_SolverMetrics_from_file, serialize_SolverMetrics_to_file
+from .testing import InputFilesTestMixin
+from .transform import solve_single_circuit_with_metrics
+
+
+class SolverMetricsTestCase(InputFilesTestMixin, unittest.TestCase):
+    logical_rams_str = '''Num_Circuits 1
+Circuit	RamID	Mode		Depth	Width
+0	0	SimpleDualPort	45	12
+0	1	SinglePort	45	12
+0	2	SinglePort	100	8
+0	3	TrueDualPort	2048	36
+'''
+    logic_blocks_str = '''Circuit	"# Logic blocks (N=10, k=6, fracturable)"
+0	5
+'''
+
+    logging_level = logging.CRITICAL
+
+    def setUp(self):
+        super().setUp()
+        self._lcs = self.read_logical_circuits()
+        self._archs = SIVArch.from_str('-l 1 1 -b 8192 32 10 1')
+
+    def test_solve_single_circuit_with_metrics(self):
+        cc, metrics = solve_single_circuit_with_metrics(
+            archs=self._archs, logical_circuit=self._lcs[0], num_circuits=1, effort_factor=0.1)
+        self.assertEqual(len(cc.rams), 4)
+        self.assertTrue(all(m.circuit_id == 0 for m in metrics))
+        stages = {m.stage for m in metrics}
+        for stage in ['CANDIDATES', 'INITIAL', 'L1', 'CLIFF SPLIT', 'L2', 'SHARING']:
+            self.assertIn(stage, stages)
+
+        anneal = [m for m in metrics if m.stage ==
+                  'L1' and m.step == 'ANNEAL'][0]
+        self.assertGreater(anneal.steps, 0)
+        self.assertLessEqual(anneal.accepted, anneal.steps)
+        self.assertLessEqual(anneal.best_area, anneal.initial_area)
+
+        sharing = [m for m in metrics if m.stage == 'SHARING'][0]
+        self.assertIn('sharing_pairs', sharing.counters)
+
+    def test_serialize_round_trip(self):
+        metrics = [SolverMetrics(circuit_id=0, stage='L1', step='ANNEAL', elapsed=0.5, steps=10, accepted=3, initial_area=7, final_area=5, best_area=5),
+                   SolverMetrics(circuit_id=1, stage='SHARING', step='SHARE', counters={'sharing_pairs': 2})]
+        filename = default_metrics_filename(
+            os.path.join(self._tmp_dir.name, 'mapping.txt'))
+        self.assertTrue(filename.endswith('mapping_metrics.jsonl'))
+        serialize_SolverMetrics_to_file(filename, metrics)
+        self.assertListEqual(read_SolverMetrics_from_file(filename), metrics)
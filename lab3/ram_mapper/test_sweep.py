@@ -0,0 +1,49 @@
+import argparse
+import os
+import unittest
+
+from .logical_circuit import iter_LogicalCircuit_from_file, read_LogicBlock_from_file
+from .siv_arch import SIVArch
+from .sweep import Sweeper
+from .testing import InputFilesTestMixin
+from .transform import solve_all_circuits, solve_circuit_stream
+
+
+class SweepTestCase(InputFilesTestMixin, unittest.TestCase):
+    arch_strs = ['-l 1 1 -b 8192 32 10 1', '-l 1 1 -b 8192 16 10 1']
+
+    def test_sweep_matches_solve_all_circuits(self):
+        lcs = self.read_logical_circuits()
+        out = os.path.join(self._tmp_dir.name, 'mapping.txt')
+        with Sweeper(logic_block_count_filename=self._lb, logical_rams_filename=self._lr, processes=1) as sweeper:
+            results = sweeper.sweep(
+                self.arch_strs, out_filenames={self.arch_strs[0]: out})
+        self.assertListEqual(list(results.keys()), self.arch_strs)
+        for arch_str in self.arch_strs:
+            acc = solve_all_circuits(archs=SIVArch.from_str(arch_str), logical_circuits=lcs,
+                                     args=argparse.Namespace(processes=1))
+            self.assertEqual(results[arch_str].acc.serialize(0), acc.serialize(0))
+            self.assertEqual(len(results[arch_str].circuit_qors), 2)
+            self.assertGreater(results[arch_str].fpga_area_geomean, 0)
+        with open(out) as f:
+            self.assertEqual(f.read(), results[self.arch_strs[0]].acc.serialize(0))
+
+    def test_solve_all_circuits_processes(self):
+        lcs = self.read_logical_circuits()
+        archs = SIVArch.from_str(self.arch_strs[0])
+        accs = [solve_all_circuits(archs=archs, logical_circuits=lcs, effort_factor=0.1,
+                                   args=argparse.Namespace(processes=processes, verbose=0, quiet=True)) for processes in [1, 2]]
+        self.assertEqual(accs[0].serialize(0), accs[1].serialize(0))
+
+    def test_solve_circuit_stream_matches_solve_all_circuits(self):
+        lcs = self.read_logical_circuits()
+        archs = SIVArch.from_str(self.arch_strs[0])
+        acc = solve_all_circuits(archs=archs, logical_circuits=lcs, effort_factor=0.1,
+                                 args=argparse.Namespace(processes=1))
+        for processes in [1, 2]:
+            results = list(solve_circuit_stream(archs=archs, logical_circuits=iter_LogicalCircuit_from_file(
+                logic_blocks=read_LogicBlock_from_file(self._lb), loigicalram_filename=self._lr), num_circuits=2, effort_factor=0.1,
+                args=argparse.Namespace(processes=processes, verbose=0, quiet=True), max_in_flight=1))
+            self.assertListEqual([lc for lc, _, _ in results], list(lcs.values()))
+            self.assertListEqual([cc.serialize(0) for _, cc, _ in results], [
+                                 cc.serialize(0) for cc in acc.circuits.values()])
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from .siv_arch import normalize_arch_str
+from .siv_heuristics import CircuitQor
+from .sweep_cache import SweepCache
+
+
+class SweepCacheTestCase(unittest.TestCase):
+    effort = {'max_circuits': None, 'effort_factor': 1.0}
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._cache_filename = os.path.join(
+            self._tmp_dir.name, 'sweep_cache.sqlite3')
+        self._input_filename = os.path.join(
+            self._tmp_dir.name, 'logical_rams.txt')
+        with open(self._input_filename, 'w') as f:
+            f.write('Num_Circuits 0\n')
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_normalize_arch_str(self):
+        self.assertEqual(normalize_arch_str(
+            ' -L 1  1 -b 8192 32 10 1 '), '-l 1 1 -b 8192 32 10 1')
+
+    def test_put_get(self):
+        qors = [CircuitQor(ram_type_count_list=[0, 3], regular_logic_block_count=10,
+                           required_logic_block_count=30, fpga_area=123456, circuit_id=0)]
+        with SweepCache(self._cache_filename, [self._input_filename]) as cache:
+            self.assertIsNone(cache.get('-l 1 1 -b 8192 32 10 1', self.effort))
+            cache.put('-l 1 1 -b 8192 32 10 1', self.effort,
+                      1.5e8, qors, 'mapping.txt')
+
+        with SweepCache(self._cache_filename, [self._input_filename]) as cache:
+            cached = cache.get('-l 1  1 -b 8192 32 10 1', self.effort)
+            self.assertIsNotNone(cached)
+            self.assertEqual(cached.fpga_area_geomean, 1.5e8)
+            self.assertListEqual(cached.circuit_qors, qors)
+            self.assertEqual(cached.mapping_filename, 'mapping.txt')
+            self.assertIsNone(
+                cache.get('-l 1 1 -b 8192 64 10 1', self.effort))
+
+        # Different effort settings
+        with SweepCache(self._cache_filename, [self._input_filename]) as cache:
+            self.assertIsNone(cache.get('-l 1 1 -b 8192 32 10 1',
+                              {'max_circuits': 5, 'effort_factor': 1.0}))
+
+        # Different inputs
+        with open(self._input_filename, 'a') as f:
+            f.write('\n')
+        with SweepCache(self._cache_filename, [self._input_filename]) as cache:
+            self.assertIsNone(cache.get('-l 1 1 -b 8192 32 10 1', self.effort))
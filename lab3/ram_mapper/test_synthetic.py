@@ -0,0 +1,54 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from .logger import logger
+from .logical_circuit import read_LogicalCircuit_from_file, serialize_LogicalCircuit_to_file
+from .synthetic import WorkloadProfile, generate_logical_circuits
+from .test_logical_circuit import LogicalCircuitTestCase
+
+
+class SyntheticTestCase(unittest.TestCase):
+    def setUp(self):
+        self._logging_level = logger.level
+        logger.setLevel(logging.ERROR)
+        self._profile = WorkloadProfile.from_logical_circuits(
+            LogicalCircuitTestCase.generate_simple_LogicalCircuit())
+
+    def tearDown(self):
+        logger.setLevel(self._logging_level)
+
+    def test_from_logical_circuits(self):
+        self.assertListEqual(self._profile.circuit_sizes, [
+                             (3, 2941), (1, 2906), (1, 1836)])
+        self.assertEqual(sum(self._profile.mode_counts.values()), 5)
+
+    def test_generate_logical_circuits(self):
+        lcs = generate_logical_circuits(
+            profile=self._profile, num_circuits=20, ram_scale=10, seed=1)
+        self.assertEqual(len(lcs), 20)
+        for circuit_id, lc in lcs.items():
+            self.assertEqual(lc.circuit_id, circuit_id)
+            self.assertIn(len(lc.rams), [10, 30])
+            self.assertListEqual(list(lc.rams.keys()),
+                                 list(range(len(lc.rams))))
+            for ram in lc.rams.values():
+                self.assertIn(ram.shape, self._profile.mode_shapes[ram.mode])
+
+        # Deterministic
+        self.assertEqual(generate_logical_circuits(
+            profile=self._profile, num_circuits=20, ram_scale=10, seed=1), lcs)
+        self.assertNotEqual(generate_logical_circuits(
+            profile=self._profile, num_circuits=20, ram_scale=10, seed=2), lcs)
+
+    def test_serialize_round_trip(self):
+        lcs = generate_logical_circuits(
+            profile=self._profile, num_circuits=5, ram_scale=2)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            lb = os.path.join(tmp_dir, 'logic_block_count.txt')
+            lr = os.path.join(tmp_dir, 'logical_rams.txt')
+            serialize_LogicalCircuit_to_file(
+                logicblock_filename=lb, loigicalram_filename=lr, logical_circuits=lcs)
+            self.assertEqual(read_LogicalCircuit_from_file(
+                logicblock_filename=lb, loigicalram_filename=lr), lcs)
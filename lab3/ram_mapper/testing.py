@@ -0,0 +1,53 @@
+import logging
+import os
+import tempfile
+from typing import Dict
+
+from .logger import logger
+from .logical_circuit import LogicalCircuit, read_LogicalCircuit_from_file
+
+# Two small circuits, cheap enough to solve end to end in a unit test
+LOGICAL_RAMS_STR = '''Num_Circuits 2
+Circuit	RamID	Mode		Depth	Width
+0	0	SimpleDualPort	45	12
+0	1	ROM	45	12
+0	2	SinglePort	72	21
+1	0	SimpleDualPort	32	18
+1	1	TrueDualPort	2048	36
+'''
+LOGIC_BLOCKS_STR = '''Circuit	"# Logic blocks (N=10, k=6, fracturable)"
+0	5
+1	3
+'''
+
+
+class InputFilesTestMixin:
+    '''
+    Mixin of a unittest.TestCase that runs on input files:
+    each test gets logical_rams_str and logic_blocks_str written to a fresh temporary directory
+    (self._tmp_dir, self._lr, self._lb) and the logger quieted to logging_level
+    '''
+    logical_rams_str = LOGICAL_RAMS_STR
+    logic_blocks_str = LOGIC_BLOCKS_STR
+    logging_level = logging.ERROR
+
+    def setUp(self):
+        super().setUp()
+        self._logging_level = logger.level
+        logger.setLevel(self.logging_level)
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._lr = os.path.join(self._tmp_dir.name, 'logical_rams.txt')
+        self._lb = os.path.join(self._tmp_dir.name, 'logic_block_count.txt')
+        with open(self._lr, 'w') as f:
+            f.write(self.logical_rams_str)
+        with open(self._lb, 'w') as f:
+            f.write(self.logic_blocks_str)
+
+    def tearDown(self):
+        logger.setLevel(self._logging_level)
+        self._tmp_dir.cleanup()
+        super().tearDown()
+
+    def read_logical_circuits(self) -> Dict[int, LogicalCircuit]:
+        return read_LogicalCircuit_from_file(
+            logicblock_filename=self._lb, loigicalram_filename=self._lr)
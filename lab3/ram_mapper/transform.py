@@ -1,58 +1,212 @@
 from abc import ABC, abstractmethod
-from collections import Counter, defaultdict
+from array import array
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
 import copy
 from enum import IntEnum, auto
-from itertools import starmap
 import math
 import random
-from typing import Callable, DefaultDict, Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+from typing import Callable, DefaultDict, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 
 from .siv_heuristics import calculate_chip_leftover_ram_supply, calculate_fpga_qor, calculate_fpga_qor_for_ram_config, calculate_ram_area
 
 from .logger import logger
+from .profiler import profile_process_initializer, profile_stage
 from .logical_ram import LogicalRam, RamMode, RamShape, RamShapeFit
-from .utils import list_add, list_sub, sorted_dict_items, proccess_initializer
-from .mapping_config import AllCircuitConfig, CircuitConfig, CombinedLogicalRamConfig, LogicalRamConfig, PhysicalRamConfig, RamConfig, RamSplitDimension
+from .utils import elapsed_timer, list_add, list_sub, sorted_dict_items, proccess_initializer
+from .mapping_config import AllCircuitConfig, CircuitConfig, CombinedLogicalRamConfig, LogicalRamConfig, PhysicalRamConfig, RamConfig, RamSplitDimension, decode_CircuitConfig, encode_CircuitConfig
 from .logical_circuit import LogicalCircuit
+from .solver_metrics import SolverMetrics
 from .siv_arch import RegularLogicBlockArch, SIVArch, SIVRamArch, determine_extra_luts
 from multiprocessing import Pool
+from multiprocessing.pool import AsyncResult
 
 
-def solve_all_circuits(archs: SIVArch, logical_circuits: Dict[int, LogicalCircuit], args) -> AllCircuitConfig:
-    num_circuits = len(logical_circuits)
+# Bump whenever a change of the solver may change its mapping results
+MAPPER_VERSION = '1'
+
+# Annealing effort of L1 when starting from a repaired prior solution
+WARM_START_EFFORT_FACTOR = 0.25
+
+
+class SolveContext(NamedTuple):
+    '''
+    Inputs shared by all circuits of solve_all_circuits, installed once per worker process
+    '''
+    archs: SIVArch
+    logical_circuits: Dict[int, LogicalCircuit]
+    # Of the whole run, the solver seeds depend on it
+    num_circuits: int
+    warm_start: Optional[AllCircuitConfig]
+    effort_factor: float
+
+
+# Installed once per process by solve_process_initializer
+_worker_solve_context: Optional[SolveContext] = None
+
+
+def solve_process_initializer(args, solve_context: SolveContext, profile_dir: Optional[str]):
+    global _worker_solve_context
+    if profile_dir is None:
+        proccess_initializer(args)
+    else:
+        profile_process_initializer(args, profile_dir)
+    _worker_solve_context = solve_context
+
+
+def solve_circuit_in_context(solve_context: SolveContext, circuit_id: int) -> Tuple[CircuitConfig, List[SolverMetrics]]:
+    warm_start = solve_context.warm_start
+    return solve_single_circuit_with_metrics(
+        archs=solve_context.archs,
+        logical_circuit=solve_context.logical_circuits[circuit_id],
+        num_circuits=solve_context.num_circuits,
+        warm_start_config=warm_start.circuits.get(
+            circuit_id) if warm_start is not None else None,
+        effort_factor=solve_context.effort_factor)
+
+
+def solve_encoded_circuit(circuit_id: int) -> Tuple[array, List[SolverMetrics]]:
+    '''
+    Worker task, only the circuit id is sent and the compact encoding of the result is returned
+    '''
+    circuit_config, metrics = solve_circuit_in_context(
+        solve_context=_worker_solve_context, circuit_id=circuit_id)
+    return (encode_CircuitConfig(circuit_config), metrics)
+
+
+def solve_encoded_logical_circuit(logical_circuit: LogicalCircuit) -> Tuple[array, List[SolverMetrics]]:
+    '''
+    Worker task of solve_circuit_stream, the circuit is sent with the task as the context holds no circuits
+    '''
+    circuit_config, metrics = solve_single_circuit_with_metrics(
+        archs=_worker_solve_context.archs, logical_circuit=logical_circuit, num_circuits=_worker_solve_context.num_circuits,
+        effort_factor=_worker_solve_context.effort_factor)
+    return (encode_CircuitConfig(circuit_config), metrics)
+
+
+def solve_circuit_stream(archs: SIVArch, logical_circuits: Iterable[LogicalCircuit], num_circuits: int, args, effort_factor: float = 1.0, profile_dir: Optional[str] = None, max_in_flight: Optional[int] = None) -> Iterator[Tuple[LogicalCircuit, CircuitConfig, List[SolverMetrics]]]:
+    '''
+    Lazily solve the circuits of logical_circuits and yield (logical_circuit, circuit_config, metrics) in the input order,
+    at most max_in_flight circuits (default 2x processes) are read ahead, so the memory does not grow with the input size
+    num_circuits - the number of circuits of the whole run, the solver seeds depend on it
+    '''
+    logger.warning(
+        f'Streaming {num_circuits} circuits using {args.processes} processes')
+    if args.processes == 1:
+        for lc in logical_circuits:
+            circuit_config, metrics = solve_single_circuit_with_metrics(
+                archs=archs, logical_circuit=lc, num_circuits=num_circuits, effort_factor=effort_factor)
+            yield (lc, circuit_config, metrics)
+        return
+
+    if max_in_flight is None:
+        max_in_flight = 2 * args.processes
+    assert max_in_flight > 0
+    solve_context = SolveContext(archs=archs, logical_circuits=dict(), num_circuits=num_circuits,
+                                 warm_start=None, effort_factor=effort_factor)
+    with Pool(processes=args.processes, initializer=solve_process_initializer, initargs=(args, solve_context, profile_dir)) as p:
+        in_flight: Deque[Tuple[LogicalCircuit, AsyncResult]] = deque()
+
+        def pop_result() -> Tuple[LogicalCircuit, CircuitConfig, List[SolverMetrics]]:
+            lc, async_result = in_flight.popleft()
+            encoded, metrics = async_result.get()
+            return (lc, decode_CircuitConfig(encoded), metrics)
+
+        for lc in logical_circuits:
+            if len(in_flight) >= max_in_flight:
+                yield pop_result()
+            in_flight.append(
+                (lc, p.apply_async(solve_encoded_logical_circuit, (lc, ))))
+        while len(in_flight) > 0:
+            yield pop_result()
+        # Let the workers exit normally to dump their profiles
+        p.close()
+        p.join()
+
+
+def solve_all_circuits(archs: SIVArch, logical_circuits: Dict[int, LogicalCircuit], args, warm_start: Optional[AllCircuitConfig] = None, effort_factor: float = 1.0, metrics: Optional[List[SolverMetrics]] = None, profile_dir: Optional[str] = None, num_circuits: Optional[int] = None, on_solved: Optional[Callable[[CircuitConfig, List[SolverMetrics]], None]] = None) -> AllCircuitConfig:
+    '''
+    warm_start - prior solution (possibly under a different arch) to repair and re-anneal from
+    effort_factor - scale of the annealing effort, 1.0 is full effort
+    metrics - if given, extended with the solver metrics of all circuits in the order of logical_circuits
+    profile_dir - if given, each worker process dumps its cProfile stats per solver stage there, see profiler.write_report
+    num_circuits - the number of circuits of the whole run if logical_circuits is a part of it, the solver seeds depend on it
+    on_solved - called in the main process as soon as each circuit is solved, in completion order
+    '''
+    if num_circuits is None:
+        num_circuits = len(logical_circuits)
     logger.warning(
-        f'Solving for {num_circuits} circuits using {args.processes} processes')
+        f'Solving for {len(logical_circuits)} circuits using {args.processes} processes' +
+        (' (warm start)' if warm_start is not None else ''))
 
     acc = AllCircuitConfig()
+    solve_context = SolveContext(archs=archs, logical_circuits=logical_circuits, num_circuits=num_circuits,
+                                 warm_start=warm_start, effort_factor=effort_factor)
 
-    def starmap_dispatcher(starmap_func):
-        circuit_configs = starmap_func(solve_single_circuit, map(
-            lambda lc: (archs, lc, num_circuits), logical_circuits.values()))
-        for circuit_config in circuit_configs:
+    # {circuit_id: metrics}
+    circuit_metrics_dict: Dict[int, List[SolverMetrics]] = dict()
+
+    def collect(results: Iterable[Tuple[CircuitConfig, List[SolverMetrics]]]):
+        for circuit_config, circuit_metrics in results:
             acc.insert_circuit_config(cc=circuit_config)
+            circuit_metrics_dict[circuit_config.circuit_id] = circuit_metrics
+            if on_solved is not None:
+                on_solved(circuit_config, circuit_metrics)
 
     if args.processes == 1:
-        starmap_dispatcher(starmap_func=starmap)
+        collect(map(lambda circuit_id: solve_circuit_in_context(
+            solve_context=solve_context, circuit_id=circuit_id), logical_circuits.keys()))
     else:
-        with Pool(processes=args.processes, initializer=proccess_initializer, initargs=(args,)) as p:
-            starmap_dispatcher(starmap_func=p.starmap)
+        # The shared inputs are installed once per worker, instead of being pickled with every task
+        with Pool(processes=args.processes, initializer=solve_process_initializer, initargs=(args, solve_context, profile_dir)) as p:
+            collect(map(lambda result: (decode_CircuitConfig(result[0]), result[1]), p.imap_unordered(
+                solve_encoded_circuit, logical_circuits.keys(), chunksize=max(1, len(logical_circuits) // (4 * args.processes)))))
+            # Let the workers exit normally to dump their profiles
+            p.close()
+            p.join()
+    if metrics is not None:
+        for circuit_id in logical_circuits.keys():
+            metrics.extend(circuit_metrics_dict[circuit_id])
     return acc
 
 
-def solve_single_circuit(archs: SIVArch, logical_circuit: LogicalCircuit, num_circuits: int) -> CircuitConfig:
+def solve_single_circuit(archs: SIVArch, logical_circuit: LogicalCircuit, num_circuits: int, warm_start_config: Optional[CircuitConfig] = None, effort_factor: float = 1.0) -> CircuitConfig:
+    circuit_config, _ = solve_single_circuit_with_metrics(
+        archs=archs, logical_circuit=logical_circuit, num_circuits=num_circuits, warm_start_config=warm_start_config, effort_factor=effort_factor)
+    return circuit_config
+
+
+def solve_single_circuit_with_metrics(archs: SIVArch, logical_circuit: LogicalCircuit, num_circuits: int, warm_start_config: Optional[CircuitConfig] = None, effort_factor: float = 1.0) -> Tuple[CircuitConfig, List[SolverMetrics]]:
+    '''
+    Return (circuit_config, metrics of every solver step in order)
+    '''
     should_continue = True
+    metrics: List[SolverMetrics] = list()
 
-    prc_candidates = generate_candidate_prc_for_lcs(
-        archs=archs, logical_rams=logical_circuit.rams.values())
+    with elapsed_timer() as elapsed, profile_stage('CANDIDATES'):
+        prc_candidates = generate_candidate_prc_for_lcs(
+            archs=archs, logical_rams=logical_circuit.rams.values())
+    metrics.append(SolverMetrics(circuit_id=logical_circuit.circuit_id, stage='CANDIDATES', step='L1',
+                   elapsed=elapsed(), steps=sum(map(len, prc_candidates.values()))))
     # Generate an initial config
-    solver = SingleLevelCircuitInitialSolution(
-        archs=archs,
-        logical_circuit=logical_circuit,
-        prc_candidates=prc_candidates)
+    if warm_start_config is None:
+        solver = SingleLevelCircuitInitialSolution(
+            archs=archs,
+            logical_circuit=logical_circuit,
+            prc_candidates=prc_candidates)
+        l1_effort_factor = effort_factor
+    else:
+        solver = WarmStartCircuitInitialSolution(
+            archs=archs,
+            logical_circuit=logical_circuit,
+            prc_candidates=prc_candidates,
+            prior_circuit_config=warm_start_config)
+        l1_effort_factor = effort_factor * WARM_START_EFFORT_FACTOR
     solver.solve()
     circuit_config = solver.circuit_config()
     physical_ram_uid = solver.assign_physical_ram_uid()
+    metrics += solver.metrics()
 
     # Incrementally improving
     solver = CandidateBasedCircuitOptimizer(
@@ -63,9 +217,10 @@ def solve_single_circuit(archs: SIVArch, logical_circuit: LogicalCircuit, num_ci
         physical_ram_uid=physical_ram_uid,
         prc_candidates=prc_candidates,
         name='L1')
-    solver.solve()
+    solver.solve(effort_factor=l1_effort_factor)
     circuit_config = solver.circuit_config()
     physical_ram_uid = solver.assign_physical_ram_uid()
+    metrics += solver.metrics()
 
     if should_continue and True:
         # Split RAM
@@ -78,30 +233,34 @@ def solve_single_circuit(archs: SIVArch, logical_circuit: LogicalCircuit, num_ci
         rc_split_width_list, _ = solver.solve()
         circuit_config = solver.circuit_config()
         physical_ram_uid = solver.assign_physical_ram_uid()
+        metrics += solver.metrics()
 
         if len(rc_split_width_list) > 0:
             # Incrementally improving
-            def merge_dict(dd, to_merge):
-                for k, v in to_merge.items():
-                    dd[k].extend(v)
-            prc_candidates = defaultdict(list)
-            merge_dict(prc_candidates,
-                       generate_candidate_prc_for_rcs(
-                           archs=archs,
-                           ram_configs=rc_split_width_list,
-                           locator=TwoLevelRightPRCLocator()))
-            merge_dict(prc_candidates,
-                       generate_candidate_prc_for_rcs(
-                           archs=archs,
-                           ram_configs=rc_split_width_list,
-                           locator=TwoLevelLeftPRCLocator()))
-            splitted_ram_ids = set(rc.ram_id for rc in rc_split_width_list)
-            merge_dict(prc_candidates,
-                       generate_candidate_prc_for_rcs(
-                           archs=archs,
-                           ram_configs=filter(
-                               lambda rc: rc.ram_id not in splitted_ram_ids, circuit_config.rams.values()),
-                           locator=SingleLevelPRCLocator()))
+            with elapsed_timer() as elapsed, profile_stage('CANDIDATES'):
+                def merge_dict(dd, to_merge):
+                    for k, v in to_merge.items():
+                        dd[k].extend(v)
+                prc_candidates = defaultdict(list)
+                merge_dict(prc_candidates,
+                           generate_candidate_prc_for_rcs(
+                               archs=archs,
+                               ram_configs=rc_split_width_list,
+                               locator=TwoLevelRightPRCLocator()))
+                merge_dict(prc_candidates,
+                           generate_candidate_prc_for_rcs(
+                               archs=archs,
+                               ram_configs=rc_split_width_list,
+                               locator=TwoLevelLeftPRCLocator()))
+                splitted_ram_ids = set(rc.ram_id for rc in rc_split_width_list)
+                merge_dict(prc_candidates,
+                           generate_candidate_prc_for_rcs(
+                               archs=archs,
+                               ram_configs=filter(
+                                   lambda rc: rc.ram_id not in splitted_ram_ids, circuit_config.rams.values()),
+                               locator=SingleLevelPRCLocator()))
+            metrics.append(SolverMetrics(circuit_id=logical_circuit.circuit_id, stage='CANDIDATES', step='L2',
+                           elapsed=elapsed(), steps=sum(map(len, prc_candidates.values()))))
             solver = CandidateBasedCircuitOptimizer(
                 archs=archs,
                 logical_circuit=logical_circuit,
@@ -111,9 +270,10 @@ def solve_single_circuit(archs: SIVArch, logical_circuit: LogicalCircuit, num_ci
                 prc_candidates=prc_candidates,
                 name='L2',
                 enable_save_best=True)
-            solver.solve(effort_factor=1.0)
+            solver.solve(effort_factor=effort_factor)
             circuit_config = solver.circuit_config()
             physical_ram_uid = solver.assign_physical_ram_uid()
+            metrics += solver.metrics()
 
     if should_continue and True:
         # Share physical ram
@@ -125,8 +285,9 @@ def solve_single_circuit(archs: SIVArch, logical_circuit: LogicalCircuit, num_ci
         solver.solve()
         circuit_config = solver.circuit_config()
         # physical_ram_uid = solver.assign_physical_ram_uid()
+        metrics += solver.metrics()
 
-    return circuit_config
+    return (circuit_config, metrics)
 
 
 def legal_ram_shape_fit_filter(fit: RamShapeFit) -> bool:
@@ -217,6 +378,7 @@ class CircuitSolverBase:
         self._physical_ram_uid = physical_ram_uid
         self._circuit_config = circuit_config
         self._name = name
+        self._metrics: List[SolverMetrics] = list()
 
     def circuit_config(self) -> CircuitConfig:
         return self._circuit_config
@@ -241,6 +403,21 @@ class CircuitSolverBase:
     def msg_header(self) -> str:
         return f'C{self.logical_circuit().circuit_id} {self._name}'
 
+    def metrics(self) -> List[SolverMetrics]:
+        return self._metrics
+
+    @contextmanager
+    def measure(self, step: str) -> Iterator[SolverMetrics]:
+        '''
+        Yield a SolverMetrics to be filled by the step, its elapsed time is recorded on exit
+        '''
+        metrics = SolverMetrics(
+            circuit_id=self.logical_circuit().circuit_id, stage=self._name, step=step)
+        with elapsed_timer() as elapsed, profile_stage(self._name):
+            yield metrics
+        metrics.elapsed = elapsed()
+        self._metrics.append(metrics)
+
 
 class SingleLevelSplitRamCircuitOptimizer(CircuitSolverBase):
     def __init__(self, archs: SIVArch, logical_circuit: LogicalCircuit, circuit_config: CircuitConfig, physical_ram_uid: int):
@@ -307,7 +484,12 @@ class SingleLevelSplitRamCircuitOptimizer(CircuitSolverBase):
         '''
         (rc_split_width_list, rc_split_depth_list)
         '''
-        rc_split_width_list, rc_split_depth_list = self.split_cliff()
+        with self.measure('SPLIT') as metrics:
+            rc_split_width_list, rc_split_depth_list = self.split_cliff()
+        metrics.steps = len(self.circuit_config().rams)
+        metrics.accepted = len(rc_split_width_list)
+        metrics.counters = {'split_width': len(rc_split_width_list),
+                            'split_depth': len(rc_split_depth_list)}
         logger.warning(
             f'{self.msg_header()}: Split {len(rc_split_width_list)} RAMs in width dimension (parallel)')
         return (rc_split_width_list, rc_split_depth_list)
@@ -592,18 +774,24 @@ class CandidateBasedCircuitOptimizer(CircuitSolverBase):
             else:
                 return initial_temperature / (current_step + 1)
 
-        self.anneal(num_steps=num_steps,
-                    target_acceptance_ratio=target_acceptance_ratio,
-                    max_outer_loop=max_outer_loop,
-                    temperature_schedule=temperature_schedule,
-                    stats=False)
+        with self.measure('ANNEAL') as metrics:
+            self.anneal(num_steps=num_steps,
+                        target_acceptance_ratio=target_acceptance_ratio,
+                        max_outer_loop=max_outer_loop,
+                        temperature_schedule=temperature_schedule,
+                        stats=False,
+                        metrics=metrics)
 
         if self._enable_save_best:
             self.switch_to_best_circuit_config()
 
-        self.greedy()
+        with self.measure('GREEDY') as metrics:
+            self.greedy(metrics=metrics)
 
-    def anneal(self, num_steps: int, target_acceptance_ratio: float, max_outer_loop: int, temperature_schedule: Callable[[TemperatureScheduleParam], float], stats: bool = False):
+    def anneal(self, num_steps: int, target_acceptance_ratio: float, max_outer_loop: int, temperature_schedule: Callable[[TemperatureScheduleParam], float], stats: bool = False, metrics: Optional[SolverMetrics] = None):
+        '''
+        metrics - if given, filled with the stats of this run
+        '''
         assert num_steps > 0
         outcome_stats = Counter()
         num_accepted = 0
@@ -647,6 +835,17 @@ class CandidateBasedCircuitOptimizer(CircuitSolverBase):
                     f'at temperature {temperature_schedule(TemperatureScheduleParam(num_steps=total_steps_to_perform+num_steps, current_step=steps_performed, num_accepted=num_accepted))}')
             else:
                 break
+        if metrics is not None:
+            metrics.steps = steps_performed
+            metrics.accepted = num_accepted
+            metrics.zero_delta = self._zero_delta_fpga_area_counter
+            metrics.early_exited = do_early_exit
+            metrics.initial_area = start_area
+            metrics.final_area = self._fpga_area
+            metrics.best_area = self._best_fpga_area_saved
+            if stats:
+                metrics.counters = {outcome.name: count for outcome,
+                                    count in outcome_stats.items()}
         area_stats = area_str(
             initial_area=start_area, final_area=self._fpga_area, best_area=self._best_fpga_area_saved)
         logger.warning(
@@ -657,7 +856,10 @@ class CandidateBasedCircuitOptimizer(CircuitSolverBase):
         if stats:
             logger.info(f'    Stats {str(outcome_stats)}')
 
-    def greedy(self):
+    def greedy(self, metrics: Optional[SolverMetrics] = None):
+        '''
+        metrics - if given, filled with the stats of this run
+        '''
         is_converged = False
         convergence_loop_counter = 0
         num_accepted = 0
@@ -680,6 +882,15 @@ class CandidateBasedCircuitOptimizer(CircuitSolverBase):
 
         search_space_size = self.get_search_space_size()
         steps_performed = convergence_loop_counter * search_space_size
+        if metrics is not None:
+            metrics.steps = steps_performed
+            metrics.accepted = num_accepted
+            metrics.early_exited = is_early_exited
+            metrics.initial_area = start_area
+            metrics.final_area = self._fpga_area
+            metrics.best_area = self._best_fpga_area_saved
+            metrics.counters = {
+                'convergence_loops': convergence_loop_counter}
         area_stats = area_str(
             initial_area=start_area, final_area=self._fpga_area, best_area=self._best_fpga_area_saved)
         logger.warning(
@@ -716,9 +927,70 @@ class SingleLevelCircuitInitialSolution(CircuitSolverBase):
         return RamConfig(circuit_id=logical_ram.circuit_id, ram_id=logical_ram.ram_id, ram_mode=logical_ram.mode, lrc=best_candidate_lrc)
 
     def solve(self):
-        self.circuit_config().rams.clear()
-        for lr in self.logical_circuit().rams.values():
-            self.circuit_config().insert_ram_config(self.solve_single_ram(logical_ram=lr))
+        with self.measure('CONSTRUCT') as metrics:
+            self.circuit_config().rams.clear()
+            for lr in self.logical_circuit().rams.values():
+                self.circuit_config().insert_ram_config(self.solve_single_ram(logical_ram=lr))
+        metrics.steps = len(self.logical_circuit().rams)
+        metrics.accepted = metrics.steps
+
+
+class WarmStartCircuitInitialSolution(SingleLevelCircuitInitialSolution):
+    '''
+    Start from a prior solution that may be found under a different arch.
+    Each RAM is flattened to a single-level config reusing the physical shape of its largest prior leaf,
+    physical shapes that are illegal under the current arch are remapped to the closest legal width of the same RAM type,
+    or to the INITIAL choice if the RAM type no longer exists.
+    '''
+
+    def __init__(self, archs: SIVArch, logical_circuit: LogicalCircuit, prc_candidates: Dict[int, List[PRCCandidate]], prior_circuit_config: CircuitConfig):
+        super().__init__(archs=archs,
+                         logical_circuit=logical_circuit,
+                         prc_candidates=prc_candidates)
+        self._name = 'WARM START'
+        self._prior_circuit_config = prior_circuit_config
+        self._num_reused = 0
+        self._num_repaired = 0
+
+    def find_prior_prc(self, ram_id: int) -> Optional[PhysicalRamConfig]:
+        prior_rc = self._prior_circuit_config.rams.get(ram_id)
+        if prior_rc is None:
+            return None
+        prior_lrcs: List[LogicalRamConfig] = list()
+        prior_rc.execute_on_leaf(lambda lrc: prior_lrcs.append(lrc))
+        return max(prior_lrcs, key=lambda lrc: lrc.logical_shape.get_size()).prc
+
+    def solve_single_ram(self, logical_ram: LogicalRam) -> RamConfig:
+        prior_prc = self.find_prior_prc(ram_id=logical_ram.ram_id)
+        if prior_prc is None:
+            self._num_repaired += 1
+            return super().solve_single_ram(logical_ram=logical_ram)
+
+        same_type_candidates = list(filter(lambda candidate: candidate.prc.ram_arch_id == prior_prc.ram_arch_id,
+                                           self.get_prc_candidate(logical_ram_id=logical_ram.ram_id)))
+        if len(same_type_candidates) == 0:
+            self._num_repaired += 1
+            return super().solve_single_ram(logical_ram=logical_ram)
+
+        prc_candidate = min(same_type_candidates, key=lambda candidate: abs(
+            math.log2(candidate.prc.physical_shape.width / prior_prc.physical_shape.width)))
+        if prc_candidate.prc.physical_shape == prior_prc.physical_shape:
+            self._num_reused += 1
+        else:
+            self._num_repaired += 1
+
+        prc_candidate.prc.id = self.assign_physical_ram_uid()
+        lrc = LogicalRamConfig(
+            logical_shape=logical_ram.shape, prc=prc_candidate.prc)
+        return RamConfig(circuit_id=logical_ram.circuit_id, ram_id=logical_ram.ram_id, ram_mode=logical_ram.mode, lrc=lrc)
+
+    def solve(self):
+        super().solve()
+        self._metrics[-1].counters = {'reused': self._num_reused,
+                                      'repaired': self._num_repaired}
+        logger.warning(
+            f'{self.msg_header()}: Reused {self._num_reused} prior physical shapes, ' +
+            f'repaired {self._num_repaired} RAMs')
 
 
 class SharingCircuitOptimizer(CircuitSolverBase):
@@ -835,49 +1107,55 @@ class SharingCircuitOptimizer(CircuitSolverBase):
         return final_sharing_pairs
 
     def solve(self, verbose: bool = False):
-        # All possible lrc
-        single_port_lrc_dict = self.find_single_port_lrcs()
-        if verbose:
-            logger.warning(
-                f'{self.msg_header()}: single-port LRC list: {len(single_port_lrc_dict)}')
-            for lrc in single_port_lrc_dict.values():
-                logger.warning(f'{self.msg_header()}:  {lrc.serialize(0)}')
-
-        # All possible lrc provider
-        lrc_provider_list = self.find_provider_lrcs(
-            single_port_lrc_dict=single_port_lrc_dict)
-        if verbose:
-            logger.info(
-                f'{self.msg_header()}: single-port LRC with extra depth list: {len(lrc_provider_list)}')
-            for lrc in lrc_provider_list:
-                logger.warning(f'{self.msg_header()}:  {lrc.serialize(0)}')
-
-        # Find sharing pair candidates, along with its gain
-        sharing_pairs = self.find_sharing_pairs(
-            single_port_lrc_dict=single_port_lrc_dict, lrc_provider_list=lrc_provider_list)
-        if verbose:
-            logger.info(
-                f'{self.msg_header()}: sharing_pairs (saved_area_per_free_provider_bits, provider, receiver): {len(sharing_pairs)}')
-            for delta, p_id, r_id in sharing_pairs:
-                logger.warning(f'{self.msg_header()}:  {delta} {p_id} {r_id}')
-
-        # Find final sharing pairs
-        final_sharing_pairs = self.find_final_sharing_pairs(
-            sharing_pairs=sharing_pairs)
-        if verbose:
-            logger.warning(
-                f'{self.msg_header()}: final sharing_pairs (saved_area_per_free_provider_bits, provider, receiver): {len(final_sharing_pairs)}')
+        with self.measure('SHARE') as metrics:
+            # All possible lrc
+            single_port_lrc_dict = self.find_single_port_lrcs()
+            if verbose:
+                logger.warning(
+                    f'{self.msg_header()}: single-port LRC list: {len(single_port_lrc_dict)}')
+                for lrc in single_port_lrc_dict.values():
+                    logger.warning(f'{self.msg_header()}:  {lrc.serialize(0)}')
+
+            # All possible lrc provider
+            lrc_provider_list = self.find_provider_lrcs(
+                single_port_lrc_dict=single_port_lrc_dict)
+            if verbose:
+                logger.info(
+                    f'{self.msg_header()}: single-port LRC with extra depth list: {len(lrc_provider_list)}')
+                for lrc in lrc_provider_list:
+                    logger.warning(f'{self.msg_header()}:  {lrc.serialize(0)}')
+
+            # Find sharing pair candidates, along with its gain
+            sharing_pairs = self.find_sharing_pairs(
+                single_port_lrc_dict=single_port_lrc_dict, lrc_provider_list=lrc_provider_list)
+            if verbose:
+                logger.info(
+                    f'{self.msg_header()}: sharing_pairs (saved_area_per_free_provider_bits, provider, receiver): {len(sharing_pairs)}')
+                for delta, p_id, r_id in sharing_pairs:
+                    logger.warning(f'{self.msg_header()}:  {delta} {p_id} {r_id}')
+
+            # Find final sharing pairs
+            final_sharing_pairs = self.find_final_sharing_pairs(
+                sharing_pairs=sharing_pairs)
+            if verbose:
+                logger.warning(
+                    f'{self.msg_header()}: final sharing_pairs (saved_area_per_free_provider_bits, provider, receiver): {len(final_sharing_pairs)}')
+                for delta, p_id, r_id in final_sharing_pairs:
+                    logger.warning(f'{self.msg_header()}:  {delta} {p_id} {r_id}')
+
+            # Apply final sharing pairs
+            num_eliminated_physical_rams = 0
             for delta, p_id, r_id in final_sharing_pairs:
-                logger.warning(f'{self.msg_header()}:  {delta} {p_id} {r_id}')
-
-        # Apply final sharing pairs
-        num_eliminated_physical_rams = 0
-        for delta, p_id, r_id in final_sharing_pairs:
-            provider_lrc = single_port_lrc_dict[p_id]
-            receiver_lrc = single_port_lrc_dict[r_id]
-            num_eliminated_physical_rams += receiver_lrc.prc.physical_shape_fit.get_count()
-            provider_lrc.prc.ram_mode = RamMode.TrueDualPort
-            receiver_lrc.prc = provider_lrc.prc
+                provider_lrc = single_port_lrc_dict[p_id]
+                receiver_lrc = single_port_lrc_dict[r_id]
+                num_eliminated_physical_rams += receiver_lrc.prc.physical_shape_fit.get_count()
+                provider_lrc.prc.ram_mode = RamMode.TrueDualPort
+                receiver_lrc.prc = provider_lrc.prc
+        metrics.steps = len(single_port_lrc_dict)
+        metrics.accepted = len(final_sharing_pairs)
+        metrics.counters = {'providers': len(lrc_provider_list),
+                            'sharing_pairs': len(sharing_pairs),
+                            'eliminated_physical_rams': num_eliminated_physical_rams}
         logger.warning(
             f'{self.msg_header()}: Shared {len(final_sharing_pairs)} logical rams, ' +
             f'eliminated {num_eliminated_physical_rams} physical rams. ' +
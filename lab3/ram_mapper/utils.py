@@ -4,6 +4,7 @@ from timeit import default_timer
 from contextlib import contextmanager
 from collections import OrderedDict
 from . import logger
+import hashlib
 import math
 from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Type, TypeVar
 
@@ -26,6 +27,14 @@ def elapsed_timer():
     def elapser(): return end-start
 
 
+def file_sha256(filename: str) -> str:
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 def list_grow(l: List[int], size: int) -> List[int]:
     to_grow = size - len(l)
     if to_grow > 0:
@@ -1,18 +1,28 @@
 from __future__ import annotations
 import argparse
-from contextlib import contextmanager
-from dataclasses import dataclass
+import asyncio
+import dataclasses
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
+import functools
+import hashlib
+import heapq
+import json
 import logging
-from multiprocessing import Pool
+import math
+import mmap
 import os
 import pathlib
 import re
+import shutil
+import signal
 import statistics
 import subprocess
 from timeit import default_timer
 from pathlib import Path
-from typing import ClassVar, Iterable, List, NamedTuple, Optional, Pattern, Sequence
+from typing import IO, Callable, ClassVar, Dict, Iterable, List, NamedTuple, Optional, Pattern, Sequence, Tuple
 
 
 def prepare_suite_dir(suite_name: str) -> Path:
@@ -39,59 +49,376 @@ def prepare_run_dir(suite_path: Path, run_name: str) -> Path:
     return run_path
 
 
-def prepare_tmp_dir(run_path: Path, name: str) -> Path:
+def find_run_dirs(suite_path: Path) -> Dict[str, Path]:
+    '''
+    Return {run name: run directory} of an existing suite
+    '''
+    run_paths = dict()
+    for run_path in suite_path.iterdir():
+        if r := re.fullmatch(r'run_\d+_(.+)', run_path.name):
+            if run_path.is_dir():
+                run_paths[r.group(1)] = run_path
+    return run_paths
+
+
+def prepare_tmp_dir(run_path: Path, name: str, exist_ok: bool = False) -> Path:
+    '''
+    exist_ok - keep the content of an existing directory, e.g. when resuming a suite
+    '''
     tmp_path = run_path.joinpath('tmp_' + name)
 
-    tmp_path.mkdir(exist_ok=False)
+    tmp_path.mkdir(exist_ok=exist_ok)
 
-    logging.debug(f'Created tmp directory: {tmp_path}')
+    logging.debug(f'Prepared tmp directory: {tmp_path}')
     return tmp_path
 
 
+def clear_dir(dir_path: Path):
+    for path in dir_path.iterdir():
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+
 def get_script_path() -> Path:
     return pathlib.Path(__file__).parent.resolve()
 
 
+def to_script_abs_path(target_path: str) -> str:
+    '''
+    Relative paths are relative to this script
+    '''
+    if not Path(target_path).is_absolute():
+        return os.path.join(get_script_path(), target_path)
+    else:
+        return target_path
+
+
+VPR_PATH = './vtr-verilog-to-routing-8.0.0/build/vpr/vpr'
+
+
+@functools.lru_cache(maxsize=None)
+def file_sha256(filename: str) -> str:
+    '''
+    Inputs are not expected to change during a suite
+    '''
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_atomically(filename: Path, content: str):
+    tmp_filename = filename.with_name(f'{filename.name}.tmp{os.getpid()}')
+    with open(tmp_filename, 'w') as f:
+        f.write(content)
+    os.replace(tmp_filename, filename)
+
+
+def kill_process(pid: int):
+    '''
+    SIGKILL pid without Popen.kill, whose poll() could reap it before wait4
+    '''
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
 class VPRRunParam(NamedTuple):
     blif_file: str
     seed: int
     arch_config_file: str = './k6_N10_40nm.xml'
     route_chan_width: Optional[int] = None
+    # Directory of a prior run with the same blif, arch and seed, its packing and placement are loaded
+    # and only routing and analysis are run
+    packed_placed_dir: Optional[str] = None
 
-    def to_cmdline(self) -> str:
-        current_script_path = get_script_path()
+    def packed_netlist_file(self, run_dir: str) -> str:
+        '''
+        VPR names its outputs after the blif
+        '''
+        return os.path.join(run_dir, Path(self.blif_file).with_suffix('.net').name)
 
-        def to_abs_path(target_path: str) -> str:
-            if not Path(target_path).is_absolute():
-                return os.path.join(current_script_path, target_path)
-            else:
-                return target_path
+    def placement_file(self, run_dir: str) -> str:
+        return os.path.join(run_dir, Path(self.blif_file).with_suffix('.place').name)
 
-        vpr_path = to_abs_path('./vtr-verilog-to-routing-8.0.0/build/vpr/vpr')
-        arch_config_path = to_abs_path(self.arch_config_file)
-        blif_path = to_abs_path(self.blif_file)
+    def to_cmdline(self) -> str:
         cmdline_list = [
-            vpr_path,
-            arch_config_path,
-            blif_path,
+            to_script_abs_path(VPR_PATH),
+            to_script_abs_path(self.arch_config_file),
+            to_script_abs_path(self.blif_file),
             '--seed', str(self.seed)
         ]
         if self.route_chan_width is not None:
             cmdline_list += ['--route_chan_width', str(self.route_chan_width)]
+        if self.packed_placed_dir is not None:
+            packed_placed_path = to_script_abs_path(self.packed_placed_dir)
+            cmdline_list += [
+                '--net_file', self.packed_netlist_file(packed_placed_path),
+                '--place_file', self.placement_file(packed_placed_path),
+                '--route', '--analysis'
+            ]
         return cmdline_list
 
-    def run(self, cwd: Path) -> bool:
+    async def run(self, cwd: Path, abort_policy: Optional[VPRAbortPolicy] = None, reaper: Optional[Executor] = None) -> VPRRunResult:
+        '''
+        The VPR process is killed if the calling task is cancelled or fails
+        abort_policy - if given, the VPR output is followed as it is written and the process is killed on the first abort signal
+        reaper - executor of the blocking wait4 until VPR exits, it needs a thread per running VPR, None for the loop's default executor
+        '''
         run_cmdline_list = self.to_cmdline()
         logging.debug(' '.join(run_cmdline_list))
+        start = default_timer()
+        process = subprocess.Popen(
+            args=run_cmdline_list,
+            cwd=cwd,
+            stdout=subprocess.PIPE if abort_policy is not None else subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL)
+        # Reaped by wait4 instead of asyncio, to get the resource usage of this process alone
+        reap = asyncio.get_running_loop().run_in_executor(
+            reaper, os.wait4, process.pid, 0)
+
+        def kill_unreaped():
+            # Once reaped, the pid may already belong to an unrelated process
+            if not reap.done():
+                kill_process(process.pid)
+
+        abort_reason = None
         try:
-            subprocess.check_call(
-                args=run_cmdline_list,
-                cwd=cwd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL)
-        except subprocess.CalledProcessError:
+            if abort_policy is not None:
+                abort_reason = await follow_vpr_output(
+                    stdout=process.stdout, monitor=VPRProgressMonitor(abort_policy))
+                if abort_reason is not None:
+                    kill_unreaped()
+            _, wait_status, rusage = await asyncio.shield(reap)
+        except ChildProcessError:
+            # Reaped behind wait4's back, no exit status or resource usage left to report
+            logging.error(f'Lost the exit status of VPR in {cwd}')
+            return VPRRunResult(return_code=-1, wall_time=default_timer() - start,
+                                user_time=0.0, sys_time=0.0, max_rss_mib=0.0, abort_reason=abort_reason)
+        except BaseException:
+            # Cancelled, or following the output failed (e.g. a line over the StreamReader limit)
+            kill_unreaped()
+            try:
+                await reap
+            except ChildProcessError:
+                pass
+            raise
+        finally:
+            # Already reaped, keep Popen from waiting for it
+            process.returncode = -1
+        return VPRRunResult(
+            return_code=os.waitstatus_to_exitcode(wait_status),
+            wall_time=default_timer() - start,
+            user_time=rusage.ru_utime,
+            sys_time=rusage.ru_stime,
+            # KiB on Linux
+            max_rss_mib=rusage.ru_maxrss / 1024,
+            abort_reason=abort_reason)
+
+
+class VPRRunResult(NamedTuple):
+    return_code: int
+    # In seconds
+    wall_time: float
+    user_time: float
+    sys_time: float
+    max_rss_mib: float
+    # Why the run was killed early, see VPRAbortPolicy
+    abort_reason: Optional[str] = None
+
+    def is_successful(self) -> bool:
+        return self.return_code == 0 and self.abort_reason is None
+
+
+class VPRAbortPolicy(NamedTuple):
+    '''
+    Signals in the VPR output that a run is doomed to fail routing, None disables a signal
+    '''
+    # Routing iterations of a fixed channel width run,
+    # the failing widths of the minimum channel width search legitimately run many iterations
+    max_route_iterations: Optional[int] = None
+    # Channel width tried by the minimum channel width search
+    max_channel_width: Optional[int] = None
+
+    def is_enabled(self) -> bool:
+        return self.max_route_iterations is not None or self.max_channel_width is not None
+
+    def for_run(self, param: VPRRunParam) -> Optional[VPRAbortPolicy]:
+        '''
+        The signals that apply to the run of param, None if there is none
+        '''
+        if param.route_chan_width is None:
+            policy = self._replace(max_route_iterations=None)
+        else:
+            policy = self._replace(max_channel_width=None)
+        return policy if policy.is_enabled() else None
+
+
+class VPRProgressMonitor:
+    '''
+    Follow the VPR output line by line for the signals of a VPRAbortPolicy
+    '''
+    channel_width_attempt_regex: ClassVar[Pattern] = re.compile(
+        r'Attempting to route at (\d+) channels')
+    route_table_header_regex: ClassVar[Pattern] = re.compile(
+        r'\s*Iter\s+Time\s+pres')
+    route_iteration_regex: ClassVar[Pattern] = re.compile(r'\s*(\d+)\s+\d')
+
+    def __init__(self, abort_policy: VPRAbortPolicy):
+        self._abort_policy = abort_policy
+        self._in_route_table = False
+
+    def feed(self, line: str) -> Optional[str]:
+        '''
+        Return the reason to abort the run, None to let it continue
+        '''
+        max_channel_width = self._abort_policy.max_channel_width
+        max_route_iterations = self._abort_policy.max_route_iterations
+        if r := self.channel_width_attempt_regex.match(line):
+            self._in_route_table = False
+            channel_width = int(r.group(1))
+            if max_channel_width is not None and channel_width > max_channel_width:
+                return f'channel width search reached {channel_width} > {max_channel_width}'
+        elif self.route_table_header_regex.match(line):
+            self._in_route_table = True
+        elif self._in_route_table:
+            if r := self.route_iteration_regex.match(line):
+                route_iteration = int(r.group(1))
+                if max_route_iterations is not None and route_iteration > max_route_iterations:
+                    return f'routing iteration {route_iteration} > {max_route_iterations}'
+            elif line.strip() != '' and not line.lstrip().startswith(('-', '(')):
+                # Past the table rulers and units, the routing iterations are over
+                self._in_route_table = False
+        return None
+
+
+async def follow_vpr_output(stdout: IO[bytes], monitor: VPRProgressMonitor) -> Optional[str]:
+    '''
+    Feed the lines of stdout to monitor as they arrive until its end or the first abort reason, which is returned
+    '''
+    reader = asyncio.StreamReader(limit=1 << 20)
+    transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), stdout)
+    try:
+        async for line in reader:
+            if (abort_reason := monitor.feed(line.decode(errors='replace'))) is not None:
+                return abort_reason
+    finally:
+        transport.close()
+    return None
+
+
+class VPRSlots:
+    '''
+    Admission control of the VPR processes, like asyncio.Semaphore but the waiters are admitted lowest priority first instead of FIFO,
+    and only if their estimated memory fits in the memory budget along with the running ones.
+    A waiter is always admitted if nothing runs, even if it does not fit
+    '''
+
+    def __init__(self, num_slots: int, memory_budget: Optional[int] = None):
+        '''
+        memory_budget - in bytes, None is unlimited
+        '''
+        assert num_slots > 0
+        self._num_slots = num_slots
+        self._memory_budget = memory_budget
+        self._num_running = 0
+        self._memory_in_use = 0
+        # (priority, arrival, memory, future)
+        self._waiters: List[Tuple[Tuple, int, int, asyncio.Future]] = list()
+        self._num_arrivals = 0
+
+    def num_free_slots(self) -> int:
+        '''
+        Slots neither running nor claimed by a waiter
+        '''
+        return max(0, self._num_slots - self._num_running - len(self._waiters))
+
+    def _fits(self, memory: int) -> bool:
+        if self._num_running >= self._num_slots:
             return False
-        return True
+        return self._memory_budget is None or self._num_running == 0 or self._memory_in_use + memory <= self._memory_budget
+
+    @asynccontextmanager
+    async def acquire(self, priority: Tuple, memory: int = 0):
+        '''
+        memory - estimated peak memory of the VPR process in bytes
+        '''
+        if len(self._waiters) == 0 and self._fits(memory):
+            self._num_running += 1
+            self._memory_in_use += memory
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority,
+                           self._num_arrivals, memory, waiter))
+            self._num_arrivals += 1
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Cancelled right after being admitted, pass it on
+                    self._release(memory)
+                else:
+                    # It may have been blocking the waiters behind it
+                    self._admit_waiters()
+                raise
+        try:
+            yield
+        finally:
+            self._release(memory)
+
+    def _release(self, memory: int):
+        self._num_running -= 1
+        self._memory_in_use -= memory
+        self._admit_waiters()
+
+    def _admit_waiters(self):
+        # Strictly in priority order, so the largest jobs are not starved by the smaller ones that fit
+        while len(self._waiters) > 0:
+            _, _, memory, waiter = self._waiters[0]
+            if waiter.done():
+                # Cancelled
+                heapq.heappop(self._waiters)
+                continue
+            if not self._fits(memory):
+                if self._num_running < self._num_slots:
+                    logging.debug(
+                        f'Holding back a VPR run of {memory >> 20} MiB, {self._num_running} running with {self._memory_in_use >> 20} MiB')
+                return
+            heapq.heappop(self._waiters)
+            self._num_running += 1
+            self._memory_in_use += memory
+            waiter.set_result(None)
+
+
+def get_available_memory() -> Optional[int]:
+    '''
+    In bytes, None if unknown
+    '''
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                # MemAvailable:   12345678 kB
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError):
+        return None
+
+
+def combine_optional(func: Callable[[Iterable[float]], float], values: Iterable[Optional[float]]) -> Optional[float]:
+    '''
+    Apply func to the values that are not None, None if all are None
+    '''
+    present_values = [value for value in values if value is not None]
+    return func(present_values) if len(present_values) > 0 else None
 
 
 def geomean_int(in_list: Iterable[int]) -> float:
@@ -113,6 +440,26 @@ def geomean_float(in_list: Iterable[float]) -> float:
     return geomean
 
 
+# Two-sided 95% critical values of the t-distribution for 1 to 30 degrees of freedom
+T_95_CRITICAL_VALUES = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def geomean_confidence_half_width(in_list: Sequence[float]) -> float:
+    '''
+    Relative half-width of the 95% confidence interval of the geometric mean, e.g. 0.02 for +-2%,
+    from the t-distribution of the log values, inf if less than 2 values
+    '''
+    if len(in_list) < 2:
+        return math.inf
+    degrees_of_freedom = len(in_list) - 1
+    t = T_95_CRITICAL_VALUES[degrees_of_freedom - 1] if degrees_of_freedom <= len(
+        T_95_CRITICAL_VALUES) else 1.96
+    log_stdev = statistics.stdev(map(math.log, in_list))
+    return math.exp(t * log_stdev / math.sqrt(len(in_list))) - 1
+
+
 @dataclass
 class CircuitQoR:
     seed: Optional[int] = None
@@ -124,6 +471,18 @@ class CircuitQoR:
     routing_area_per_tile: Optional[float] = None
     critical_path_delay: Optional[float] = None
     fmax: Optional[float] = None
+    # Peak memory reported by VPR
+    vpr_max_rss_mib: Optional[float] = None
+
+    # Cost of the VPR runs (of both steps of a seed) measured by wait4, in seconds and MiB
+    wall_time: Optional[float] = None
+    user_time: Optional[float] = None
+    sys_time: Optional[float] = None
+    max_rss_mib: Optional[float] = None
+    # Stage times reported by VPR, in seconds
+    pack_time: Optional[float] = None
+    place_time: Optional[float] = None
+    route_time: Optional[float] = None
 
     # Class variables
     minimum_channel_width_regex: ClassVar[Pattern] = re.compile(
@@ -137,6 +496,31 @@ class CircuitQoR:
         Pattern] = re.compile(f'\s*Total routing area: ({numeric_pattern}), per logic tile: ({numeric_pattern})')
     timing_regex: ClassVar[Pattern] = re.compile(
         f'\s*Final critical path: ({numeric_pattern}) ns, Fmax: ({numeric_pattern}) MHz')
+    stage_time_regex: ClassVar[Pattern] = re.compile(
+        f'# (Packing|Placement|Routing) took ({numeric_pattern}) seconds')
+    vpr_flow_regex: ClassVar[Pattern] = re.compile(
+        f'The entire flow of VPR took ({numeric_pattern}) seconds \\(max_rss ({numeric_pattern}) MiB\\)')
+
+    # Searched backwards from the end of the log, the line of the last occurrence is parsed by parse_line
+    log_anchors: ClassVar[Tuple[bytes, ...]] = (
+        b'Best routing used a channel width factor of',
+        b'Circuit successfully routed with a channel width factor of',
+        b'Total routing area:',
+        b'Final critical path:',
+        b'The entire flow of VPR took',
+        b'# Packing took',
+        b'# Placement took',
+        b'# Routing took')
+    # The anchors of a successful route, if any is missing the log is scanned by log_scan_regex instead
+    required_log_anchors: ClassVar[Tuple[bytes, ...]] = log_anchors[1:4]
+    log_scan_regex: ClassVar[Pattern] = re.compile(
+        rb'^[ \t]*(?:' + b'|'.join(map(re.escape, log_anchors)) + rb')', re.MULTILINE)
+
+    stage_time_fields: ClassVar[Dict[str, str]] = {
+        'Packing': 'pack_time', 'Placement': 'place_time', 'Routing': 'route_time'}
+    # Summed across the steps of a seed and averaged across seeds and circuits, except max_rss_mib which is the max
+    cost_fields: ClassVar[Tuple[str, ...]] = (
+        'wall_time', 'user_time', 'sys_time', 'pack_time', 'place_time', 'route_time')
 
     @classmethod
     def from_geomean(cls, qors: Sequence[CircuitQoR]) -> CircuitQoR:
@@ -166,9 +550,22 @@ class CircuitQoR:
             critical_path_delay=geomean_float(
                 map(lambda qor: qor.critical_path_delay, qors)),
             fmax=geomean_float(
-                map(lambda qor: qor.fmax, qors))
+                map(lambda qor: qor.fmax, qors)),
+            max_rss_mib=combine_optional(
+                max, map(lambda qor: qor.max_rss_mib, qors)),
+            **{cost_field: combine_optional(statistics.fmean, map(lambda qor: getattr(qor, cost_field), qors)) for cost_field in cls.cost_fields}
         )
 
+    def add_cost(self, other: CircuitQoR) -> CircuitQoR:
+        '''
+        Return self with the cost of other added, e.g. of the other step of the seed
+        '''
+        return dataclasses.replace(
+            self,
+            max_rss_mib=combine_optional(
+                max, (self.max_rss_mib, other.max_rss_mib)),
+            **{cost_field: combine_optional(sum, (getattr(self, cost_field), getattr(other, cost_field))) for cost_field in self.cost_fields})
+
     def parse_line(self, line: str) -> bool:
         if r := self.minimum_channel_width_regex.match(line):
             self.minimum_channel_width = int(r.group(1))
@@ -180,8 +577,41 @@ class CircuitQoR:
         elif r := self.timing_regex.match(line):
             self.critical_path_delay = float(r.group(1))
             self.fmax = float(r.group(2))
+        elif r := self.vpr_flow_regex.match(line):
+            self.vpr_max_rss_mib = float(r.group(2))
+        elif r := self.stage_time_regex.match(line):
+            setattr(self, self.stage_time_fields[r.group(1)], float(r.group(2)))
+        else:
+            return False
         return True
 
+    def parse_log_tail(self, log: mmap.mmap) -> bool:
+        '''
+        Parse the last line of each anchor, found backwards from the end of the log where the summary is.
+        Return False if any required anchor is missing
+        '''
+        found_required = True
+        for anchor in self.log_anchors:
+            end = len(log)
+            while (pos := log.rfind(anchor, 0, end)) != -1:
+                line_start = log.rfind(b'\n', 0, pos) + 1
+                line_end = log.find(b'\n', pos)
+                if self.parse_line(log[line_start:line_end if line_end != -1 else len(log)].decode(errors='replace')):
+                    break
+                # Not a line of its own, keep searching backwards
+                end = line_start
+            if pos == -1 and anchor in self.required_log_anchors:
+                found_required = False
+        return found_required
+
+    def parse_log_scan(self, log: mmap.mmap):
+        '''
+        Parse every line starting with an anchor in one pass, the last one wins
+        '''
+        for r in self.log_scan_regex.finditer(log):
+            line_end = log.find(b'\n', r.start())
+            self.parse_line(log[r.start():line_end if line_end != -1 else len(log)].decode(errors='replace'))
+
     def is_route_successful(self) -> bool:
         return ((self.channel_width is not None) and
                 (self.routing_area_total is not None) and
@@ -192,35 +622,216 @@ class CircuitQoR:
     def present_data(self) -> str:
         return f'min_ch_w={self.minimum_channel_width} 1.3x_rt_area_per_tile={self.routing_area_per_tile} 1.3x_rt_cp_delay={self.critical_path_delay} 1.3x_delay_area={self.routing_area_per_tile*self.critical_path_delay}'
 
+    def present_cost(self) -> str:
+        def fmt(value: Optional[float]) -> str:
+            return f'{value:.2f}' if value is not None else 'None'
+        return (f'wall={fmt(self.wall_time)}s user={fmt(self.user_time)}s sys={fmt(self.sys_time)}s max_rss={fmt(self.max_rss_mib)}MiB '
+                f'pack={fmt(self.pack_time)}s place={fmt(self.place_time)}s route={fmt(self.route_time)}s')
+
 
 def parse_circuit_qor(log_dir: Path, circuit: str, seed: int, minimum_channel_width: Optional[int] = None) -> CircuitQoR:
     log_path = log_dir.joinpath('vpr_stdout.log')
     qor = CircuitQoR(seed=seed, circuit=circuit,
                      minimum_channel_width=minimum_channel_width)
 
-    with open(log_path) as f:
-        for line in f:
-            qor.parse_line(line)
+    with open(log_path, 'rb') as f:
+        # An empty file cannot be mapped
+        if os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as log:
+                if not qor.parse_log_tail(log):
+                    qor.parse_log_scan(log)
 
-    # If minimum_channel_width is not pre-assigned, it must be parsed
-    if minimum_channel_width is None:
+    # If minimum_channel_width is not pre-assigned, it must be parsed from a successful run
+    if minimum_channel_width is None and qor.is_route_successful():
         assert qor.minimum_channel_width is not None
     return qor
 
 
-def run_vpr_circuit_of_seed(run_path: Path, circuit_name: str, seed: int, circuit_path: str) -> Optional[CircuitQoR]:
+class VPRResultCache:
+    '''
+    Content-addressed results of the VPR runs that exited normally, keyed by everything a result depends on:
+
+    cache_dir/<key[:2]>/<key>.json  the parsed CircuitQoR
+    cache_dir/<key[:2]>/<key>.log   vpr_stdout.log, if store_logs
+    '''
+    # Bump when the meaning of a CircuitQoR field changes, renamed or removed fields change the key by themselves
+    SCHEMA_VERSION: ClassVar[int] = 1
+
+    def __init__(self, cache_dir: Path, store_logs: bool):
+        self._cache_dir = cache_dir
+        self._store_logs = store_logs
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def key(self, param: VPRRunParam) -> str:
+        key_fields = dict(
+            blif=file_sha256(to_script_abs_path(param.blif_file)),
+            arch=file_sha256(to_script_abs_path(param.arch_config_file)),
+            vpr=file_sha256(to_script_abs_path(VPR_PATH)),
+            seed=param.seed,
+            route_chan_width=param.route_chan_width,
+            schema=self.SCHEMA_VERSION,
+            qor_fields=[qor_field.name for qor_field in dataclasses.fields(CircuitQoR)])
+        return hashlib.sha256(json.dumps(key_fields, sort_keys=True).encode()).hexdigest()
+
+    def entry_path(self, key: str) -> Path:
+        return self._cache_dir.joinpath(key[:2], key)
+
+    def load(self, param: VPRRunParam, log_dir: Path) -> Optional[CircuitQoR]:
+        '''
+        Return the cached QoR and restore the cached log to log_dir if any, None if not cached
+        '''
+        entry_path = self.entry_path(self.key(param))
+        try:
+            with open(entry_path.with_suffix('.json')) as f:
+                qor = CircuitQoR(**json.load(f))
+        except FileNotFoundError:
+            self.num_misses += 1
+            return None
+        if entry_path.with_suffix('.log').exists():
+            shutil.copyfile(entry_path.with_suffix('.log'),
+                            log_dir.joinpath('vpr_stdout.log'))
+        self.num_hits += 1
+        return qor
+
+    def store(self, param: VPRRunParam, qor: CircuitQoR, log_dir: Path):
+        entry_path = self.entry_path(self.key(param))
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._store_logs:
+            tmp_log_path = entry_path.with_name(
+                f'{entry_path.name}.log.tmp{os.getpid()}')
+            shutil.copyfile(log_dir.joinpath('vpr_stdout.log'), tmp_log_path)
+            os.replace(tmp_log_path, entry_path.with_suffix('.log'))
+        # Last, as it marks the entry as complete
+        write_atomically(entry_path.with_suffix('.json'),
+                         json.dumps(dataclasses.asdict(qor)))
+
+
+class MemoryEstimator:
+    '''
+    Estimated peak memory of VPR per circuit: the largest observed so far (persisted across suites in history_file),
+    otherwise scaled from the blif size
+    '''
+    # VPR needs a few hundred bytes per byte of blif
+    BYTES_PER_BLIF_BYTE: ClassVar[int] = 512
+    MIN_ESTIMATE: ClassVar[int] = 64 << 20
+
+    def __init__(self, history_file: Optional[Path]):
+        self._history_file = history_file
+        # {blif sha256: peak memory in bytes}
+        self._peaks: Dict[str, int] = dict()
+        if history_file is not None and history_file.exists():
+            with open(history_file) as f:
+                self._peaks = json.load(f)
+
+    def estimate(self, blif_file: str) -> int:
+        blif_path = to_script_abs_path(blif_file)
+        peak = self._peaks.get(file_sha256(blif_path))
+        if peak is not None:
+            return peak
+        return max(self.MIN_ESTIMATE, self.BYTES_PER_BLIF_BYTE * Path(blif_path).stat().st_size)
+
+    def observe(self, blif_file: str, qor: CircuitQoR):
+        peak_mib = combine_optional(
+            max, (qor.max_rss_mib, qor.vpr_max_rss_mib))
+        if peak_mib is None:
+            return
+        key = file_sha256(to_script_abs_path(blif_file))
+        self._peaks[key] = max(self._peaks.get(key, 0),
+                               round(peak_mib * (1 << 20)))
+
+    def save(self):
+        if self._history_file is not None:
+            write_atomically(self._history_file, json.dumps(
+                self._peaks, sort_keys=True, indent=4))
+
+
+class SuiteContext(NamedTuple):
+    '''
+    Shared by all runs of a suite
+    '''
+    vpr_slots: VPRSlots
+    # step1 only reroutes the packing and placement of step0, they do not depend on the channel width
+    reuse_placement: bool
+    cache: Optional[VPRResultCache]
+    # The suite directory is of an interrupted suite, the steps it completed are kept
+    resume: bool
+    memory_estimator: MemoryEstimator
+    # None to not follow the VPR output
+    abort_policy: Optional[VPRAbortPolicy]
+    # Reaps the VPR processes, one thread per VPR slot so that an exited VPR never waits for a thread
+    reaper: Executor
+
+
+def resume_vpr_step(cwd: Path, circuit_name: str, seed: int, minimum_channel_width: Optional[int] = None) -> Optional[CircuitQoR]:
+    '''
+    Return the QoR of a step completed successfully in cwd by an interrupted suite.
+    Otherwise (never run, interrupted or failed) clear cwd for a rerun and return None
+    '''
+    if cwd.joinpath('vpr_stdout.log').exists():
+        qor = parse_circuit_qor(log_dir=cwd, circuit=circuit_name,
+                                seed=seed, minimum_channel_width=minimum_channel_width)
+        if qor.is_route_successful():
+            logging.info(
+                f'[{circuit_name}/seed={seed}]  Resumed the result of {cwd}')
+            return qor
+    clear_dir(cwd)
+    return None
+
+
+async def run_vpr_step(param: VPRRunParam, cwd: Path, circuit_name: str, suite_context: SuiteContext, priority: Tuple, minimum_channel_width: Optional[int] = None) -> Optional[CircuitQoR]:
+    '''
+    Run VPR and parse its log, unless the result is cached. Return None if VPR failed
+    '''
+    cache = suite_context.cache
+    if cache is not None:
+        qor = cache.load(param=param, log_dir=cwd)
+        if qor is not None:
+            logging.info(
+                f'[{circuit_name}/seed={param.seed}]  Cached result of {cwd}')
+            suite_context.memory_estimator.observe(
+                blif_file=param.blif_file, qor=qor)
+            # Not spent by this suite, keep it out of the reported VPR cost
+            return dataclasses.replace(qor, circuit=circuit_name, max_rss_mib=None, **{cost_field: None for cost_field in CircuitQoR.cost_fields})
+    async with suite_context.vpr_slots.acquire(priority=priority, memory=suite_context.memory_estimator.estimate(param.blif_file)):
+        run_result = await param.run(cwd=cwd, abort_policy=suite_context.abort_policy.for_run(param) if suite_context.abort_policy is not None else None,
+                                     reaper=suite_context.reaper)
+    if run_result.abort_reason is not None:
+        logging.warning(
+            f'[{circuit_name}/seed={param.seed}]  Aborted VPR in {cwd}: {run_result.abort_reason}')
+    if not run_result.is_successful():
+        return None
+    qor = dataclasses.replace(parse_circuit_qor(
+        log_dir=cwd, circuit=circuit_name, seed=param.seed, minimum_channel_width=minimum_channel_width),
+        wall_time=run_result.wall_time, user_time=run_result.user_time, sys_time=run_result.sys_time, max_rss_mib=run_result.max_rss_mib)
+    suite_context.memory_estimator.observe(blif_file=param.blif_file, qor=qor)
+    if cache is not None:
+        cache.store(param=param, qor=qor, log_dir=cwd)
+    return qor
+
+
+async def run_vpr_circuit_of_seed(run_path: Path, circuit_name: str, seed: int, circuit_path: str, suite_context: SuiteContext, priority: Tuple) -> Optional[CircuitQoR]:
+    '''
+    step1 depends on the minimum channel width found by step0, each step holds a VPR slot only while VPR runs
+    '''
     msg_header = f'[{circuit_name}/seed={seed}]'
     logging.info(f'Running VPR for {msg_header}')
 
     # Run to find the minimum channel width
     logging.info(f'{msg_header}  1. Run to find minimum channel width')
-    tmp_path = prepare_tmp_dir(run_path=run_path, name=f'seed{seed}_step0')
-    if not VPRRunParam(blif_file=circuit_path, seed=seed).run(cwd=tmp_path):
-        return None
-    qor = parse_circuit_qor(
-        log_dir=tmp_path, minimum_channel_width=None, circuit=circuit_name, seed=seed)
-    if not qor.is_route_successful():
+    tmp_path = prepare_tmp_dir(
+        run_path=run_path, name=f'seed{seed}_step0', exist_ok=suite_context.resume)
+    step0_path = tmp_path
+    qor = resume_vpr_step(cwd=tmp_path, circuit_name=circuit_name,
+                          seed=seed) if suite_context.resume else None
+    # step1 of an interrupted suite is only valid if its step0 is
+    resume_step1 = qor is not None
+    if qor is None:
+        qor = await run_vpr_step(param=VPRRunParam(blif_file=circuit_path, seed=seed), cwd=tmp_path,
+                                 circuit_name=circuit_name, suite_context=suite_context, priority=priority)
+    if qor is None or not qor.is_route_successful():
         return None
+    step0_qor = qor
     qor_min_ch_width = qor.minimum_channel_width
     logging.info(
         f'{msg_header}        Min channel width: {qor_min_ch_width}')
@@ -231,36 +842,264 @@ def run_vpr_circuit_of_seed(run_path: Path, circuit_name: str, seed: int, circui
     route_channel_width = round(route_channel_width/2)*2
     logging.info(
         f'{msg_header}  2. Run 1.3x minimum channel width ({route_channel_width})')
-    tmp_path = prepare_tmp_dir(run_path=run_path, name=f'seed{seed}_step1')
-    if not VPRRunParam(blif_file=circuit_path, seed=seed,
-                       route_chan_width=route_channel_width).run(cwd=tmp_path):
-        return None
-    qor = parse_circuit_qor(
-        log_dir=tmp_path, circuit=circuit_name, seed=seed, minimum_channel_width=qor_min_ch_width)
-    if not qor.is_route_successful():
+    tmp_path = prepare_tmp_dir(
+        run_path=run_path, name=f'seed{seed}_step1', exist_ok=suite_context.resume)
+    if resume_step1:
+        qor = resume_vpr_step(cwd=tmp_path, circuit_name=circuit_name,
+                              seed=seed, minimum_channel_width=qor_min_ch_width)
+        if qor is not None:
+            qor = qor.add_cost(step0_qor)
+            logging.info(f'{msg_header}       Run QoR: {qor}')
+            return qor
+    elif suite_context.resume:
+        clear_dir(tmp_path)
+    step1_param = VPRRunParam(blif_file=circuit_path, seed=seed,
+                              route_chan_width=route_channel_width)
+    if suite_context.reuse_placement:
+        packed_placed_dir = str(step0_path.resolve())
+        if all(map(os.path.exists, [step1_param.packed_netlist_file(packed_placed_dir), step1_param.placement_file(packed_placed_dir)])):
+            step1_param = step1_param._replace(
+                packed_placed_dir=packed_placed_dir)
+        else:
+            # Expected if step0 was cached, then step1 is likely cached as well
+            logging.log(logging.INFO if suite_context.cache is not None else logging.WARNING,
+                        f'{msg_header}  Packing or placement of step0 not found in {packed_placed_dir}, rerunning them')
+    qor = await run_vpr_step(param=step1_param, cwd=tmp_path, circuit_name=circuit_name, suite_context=suite_context,
+                             priority=priority, minimum_channel_width=qor_min_ch_width)
+    if qor is None or not qor.is_route_successful():
         return None
+    qor = qor.add_cost(step0_qor)
     logging.info(f'{msg_header}       Run QoR: {qor}')
     return qor
 
 
-def run_vpr_circuit_across_seeds(run_path: Path, circuit_name: str, num_seeds: int, circuit_path: str) -> List[CircuitQoR]:
-    qors = list()
-    seed = 0
-    max_attempts = num_seeds*5
-    while len(qors) < num_seeds:
-        qor = run_vpr_circuit_of_seed(
-            run_path=run_path, circuit_name=circuit_name, seed=seed, circuit_path=circuit_path)
+class CircuitRunArg(NamedTuple):
+    run_path: Path
+    circuit_name: str
+    circuit_path: str
+
+
+def estimate_circuit_size(circuit_path: str) -> int:
+    '''
+    VPR runtime grows with the netlist, the blif size is a cheap proxy
+    '''
+    return Path(circuit_path).stat().st_size
+
+
+class SeedPolicy(NamedTuple):
+    '''
+    Fixed: num_seeds successful seeds per circuit.
+    Adaptive (target_ci): at least num_seeds, then one more at a time until the geomean of every confidence field
+    has a 95% confidence interval within +-target_ci (relative), or max_seeds.
+    Up to 5 attempts per needed seed.
+    The seeds are decided in seed order as if they ran one after another, whatever order they finish in
+    '''
+    num_seeds: int
+    max_seeds: Optional[int] = None
+    target_ci: Optional[float] = None
+
+    confidence_fields: ClassVar[Tuple[str, ...]] = (
+        'critical_path_delay', 'routing_area_per_tile')
+
+    def is_adaptive(self) -> bool:
+        return self.target_ci is not None
+
+    @property
+    def max_attempts(self) -> int:
+        return (self.max_seeds if self.is_adaptive() else self.num_seeds)*5
+
+    def confidence_half_width(self, qors: Sequence[CircuitQoR]) -> float:
+        '''
+        The widest of the confidence fields
+        '''
+        return max(geomean_confidence_half_width([getattr(qor, confidence_field) for qor in qors]) for confidence_field in self.confidence_fields)
+
+    def present(self) -> str:
+        if self.is_adaptive():
+            return f'{self.num_seeds} to {self.max_seeds} seeds (adaptive, 95% CI within +-{self.target_ci:.1%})'
+        return f'{self.num_seeds} seeds'
+
+
+@dataclass
+class CircuitSeedState:
+    '''
+    Seed bookkeeping of a circuit, see SeedPolicy
+    '''
+    circuit_run_arg: CircuitRunArg
+    seed_policy: SeedPolicy
+    next_seed: int = 0
+    num_running: int = 0
+    aborted: bool = False
+    # {seed: QoR, None if failed} of the finished seeds
+    outcomes: Dict[int, Optional[CircuitQoR]] = field(default_factory=dict)
+    # The passed seeds the result is made of, once decided
+    decided_qors: Optional[List[CircuitQoR]] = None
+
+    def num_passed(self) -> int:
+        return sum(qor is not None for qor in self.outcomes.values())
+
+    def passed_prefix(self) -> List[CircuitQoR]:
+        '''
+        The passed seeds in seed order, up to the first seed still running
+        '''
+        qors = list()
+        for seed in range(self.next_seed):
+            if seed not in self.outcomes:
+                break
+            if (qor := self.outcomes[seed]) is not None:
+                qors.append(qor)
+        return qors
+
+    def decide(self) -> Optional[List[CircuitQoR]]:
+        '''
+        The passed seeds the result is made of, None if not decided yet: the first num_seeds passed seeds,
+        adaptive: the shortest prefix from there with the confidence interval within target, or max_seeds
+        '''
+        qors = self.passed_prefix()
+        num_seeds = self.seed_policy.num_seeds
+        if not self.seed_policy.is_adaptive():
+            return qors[:num_seeds] if len(qors) >= num_seeds else None
+        max_seeds = self.seed_policy.max_seeds
+        for num_decided in range(num_seeds, min(len(qors), max_seeds) + 1):
+            if self.seed_policy.confidence_half_width(qors[:num_decided]) <= self.seed_policy.target_ci:
+                return qors[:num_decided]
+        return qors[:max_seeds] if len(qors) >= max_seeds else None
+
+    def take_seeds(self, num_free_slots: int) -> List[int]:
+        '''
+        Return the seeds to launch: all of the num_seeds needed at once,
+        adaptive: then a batch of the remaining seeds up to num_free_slots (at least one if none is running)
+        '''
+        seeds = list()
+        num_passed = self.num_passed()
+        while not self.is_done() and self.next_seed < self.seed_policy.max_attempts:
+            num_expected = num_passed + self.num_running
+            if num_expected >= self.seed_policy.num_seeds and not (
+                    self.seed_policy.is_adaptive() and num_expected < self.seed_policy.max_seeds and
+                    (len(seeds) < num_free_slots or self.num_running == 0)):
+                break
+            seeds.append(self.next_seed)
+            self.next_seed += 1
+            self.num_running += 1
+        return seeds
+
+    def finish_seed(self, seed: int, qor: Optional[CircuitQoR]):
+        circuit_name = self.circuit_run_arg.circuit_name
+        num_seeds = self.seed_policy.num_seeds
+        self.num_running -= 1
         if qor is not None:
             assert qor.is_route_successful()
-            qors.append(qor)
-        elif seed >= max_attempts:
-            logging.error(
-                f'[{circuit_name}] Failed to compile for {num_seeds} times with {max_attempts} attempts ({len(qors)} passed), aborting')
+        self.outcomes[seed] = qor
+        if self.is_done():
+            return
+        self.decided_qors = self.decide()
+        if self.decided_qors is None:
+            if self.num_running > 0 or self.next_seed < self.seed_policy.max_attempts:
+                return
+            # Out of attempts
+            qors = self.passed_prefix()
+            if len(qors) < num_seeds:
+                logging.error(
+                    f'[{circuit_name}] Failed to compile for {num_seeds} times with {self.seed_policy.max_attempts} attempts ({len(qors)} passed), aborting')
+                self.aborted = True
+                return
+            self.decided_qors = qors
+        num_attempts = self.decided_qors[-1].seed + 1
+        if self.seed_policy.is_adaptive():
+            confidence_half_width = self.seed_policy.confidence_half_width(
+                self.decided_qors)
+            logging.log(logging.WARNING if confidence_half_width <= self.seed_policy.target_ci else logging.ERROR,
+                        f'[{circuit_name}] {len(self.decided_qors)} seeds ({num_attempts} attempts) done, 95% CI within +-{confidence_half_width:.2%} (target +-{self.seed_policy.target_ci:.2%})')
+        else:
+            logging.warning(
+                f'[{circuit_name}] {num_seeds} seeds ({num_attempts} attempts) done')
+        if self.num_running > 0:
+            logging.info(
+                f'[{circuit_name}] Cancelling {self.num_running} seeds past the decided ones')
+
+    def is_done(self) -> bool:
+        '''
+        The seeds still running, if any, are not needed
+        '''
+        return self.aborted or self.decided_qors is not None
+
+    def result(self) -> List[CircuitQoR]:
+        '''
+        The decided passed seeds in seed order, empty if aborted
+        '''
+        if self.aborted:
             return []
-        seed += 1
+        return self.decided_qors
+
+
+async def run_vpr_circuit_across_seeds(circuit_run_arg: CircuitRunArg, seed_policy: SeedPolicy, suite_context: SuiteContext) -> List[CircuitQoR]:
+    '''
+    Run the seeds of a circuit concurrently, failed seeds are replaced as they fail
+    and the seeds past the decided ones are cancelled
+    '''
+    circuit_state = CircuitSeedState(
+        circuit_run_arg=circuit_run_arg, seed_policy=seed_policy)
+    circuit_size = estimate_circuit_size(circuit_run_arg.circuit_path)
+    running: Dict[asyncio.Task, int] = dict()
+    try:
+        while not circuit_state.is_done():
+            for seed in circuit_state.take_seeds(num_free_slots=suite_context.vpr_slots.num_free_slots()):
+                running[asyncio.create_task(run_vpr_circuit_of_seed(
+                    run_path=circuit_run_arg.run_path, circuit_name=circuit_run_arg.circuit_name, seed=seed,
+                    circuit_path=circuit_run_arg.circuit_path, suite_context=suite_context,
+                    # Largest circuit first
+                    priority=(-circuit_size, seed, circuit_run_arg.circuit_name)))] = seed
+            assert len(running) > 0
+            done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=running.get):
+                circuit_state.finish_seed(seed=running.pop(task), qor=task.result())
+    finally:
+        for task in running.keys():
+            task.cancel()
+        await asyncio.gather(*running.keys(), return_exceptions=True)
+    return circuit_state.result()
+
+
+async def run_vpr_circuits_across_seeds(circuit_run_args: Sequence[CircuitRunArg], seed_policy: SeedPolicy, args) -> List[List[CircuitQoR]]:
+    '''
+    Run all (circuit, seed) runs with at most args.processes VPR processes at once.
+    Return the passed QoRs of each circuit in the order of circuit_run_args.
+    Any error (other than a failed VPR run) cancels all runs and kills their VPR processes
+    '''
+    if args.memory_budget is None:
+        available_memory = get_available_memory()
+        memory_budget = int(
+            available_memory * 0.9) if available_memory is not None else None
+    else:
+        memory_budget = args.memory_budget << 20 if args.memory_budget > 0 else None
     logging.warning(
-        f'[{circuit_name}] {num_seeds} seeds ({seed} attempts) done')
-    return qors
+        f'VPR memory budget: {memory_budget >> 20} MiB' if memory_budget is not None else 'VPR memory budget: unlimited')
+    abort_policy = VPRAbortPolicy(
+        max_route_iterations=args.abort_route_iter, max_channel_width=args.abort_chan_width)
+    suite_context = SuiteContext(
+        vpr_slots=VPRSlots(num_slots=args.processes,
+                           memory_budget=memory_budget),
+        reuse_placement=not args.no_reuse_placement,
+        cache=VPRResultCache(cache_dir=Path(args.cache_dir), store_logs=args.cache_logs) if not args.no_cache else None,
+        resume=args.resume is not None,
+        memory_estimator=MemoryEstimator(history_file=Path(
+            args.rss_history) if args.rss_history != '' else None),
+        abort_policy=abort_policy if abort_policy.is_enabled() else None,
+        reaper=ThreadPoolExecutor(max_workers=args.processes, thread_name_prefix='vpr_reaper'))
+    tasks = [asyncio.create_task(run_vpr_circuit_across_seeds(
+        circuit_run_arg=circuit_run_arg, seed_policy=seed_policy, suite_context=suite_context)) for circuit_run_arg in circuit_run_args]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if suite_context.cache is not None:
+            logging.warning(
+                f'VPR result cache: {suite_context.cache.num_hits} hits, {suite_context.cache.num_misses} misses')
+        suite_context.memory_estimator.save()
+        # All VPR processes are reaped by now
+        suite_context.reaper.shutdown()
 
 
 @contextmanager
@@ -309,37 +1148,126 @@ def init(parser):
         help='Specify the number of seeds to run, default to 5'
     )
     parser.add_argument(
+        '--adaptive_ci',
+        type=float,
+        default=None,
+        help='Adaptive number of seeds instead of --seeds: add seeds to a circuit until the 95%% confidence intervals of its geomean critical path delay and routing area per tile are within +- this fraction, e.g. 0.01'
+    )
+    parser.add_argument(
+        '--min_seeds',
+        type=int,
+        default=3,
+        help='The minimum number of seeds with --adaptive_ci, default to 3'
+    )
+    parser.add_argument(
+        '--max_seeds',
+        type=int,
+        default=15,
+        help='The maximum number of seeds with --adaptive_ci, default to 15'
+    )
+    parser.add_argument(
+        '--processes', '-j',
+        type=int,
+        default=os.cpu_count(),
+        help=f'The number of concurrent VPR runs, default is {os.cpu_count()}'
+    )
+    parser.add_argument(
+        '--no_reuse_placement',
+        action='store_true',
+        help='Rerun packing and placement for the 1.3x minimum channel width run instead of only rerouting those of the minimum channel width run'
+    )
+    parser.add_argument(
+        '--cache_dir',
+        type=str,
+        default='vpr_cache',
+        help='Directory of the VPR result cache shared across suites, default is vpr_cache'
+    )
+    parser.add_argument(
+        '--cache_logs',
+        action='store_true',
+        help='Also cache vpr_stdout.log, restored into the run directory on a cache hit'
+    )
+    parser.add_argument(
+        '--no_cache',
+        action='store_true',
+        help='Always run VPR, neither read nor write the VPR result cache'
+    )
+    parser.add_argument(
+        '--abort_route_iter',
+        type=int,
+        default=None,
+        help='Kill a fixed channel width VPR run as soon as its routing goes past this many iterations and move on to the next seed, default is never'
+    )
+    parser.add_argument(
+        '--abort_chan_width',
+        type=int,
+        default=None,
+        help='Kill a VPR run as soon as its minimum channel width search tries a width above this and move on to the next seed, default is never'
+    )
+    parser.add_argument(
+        '--memory_budget',
+        type=int,
+        default=None,
+        help='Memory budget in MiB of the concurrent VPR runs, 0 is unlimited, default is 90%% of the available memory at start'
+    )
+    parser.add_argument(
+        '--rss_history',
+        type=str,
+        default='vpr_peak_rss.json',
+        help='File of the peak VPR memory per circuit observed so far, used to admit runs within --memory_budget, empty to not persist it'
+    )
+    suite_group = parser.add_mutually_exclusive_group(required=True)
+    suite_group.add_argument(
         '--name',
         type=str,
-        required=True,
         help='Experiment name'
     )
+    suite_group.add_argument(
+        '--resume',
+        type=str,
+        default=None,
+        help='Suite directory of an interrupted run, only the (circuit, seed, step) runs it did not complete successfully are rerun'
+    )
 
 
 def runner(args):
-    suite_path = prepare_suite_dir(suite_name=args.name)
+    if args.resume is not None:
+        suite_path = Path(args.resume)
+        assert suite_path.is_dir(), f'Suite directory {suite_path} not found'
+        resumed_run_paths = find_run_dirs(suite_path)
+        logging.warning(f'Resuming suite directory: {suite_path}')
+    else:
+        suite_path = prepare_suite_dir(suite_name=args.name)
+        resumed_run_paths = dict()
 
     # Collect all circuits
     circuit_folder = Path('./a4_benchmarks')
     circuit_paths = [x for x in circuit_folder.iterdir() if not x.is_dir()]
 
     # Prepare for run
-    circuit_run_args = list()
+    circuit_run_args: List[CircuitRunArg] = list()
     for circuit_path in circuit_paths:
         circuit_name = Path(circuit_path).with_suffix('').name
-        run_path = prepare_run_dir(
-            suite_path=suite_path, run_name=circuit_name)
-        circuit_run_args.append(
-            (run_path, circuit_name, args.seeds, circuit_path))
+        run_path = resumed_run_paths.get(circuit_name)
+        if run_path is None:
+            run_path = prepare_run_dir(
+                suite_path=suite_path, run_name=circuit_name)
+        circuit_run_args.append(CircuitRunArg(
+            run_path=run_path, circuit_name=circuit_name, circuit_path=str(circuit_path)))
     logging.info(
         f'Collected {len(circuit_run_args)} circuits from {circuit_folder}')
     for circuit_run_arg in circuit_run_args:
         logging.info(f'  Arg: {circuit_run_arg}')
 
     # Run in parallel
-    with Pool(initializer=init_logger, initargs=(args,)) as p:
-        circuits_qors = p.starmap(func=run_vpr_circuit_across_seeds,
-                                  iterable=circuit_run_args)
+    if args.adaptive_ci is not None:
+        assert 0 < args.min_seeds <= args.max_seeds, 'Expected 0 < --min_seeds <= --max_seeds'
+        seed_policy = SeedPolicy(
+            num_seeds=args.min_seeds, max_seeds=args.max_seeds, target_ci=args.adaptive_ci)
+    else:
+        seed_policy = SeedPolicy(num_seeds=args.seeds)
+    circuits_qors = asyncio.run(run_vpr_circuits_across_seeds(
+        circuit_run_args=circuit_run_args, seed_policy=seed_policy, args=args))
 
     logging.info('--------------------------')
     logging.info('Circuit Seed QoR:')
@@ -352,17 +1280,23 @@ def runner(args):
     circuits_geomean_qor = [CircuitQoR.from_geomean(
         circuit_qors) for circuit_qors in circuits_qors if len(circuit_qors) > 0]
     logging.warning(
-        f'Circuit Geomean QoR (from {len(circuits_geomean_qor)} successful circuits with {args.seeds} seeds):')
+        f'Circuit Geomean QoR (from {len(circuits_geomean_qor)} successful circuits with {seed_policy.present()}):')
     for circuit_geomean_qor in circuits_geomean_qor:
         logging.warning(f'  {circuit_geomean_qor}')
     logging.warning('')
+    logging.warning(f'Circuit QoR and VPR cost per seed, cached runs excluded from the cost (arch {VPRRunParam._field_defaults["arch_config_file"]}):')
+    for circuit_geomean_qor, circuit_qors in zip(circuits_geomean_qor, filter(lambda circuit_qors: len(circuit_qors) > 0, circuits_qors)):
+        logging.warning(
+            f'  {circuit_geomean_qor.circuit:<10} seeds={len(circuit_qors)} {circuit_geomean_qor.present_data()} {circuit_geomean_qor.present_cost()}')
+    logging.warning('')
 
     logging.warning('**************************')
     final_qor = CircuitQoR.from_geomean(circuits_geomean_qor)
     logging.warning(
-        f'Final QoR (from {len(circuits_geomean_qor)} successful circuits with {args.seeds} seeds):')
+        f'Final QoR (from {len(circuits_geomean_qor)} successful circuits with {seed_policy.present()}):')
     logging.warning(f'  {final_qor}')
     logging.warning(f'  {final_qor.present_data()}')
+    logging.warning(f'  {final_qor.present_cost()}')
     logging.warning('')
 
 
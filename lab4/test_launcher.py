@@ -0,0 +1,400 @@
+import asyncio
+import logging
+import math
+import mmap
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List, Optional
+
+from launcher import CircuitQoR, CircuitRunArg, CircuitSeedState, SeedPolicy, VPRAbortPolicy, VPRProgressMonitor, VPRRunParam, VPRSlots, geomean_confidence_half_width, parse_circuit_qor
+
+
+def route_table_lines(num_iterations: int):
+    yield 'Iter   Time    pres  BBs    Heap  Re-Rtd  Re-Rtd Overused RR Nodes      Wirelength      CPD       sTNS       sWNS       hTNS       hWNS Est Succ'
+    yield '      (sec)     fac Updt    push    Nets   Conns                                       (ns)       (ns)       (ns)       (ns)       (ns)     Iter'
+    yield '---- ------ ------- ---- ------- ------- ------- ----------------- --------------- -------- ---------- ---------- ---------- ---------- --------'
+    for iteration in range(1, num_iterations + 1):
+        yield f'{iteration:>4}    0.1     0.5    0  123456    1234    5678     100 ( 0.1%)   12345 ( 5.0%)    8.123     -1.234     -0.123      0.000      0.000      N/A'
+
+
+class VPRProgressMonitorTestCase(unittest.TestCase):
+    abort_policy = VPRAbortPolicy(max_route_iterations=20, max_channel_width=100)
+
+    def feed_all(self, monitor: VPRProgressMonitor, lines):
+        for line in lines:
+            if (abort_reason := monitor.feed(line)) is not None:
+                return abort_reason
+        return None
+
+    def minimum_channel_width_search_lines(self, channel_widths, num_failing_iterations: int):
+        for channel_width in channel_widths:
+            yield f'Attempting to route at {channel_width} channels (binary search bounds: [-1, -1])'
+            yield from route_table_lines(num_failing_iterations)
+            yield 'Routing failed.'
+        yield 'Best routing used a channel width factor of 60.'
+
+    def test_minimum_channel_width_search_not_aborted_on_iterations(self):
+        param = VPRRunParam(blif_file='a.blif', seed=1)
+        policy = self.abort_policy.for_run(param)
+        lines = list(self.minimum_channel_width_search_lines(
+            [60, 30, 46], num_failing_iterations=50))
+        self.assertIsNone(self.feed_all(VPRProgressMonitor(policy), lines))
+        # The search itself still aborts on the channel width
+        self.assertIsNotNone(self.feed_all(VPRProgressMonitor(policy), self.minimum_channel_width_search_lines(
+            [60, 120], num_failing_iterations=50)))
+
+    def test_fixed_channel_width_aborted_on_iterations(self):
+        param = VPRRunParam(blif_file='a.blif', seed=1, route_chan_width=78)
+        policy = self.abort_policy.for_run(param)
+        self.assertIsNone(self.feed_all(
+            VPRProgressMonitor(policy), route_table_lines(20)))
+        self.assertEqual(self.feed_all(VPRProgressMonitor(
+            policy), route_table_lines(50)), 'routing iteration 21 > 20')
+
+    def test_for_run_disabled(self):
+        policy = VPRAbortPolicy(max_route_iterations=20)
+        self.assertIsNone(policy.for_run(VPRRunParam(blif_file='a.blif', seed=1)))
+        self.assertIsNotNone(policy.for_run(
+            VPRRunParam(blif_file='a.blif', seed=1, route_chan_width=78)))
+
+
+class GeomeanConfidenceTestCase(unittest.TestCase):
+    def test_geomean_confidence_half_width(self):
+        self.assertEqual(geomean_confidence_half_width([]), math.inf)
+        self.assertEqual(geomean_confidence_half_width([5.0]), math.inf)
+        self.assertAlmostEqual(geomean_confidence_half_width([3.0] * 4), 0.0)
+        # log stdev of [e^-1, e^1] is sqrt(2), t = 12.706 for 1 degree of freedom
+        self.assertAlmostEqual(geomean_confidence_half_width(
+            [math.exp(-1), math.exp(1)]), math.exp(12.706 * math.sqrt(2) / math.sqrt(2)) - 1)
+        # Scale invariant, narrower with more values
+        values = [8.1, 8.5, 7.9, 8.3]
+        self.assertAlmostEqual(geomean_confidence_half_width(
+            values), geomean_confidence_half_width([value * 10 for value in values]))
+        self.assertLess(geomean_confidence_half_width(
+            values * 2), geomean_confidence_half_width(values))
+
+
+class CircuitSeedStateTestCase(unittest.TestCase):
+    circuit_run_arg = CircuitRunArg(
+        run_path=Path('.'), circuit_name='clma', circuit_path='clma.blif')
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    @staticmethod
+    def seed_outcome(seed: int, noise: float) -> Optional[CircuitQoR]:
+        '''
+        Deterministic per seed: every 3rd seed fails
+        '''
+        if seed % 3 == 1:
+            return None
+        value = 1.0 + noise * random.Random(seed).uniform(-1, 1)
+        return CircuitQoR(seed=seed, circuit='clma', channel_width=60, routing_area_total=1.0,
+                          routing_area_per_tile=value, critical_path_delay=value, fmax=1.0)
+
+    def serial_seeds(self, seed_policy: SeedPolicy, noise: float) -> List[int]:
+        '''
+        The seeds of the one after another baseline
+        '''
+        qors = list()
+        for seed in range(seed_policy.max_attempts):
+            if (qor := self.seed_outcome(seed, noise)) is not None:
+                qors.append(qor)
+            if len(qors) < seed_policy.num_seeds:
+                continue
+            if not seed_policy.is_adaptive() or len(qors) >= seed_policy.max_seeds or \
+                    seed_policy.confidence_half_width(qors) <= seed_policy.target_ci:
+                break
+        return [qor.seed for qor in qors]
+
+    def run_seeds(self, seed_policy: SeedPolicy, noise: float, num_free_slots: int, rng: random.Random) -> CircuitSeedState:
+        '''
+        Seeds finish in a random order
+        '''
+        circuit_state = CircuitSeedState(
+            circuit_run_arg=self.circuit_run_arg, seed_policy=seed_policy)
+        running = list()
+        while not circuit_state.is_done():
+            running += circuit_state.take_seeds(num_free_slots=num_free_slots)
+            self.assertGreater(len(running), 0)
+            seed = running.pop(rng.randrange(len(running)))
+            circuit_state.finish_seed(
+                seed=seed, qor=self.seed_outcome(seed, noise))
+        return circuit_state
+
+    def test_fixed_matches_serial(self):
+        seed_policy = SeedPolicy(num_seeds=5)
+        rng = random.Random(0)
+        for num_free_slots in [0, 1, 8]:
+            circuit_state = self.run_seeds(
+                seed_policy=seed_policy, noise=0.1, num_free_slots=num_free_slots, rng=rng)
+            self.assertListEqual([qor.seed for qor in circuit_state.result()],
+                                 self.serial_seeds(seed_policy=seed_policy, noise=0.1))
+            # Only the failed seeds are replaced
+            self.assertEqual(circuit_state.next_seed, 7)
+
+    def test_adaptive_stops_at_confidence(self):
+        seed_policy = SeedPolicy(num_seeds=3, max_seeds=20, target_ci=0.02)
+        serial_seeds = self.serial_seeds(seed_policy=seed_policy, noise=0.02)
+        self.assertLess(len(serial_seeds), seed_policy.max_seeds)
+        rng = random.Random(0)
+        for num_free_slots in [0, 1, 4, 32]:
+            circuit_state = self.run_seeds(
+                seed_policy=seed_policy, noise=0.02, num_free_slots=num_free_slots, rng=rng)
+            qors = circuit_state.result()
+            self.assertListEqual([qor.seed for qor in qors], serial_seeds)
+            self.assertLessEqual(seed_policy.confidence_half_width(
+                qors), seed_policy.target_ci)
+            self.assertGreater(seed_policy.confidence_half_width(
+                qors[:-1]), seed_policy.target_ci)
+
+    def test_adaptive_stops_at_max_seeds(self):
+        seed_policy = SeedPolicy(num_seeds=3, max_seeds=6, target_ci=0.001)
+        rng = random.Random(0)
+        for num_free_slots in [0, 2, 32]:
+            circuit_state = self.run_seeds(
+                seed_policy=seed_policy, noise=0.5, num_free_slots=num_free_slots, rng=rng)
+            self.assertListEqual([qor.seed for qor in circuit_state.result()], [
+                                 0, 2, 3, 5, 6, 8])
+
+    def test_adaptive_batch(self):
+        seed_policy = SeedPolicy(num_seeds=3, max_seeds=20, target_ci=0.001)
+        circuit_state = CircuitSeedState(
+            circuit_run_arg=self.circuit_run_arg, seed_policy=seed_policy)
+        self.assertListEqual(circuit_state.take_seeds(num_free_slots=0), [0, 1, 2])
+        for seed in [0, 1, 2]:
+            circuit_state.finish_seed(
+                seed=seed, qor=self.seed_outcome(seed, noise=0.5))
+        # One replaces the failed seed 1, the extra seeds fill the rest of the free slots
+        self.assertListEqual(circuit_state.take_seeds(num_free_slots=4), [3, 4, 5, 6])
+        self.assertListEqual(circuit_state.take_seeds(num_free_slots=0), [])
+
+    def test_aborted(self):
+        seed_policy = SeedPolicy(num_seeds=2)
+        circuit_state = CircuitSeedState(
+            circuit_run_arg=self.circuit_run_arg, seed_policy=seed_policy)
+        while not circuit_state.is_done():
+            for seed in circuit_state.take_seeds(num_free_slots=0):
+                circuit_state.finish_seed(seed=seed, qor=None)
+        self.assertTrue(circuit_state.aborted)
+        self.assertEqual(circuit_state.next_seed, seed_policy.max_attempts)
+        self.assertListEqual(circuit_state.result(), [])
+
+
+class ParseCircuitQoRTestCase(unittest.TestCase):
+    step0_log = '''VPR FPGA Placement and Routing.
+# Packing took 1.25 seconds (max_rss 52.3 MiB, delta_rss +20.1 MiB)
+# Placement took 3.5 seconds (max_rss 60.0 MiB, delta_rss +7.7 MiB)
+Attempting to route at 60 channels (binary search bounds: [-1, -1])
+Routing failed.
+Attempting to route at 120 channels (binary search bounds: [60, -1])
+Circuit successfully routed with a channel width factor of 120.
+Attempting to route at 90 channels (binary search bounds: [60, 120])
+Circuit successfully routed with a channel width factor of 90.
+Best routing used a channel width factor of 90.
+# Routing took 10.75 seconds (max_rss 80.5 MiB, delta_rss +20.5 MiB)
+Circuit successfully routed with a channel width factor of 90.
+Final critical path: 8.52 ns, Fmax: 117.371 MHz
+	Total routing area: 2.5e+06, per logic tile: 1234.5
+The entire flow of VPR took 15.6 seconds (max_rss 80.5 MiB)
+'''
+    step1_log = '''VPR FPGA Placement and Routing.
+# Routing took 2.5 seconds (max_rss 70.0 MiB, delta_rss +10.0 MiB)
+Circuit successfully routed with a channel width factor of 117.
+Final critical path: 8.31 ns, Fmax: 120.337 MHz
+	Total routing area: 3.1e+06, per logic tile: 1500.25
+The entire flow of VPR took 3.1 seconds (max_rss 70.0 MiB)'''
+    failure_log = '''VPR FPGA Placement and Routing.
+# Packing took 1.25 seconds (max_rss 52.3 MiB, delta_rss +20.1 MiB)
+# Placement took 3.5 seconds (max_rss 60.0 MiB, delta_rss +7.7 MiB)
+Attempting to route at 60 channels (binary search bounds: [-1, -1])
+Routing failed.
+# Routing took 7.0 seconds (max_rss 80.5 MiB, delta_rss +20.5 MiB)
+Circuit is unroutable with a channel width factor of 60.
+The entire flow of VPR took 12.0 seconds (max_rss 80.5 MiB)
+'''
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._log_dir = Path(self._tmp_dir.name)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def assertParsedLikeLineByLine(self, log: str) -> CircuitQoR:
+        with open(self._log_dir.joinpath('vpr_stdout.log'), 'w') as f:
+            f.write(log)
+        qor = parse_circuit_qor(log_dir=self._log_dir,
+                                circuit='clma', seed=1, minimum_channel_width=90)
+        expected_qor = CircuitQoR(
+            seed=1, circuit='clma', minimum_channel_width=90)
+        for line in log.splitlines():
+            expected_qor.parse_line(line)
+        self.assertEqual(qor, expected_qor)
+        if len(log) > 0:
+            # Each path on its own, the tail is only trusted when it finds the required anchors
+            with open(self._log_dir.joinpath('vpr_stdout.log'), 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_log:
+                scan_qor = CircuitQoR(
+                    seed=1, circuit='clma', minimum_channel_width=90)
+                scan_qor.parse_log_scan(mapped_log)
+                self.assertEqual(scan_qor, expected_qor)
+                tail_qor = CircuitQoR(
+                    seed=1, circuit='clma', minimum_channel_width=90)
+                if tail_qor.parse_log_tail(mapped_log):
+                    self.assertEqual(tail_qor, expected_qor)
+                else:
+                    self.assertFalse(expected_qor.is_route_successful())
+        return qor
+
+    def test_step0(self):
+        qor = self.assertParsedLikeLineByLine(self.step0_log)
+        self.assertTrue(qor.is_route_successful())
+        self.assertEqual(qor.channel_width, 90)
+        self.assertEqual(qor.route_time, 10.75)
+        self.assertEqual(qor.vpr_max_rss_mib, 80.5)
+
+    def test_step1(self):
+        qor = self.assertParsedLikeLineByLine(self.step1_log)
+        self.assertTrue(qor.is_route_successful())
+        self.assertEqual(qor.channel_width, 117)
+        self.assertIsNone(qor.pack_time)
+
+    def test_failure(self):
+        qor = self.assertParsedLikeLineByLine(self.failure_log)
+        self.assertFalse(qor.is_route_successful())
+        self.assertEqual(qor.route_time, 7.0)
+
+    def test_partial(self):
+        # Killed in the middle of a line
+        partial_log = self.step0_log[:self.step0_log.index(
+            'Final critical path') + 25]
+        qor = self.assertParsedLikeLineByLine(partial_log)
+        self.assertFalse(qor.is_route_successful())
+        self.assertEqual(qor.channel_width, 90)
+
+    def test_empty(self):
+        qor = self.assertParsedLikeLineByLine('')
+        self.assertFalse(qor.is_route_successful())
+
+    def test_anchor_not_at_line_start(self):
+        # The last occurrence of an anchor is inside another line, the line of its own before it wins
+        log = self.step1_log + \
+            '\nWarning: Final critical path: 1.0 ns, Fmax: 1000.0 MHz was not met\n  # Routing took 99.0 seconds\n'
+        qor = self.assertParsedLikeLineByLine(log)
+        self.assertEqual(qor.critical_path_delay, 8.31)
+        self.assertEqual(qor.route_time, 2.5)
+
+    def test_last_occurrence_wins(self):
+        qor = self.assertParsedLikeLineByLine(
+            self.step0_log + 'Final critical path: 9.0 ns, Fmax: 111.1 MHz\n')
+        self.assertEqual(qor.critical_path_delay, 9.0)
+
+
+class VPRSlotsTestCase(unittest.TestCase):
+    MiB = 1 << 20
+
+    @staticmethod
+    async def hold(slots: VPRSlots, name: str, priority: tuple, memory: int, release: asyncio.Event, admitted: List[str]):
+        async with slots.acquire(priority=priority, memory=memory):
+            admitted.append(name)
+            await release.wait()
+
+    def test_priority_order(self):
+        async def run():
+            slots = VPRSlots(num_slots=1)
+            admitted = list()
+            releases = {name: asyncio.Event() for name in 'abcd'}
+            tasks = [asyncio.create_task(self.hold(slots, name, priority, 0, releases[name], admitted))
+                     for name, priority in [('a', (0,)), ('b', (3,)), ('c', (1,)), ('d', (2,))]]
+            await asyncio.sleep(0)
+            self.assertListEqual(admitted, ['a'])
+            for name in 'acdb':
+                releases[name].set()
+                await asyncio.sleep(0)
+                await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+            self.assertListEqual(admitted, ['a', 'c', 'd', 'b'])
+        asyncio.run(run())
+
+    def test_memory_budget(self):
+        async def run():
+            slots = VPRSlots(num_slots=4, memory_budget=100 * self.MiB)
+            admitted = list()
+            releases = {name: asyncio.Event() for name in 'abc'}
+            tasks = [asyncio.create_task(self.hold(slots, name, (idx,), memory * self.MiB, releases[name], admitted))
+                     for idx, (name, memory) in enumerate([('a', 60), ('b', 50), ('c', 10)])]
+            await asyncio.sleep(0)
+            # b does not fit next to a, and holds back c behind it even though c would fit
+            self.assertListEqual(admitted, ['a'])
+            releases['a'].set()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            self.assertListEqual(admitted, ['a', 'b', 'c'])
+            releases['b'].set()
+            releases['c'].set()
+            await asyncio.gather(*tasks)
+        asyncio.run(run())
+
+    def test_admitted_when_nothing_runs(self):
+        async def run():
+            slots = VPRSlots(num_slots=2, memory_budget=100 * self.MiB)
+            admitted = list()
+            release = asyncio.Event()
+            task = asyncio.create_task(self.hold(
+                slots, 'a', (0,), 500 * self.MiB, release, admitted))
+            await asyncio.sleep(0)
+            self.assertListEqual(admitted, ['a'])
+            release.set()
+            await task
+        asyncio.run(run())
+
+    def test_cancel_waiter(self):
+        async def run():
+            slots = VPRSlots(num_slots=1)
+            admitted = list()
+            releases = {name: asyncio.Event() for name in 'abc'}
+            tasks = {name: asyncio.create_task(self.hold(slots, name, (idx,), 0, releases[name], admitted))
+                     for idx, name in enumerate('abc')}
+            await asyncio.sleep(0)
+            # Cancelled while waiting, the next waiter takes its turn
+            tasks['b'].cancel()
+            await asyncio.sleep(0)
+            releases['a'].set()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            self.assertListEqual(admitted, ['a', 'c'])
+            releases['c'].set()
+            await asyncio.gather(tasks['a'], tasks['c'])
+            self.assertTrue(tasks['b'].cancelled())
+            self.assertEqual(slots.num_free_slots(), 1)
+        asyncio.run(run())
+
+    def test_cancel_right_after_admission(self):
+        async def run():
+            slots = VPRSlots(num_slots=1)
+            admitted = list()
+            releases = {name: asyncio.Event() for name in 'abc'}
+            tasks = {name: asyncio.create_task(self.hold(slots, name, (idx,), 0, releases[name], admitted))
+                     for idx, name in enumerate('abc')}
+            await asyncio.sleep(0)
+            # b is admitted when a releases, and cancelled before it gets to run
+            releases['a'].set()
+            while not tasks['a'].done():
+                await asyncio.sleep(0)
+            self.assertListEqual(admitted, ['a'])
+            self.assertEqual(slots.num_free_slots(), 0)
+            tasks['b'].cancel()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            self.assertTrue(tasks['b'].cancelled())
+            # Its slot is passed on to c
+            self.assertListEqual(admitted, ['a', 'c'])
+            releases['c'].set()
+            await tasks['c']
+            self.assertEqual(slots.num_free_slots(), 1)
+        asyncio.run(run())